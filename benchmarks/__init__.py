@@ -0,0 +1 @@
+"""Runnable performance benchmarks; see each module's docstring for usage."""
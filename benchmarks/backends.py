@@ -0,0 +1,142 @@
+"""Pick the fastest pose backend that stays within an angle-error budget.
+
+Every candidate runs on the same sampled frames of each clip as a
+reference backend (by default the heaviest legacy model). For each
+candidate the script reports the mean inference time per frame, how many
+frames had a pose, and each joint's angle error against the reference, as
+in ``benchmarks.downscale``. The worst joint's error is then compared with
+the budget. The fastest candidate within budget on every clip is
+selected::
+
+    python -m benchmarks.backends videos/matt-palmer-back-run1.MP4 --budget 5 \\
+        --candidates legacy:0 legacy:1 tasks:models/pose_landmarker_full.task \\
+        movenet:models/movenet_thunder.tflite
+
+A candidate is ``name[:argument]``: the model complexity for ``legacy``
+and the model file for ``tasks`` and ``movenet``. If a joint has no angle
+from a backend (MoveNet has no feet, so no ankle angle), that backend
+fails the budget. Candidates that cannot be built, because of a missing
+model file or runtime, are reported and skipped.
+
+Each candidate then runs the clip once more behind ``PersonRoi``, as the
+page does, and the script reports how many times the crop moved and how
+many times the backend had to rebuild its model (``resets``, Tasks only).
+The crop moves on every clip; a rebuild should only happen when the run
+starts over, so a candidate with more than ``MAX_RESETS`` per clip fails.
+"""
+
+import argparse
+import json
+import time
+
+import numpy as np
+
+from benchmarks.downscale import agreement, load_frames
+from stride_sync.backends import create_backend
+from stride_sync.landmarks import LandmarkBuffer
+from stride_sync.roi import PersonRoi
+from stride_sync.video import DEFAULT_LONG_EDGE, to_model_input
+
+METRICS = ("median", "p95", "max", "rom")
+MAX_RESETS = 1   # the ROI pass starts over at timestamp 0 after the plain pass
+
+
+def backend_from_spec(spec):
+    """``legacy:2`` / ``tasks:path.task`` / ``movenet:path.tflite`` -> backend."""
+    name, _, argument = spec.partition(":")
+    if name == "legacy":
+        return create_backend(name, model_complexity=int(argument or 1))
+    return create_backend(name, **({"model_path": argument} if argument else {}))
+
+
+def run_backend(backend, frames, rotated, fps, step, long_edge):
+    """Landmarks for every frame (NaN without a pose) and mean inference seconds per frame."""
+    buffer = LandmarkBuffer(len(frames))
+    infer = 0.0
+    backend.reset()
+    for i, frame in enumerate(frames):
+        model_input = to_model_input(frame, rotated, long_edge)
+        start = time.perf_counter()
+        found = backend.detect(model_input, buffer.landmarks[i], buffer.world[i], i * step * 1000.0 / fps)
+        infer += time.perf_counter() - start
+        if found is None:
+            buffer.landmarks[i] = np.nan
+    return buffer.landmarks[:, :, :2].astype(float), infer / max(len(frames), 1)
+
+
+def roi_resets(backend, frames, rotated, fps, step, long_edge):
+    """Crop moves and model rebuilds of ``backend`` tracking the person through the frames."""
+    roi = PersonRoi()
+    before = getattr(backend, "resets", 0)
+    for i, frame in enumerate(frames):
+        roi.process(backend, frame, rotated, long_edge, timestamp_ms=i * step * 1000.0 / fps)
+    return roi.moves, getattr(backend, "resets", 0) - before
+
+
+def worst_error(stats, metric):
+    """Largest per-joint error; None if any joint had no angle at all."""
+    values = [joint[metric] for joint in stats.values()]
+    return None if any(value is None for value in values) else max(values)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("videos", nargs="+")
+    parser.add_argument("--gait-type", default="running")
+    parser.add_argument("--candidates", nargs="+", default=["legacy:0", "legacy:1", "tasks", "movenet"])
+    parser.add_argument("--reference", default="legacy:2")
+    parser.add_argument("--budget", type=float, default=5.0, help="allowed worst-joint error in degrees")
+    parser.add_argument("--metric", choices=METRICS, default="p95")
+    parser.add_argument("--long-edge", type=int, default=DEFAULT_LONG_EDGE)
+    parser.add_argument("--max-frames", type=int, default=None)
+    parser.add_argument("--json", help="write the results to this file")
+    args = parser.parse_args(argv)
+
+    clips = {path: load_frames(path, args.gait_type, max_frames=args.max_frames) for path in args.videos}
+    references = {}
+    with backend_from_spec(args.reference) as reference:
+        for path, (frames, rotated, fps, step) in clips.items():
+            references[path] = run_backend(reference, frames, rotated, fps, step, args.long_edge)
+
+    results = {"reference": args.reference, "budget": args.budget, "metric": args.metric, "candidates": {}}
+    print(f"{'candidate':<40} {'infer ms':>9} {'detected':>9} {'worst ' + args.metric:>11}  within budget")
+    for spec in args.candidates:
+        try:
+            backend = backend_from_spec(spec)
+        except (FileNotFoundError, ImportError, ValueError) as error:
+            results["candidates"][spec] = dict(error=str(error))
+            print(f"{spec:<40} skipped: {error}")
+            continue
+        clip_results = {}
+        with backend:
+            for path, (frames, rotated, fps, step) in clips.items():
+                landmarks, infer = run_backend(backend, frames, rotated, fps, step, args.long_edge)
+                stats = agreement(references[path][0], landmarks, fps / step)
+                moves, resets = roi_resets(backend, frames, rotated, fps, step, args.long_edge)
+                clip_results[path] = dict(infer_ms=infer * 1000, worst=worst_error(stats, args.metric),
+                                          detected=int((~np.isnan(landmarks[:, 0, 0])).sum()),
+                                          frames=len(frames), roi_moves=moves, resets=resets, joints=stats)
+        infer_ms = float(np.mean([clip["infer_ms"] for clip in clip_results.values()]))
+        errors = [clip["worst"] for clip in clip_results.values()]
+        worst = None if None in errors else max(errors)
+        detected = sum(clip["detected"] for clip in clip_results.values())
+        frames = sum(clip["frames"] for clip in clip_results.values())
+        moves = sum(clip["roi_moves"] for clip in clip_results.values())
+        resets = max(clip["resets"] for clip in clip_results.values())
+        ok = worst is not None and worst <= args.budget and resets <= MAX_RESETS
+        results["candidates"][spec] = dict(infer_ms=infer_ms, worst=worst, within_budget=ok, clips=clip_results)
+        shown = "n/a" if worst is None else f"{worst:.2f}"
+        print(f"{spec:<40} {infer_ms:9.2f} {detected:>4}/{frames:<4} {shown:>11}  {'yes' if ok else 'no'}"
+              f"  (ROI moves {moves}, resets {resets})")
+
+    passing = {spec: c for spec, c in results["candidates"].items() if c.get("within_budget")}
+    results["selected"] = min(passing, key=lambda spec: passing[spec]["infer_ms"]) if passing else None
+    print(f"selected: {results['selected'] or 'none within budget'}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""Joint-angle agreement and speed of downscaled pose inference.
+
+Runs the same sampled frames through MediaPipe at native resolution and at
+each long-edge target, then reports preprocessing and inference time per
+frame and how far every joint angle (the worst joint is printed) and the
+report's range of motion move from the native-resolution run::
+
+    python -m benchmarks.downscale videos/matt-palmer-back-run1.MP4 \\
+        --source-long-edge 2160 --targets 256 480 640 960
+
+``--source-long-edge`` upscales the decoded frames first to stand in for
+4K phone footage when only smaller clips are at hand.
+"""
+
+import argparse
+import json
+import time
+
+import cv2
+import numpy as np
+
+from stride_sync.analysis import (CUTOFF_FREQUENCY, JOINTS, PEAK_MIN_SECONDS, TARGET_SAMPLE_FPS,
+                                  butter_lowpass_filter, is_rotated, summarize_joint)
+from stride_sync.kinematics import joint_angles
+from stride_sync.landmarks import pose_array
+from stride_sync.pose import DEFAULT_POSE_SETTINGS, default_pool
+from stride_sync.video import FrameSource, to_model_input
+
+
+def load_frames(video_path, gait_type, source_long_edge=0, max_frames=None):
+    """Sampled BGR frames at roughly the app's analysis rate (optionally upscaled), rotation, fps and step."""
+    with FrameSource(video_path) as source:
+        fps = source.fps
+        step = max(1, int(fps // TARGET_SAMPLE_FPS))
+        frames = [frame for _, frame in source.frames(0, source.frame_count, step)]
+    if max_frames:
+        frames = frames[:max_frames]
+    rotated = bool(frames) and is_rotated(frames[0], gait_type)
+    if source_long_edge and frames and max(frames[0].shape[:2]) < source_long_edge:
+        height, width = frames[0].shape[:2]
+        scale = source_long_edge / max(height, width)
+        size = (round(width * scale), round(height * scale))
+        frames = [cv2.resize(frame, size, interpolation=cv2.INTER_CUBIC) for frame in frames]
+    return frames, rotated, fps, step
+
+
+def run(frames, rotated, long_edge):
+    """Landmarks for every frame plus mean preprocessing / inference seconds per frame."""
+    landmarks = np.full((len(frames), 33, 4), np.nan, dtype=np.float32)
+    prep_time = infer_time = 0.0
+    with default_pool().checkout(**DEFAULT_POSE_SETTINGS) as pose:
+        for i, frame in enumerate(frames):
+            start = time.perf_counter()
+            frame_rgb = to_model_input(frame, rotated, long_edge)
+            prepared = time.perf_counter()
+            results = pose.process(frame_rgb)
+            infer_time += time.perf_counter() - prepared
+            prep_time += prepared - start
+            pose_array(results, landmarks[i])
+    n = max(len(frames), 1)
+    return landmarks[:, :, :2].astype(float), prep_time / n, infer_time / n
+
+
+def agreement(reference, candidate, sample_rate):
+    """Per-joint absolute difference from the reference run, in degrees.
+
+    ``median``/``p95``/``max`` compare raw per-frame angles; ``rom`` compares
+    the report's range of motion after the same low-pass filter (at the
+    ``sample_rate`` of the sampled frames) and peak detection the Gait page
+    uses, on frames where both runs found a pose.
+    """
+    both = ~np.isnan(reference[:, 0, 0]) & ~np.isnan(candidate[:, 0, 0])
+    ref, cand = joint_angles(reference[both]), joint_angles(candidate[both])
+    stats = {}
+    for joint in JOINTS:
+        diff = np.abs(ref[joint] - cand[joint])
+        diff = diff[~np.isnan(diff)]
+        if diff.size == 0:
+            stats[joint] = dict(median=None, p95=None, max=None, rom=None, frames=0)
+            continue
+        roms = [summarize_joint(butter_lowpass_filter(angles[joint], CUTOFF_FREQUENCY, sample_rate),
+                                max(1.0, sample_rate * PEAK_MIN_SECONDS),
+                                range_only=(joint == "spine_segment")).rom
+                for angles in (ref, cand)]
+        stats[joint] = dict(median=float(np.median(diff)), p95=float(np.percentile(diff, 95)),
+                            max=float(diff.max()), rom=float(abs(roms[0] - roms[1])), frames=int(diff.size))
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("video")
+    parser.add_argument("--gait-type", default="running")
+    parser.add_argument("--targets", type=int, nargs="+", default=[256, 480, 640, 960])
+    parser.add_argument("--source-long-edge", type=int, default=0)
+    parser.add_argument("--max-frames", type=int, default=None)
+    parser.add_argument("--per-joint", action="store_true", help="print every joint, not just the worst")
+    parser.add_argument("--json", help="write the results to this file")
+    args = parser.parse_args(argv)
+
+    frames, rotated, fps, step = load_frames(args.video, args.gait_type, args.source_long_edge, args.max_frames)
+    if not frames:
+        parser.error(f"no frames decoded from {args.video}")
+    height, width = frames[0].shape[:2]
+    print(f"{len(frames)} frames at {width}x{height}{' (rotated)' if rotated else ''}")
+
+    reference, prep, infer = run(frames, rotated, 0)
+    results = {"video": args.video, "frames": len(frames), "source_size": [width, height],
+               "native": dict(prep_ms=prep * 1000, infer_ms=infer * 1000), "targets": {}}
+    print(f"{'long edge':>10} {'prep ms':>8} {'infer ms':>9} {'median deg':>11} {'p95 deg':>8} {'max deg':>8} {'ROM deg':>8}")
+    print(f"{'native':>10} {prep * 1000:8.2f} {infer * 1000:9.2f}")
+
+    for target in args.targets:
+        landmarks, prep, infer = run(frames, rotated, target)
+        stats = agreement(reference, landmarks, fps / step)
+        worst = [s for s in stats.values() if s["frames"]]
+        median = max((s["median"] for s in worst), default=float("nan"))
+        p95 = max((s["p95"] for s in worst), default=float("nan"))
+        peak = max((s["max"] for s in worst), default=float("nan"))
+        rom = max((s["rom"] for s in worst), default=float("nan"))
+        results["targets"][target] = dict(prep_ms=prep * 1000, infer_ms=infer * 1000, joints=stats)
+        print(f"{target:>10} {prep * 1000:8.2f} {infer * 1000:9.2f} {median:11.2f} {p95:8.2f} {peak:8.2f} {rom:8.2f}")
+        if args.per_joint:
+            for joint, s in stats.items():
+                if s["frames"]:
+                    print(f"{joint:>30} {s['median']:11.2f} {s['p95']:8.2f} {s['max']:8.2f} {s['rom']:8.2f}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
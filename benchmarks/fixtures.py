@@ -0,0 +1,223 @@
+"""Deterministic benchmark fixtures: synthetic clips and landmark recordings.
+
+Synthetic clips are written with ``cv2.VideoWriter`` from a parametric
+side-view runner drawn over a fixed textured background, so the same spec
+and seed always encode the same frames. Landscape specs are stored the way
+phones record sideways portrait clips (rotated counter-clockwise), which
+sends them down the app's rotation path::
+
+    python -m benchmarks.fixtures clips                 # every spec in CLIPS
+    python -m benchmarks.fixtures record videos/matt-palmer-back-run1.MP4 back_run
+
+``record`` runs the app's landmark extraction on a real clip and saves the
+buffer and its sampling metadata as ``fixtures/<name>.npz``, so the analysis
+and report stages can be timed without MediaPipe. ``synthetic_landmarks``
+gives the runner's exact landmarks (the ground truth the clips are drawn
+from) for any length and sample rate.
+"""
+
+import argparse
+import json
+from collections import namedtuple
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from stride_sync.kinematics import (LEFT_ANKLE, LEFT_FOOT, LEFT_HEEL, LEFT_HIP, LEFT_KNEE, LEFT_SHOULDER,
+                                    RIGHT_ANKLE, RIGHT_FOOT, RIGHT_HEEL, RIGHT_HIP, RIGHT_KNEE, RIGHT_SHOULDER)
+from stride_sync.landmarks import LANDMARK_COUNT, LandmarkBuffer
+
+FIXTURE_DIR = Path(__file__).resolve().parent / "fixtures"
+CLIP_DIR = FIXTURE_DIR / "clips"   # generated on demand, not committed
+
+ClipSpec = namedtuple("ClipSpec", ["width", "height", "fps", "seconds"])
+
+# Upright frame size; width > height means the clip is stored rotated
+CLIPS = {
+    "portrait_720p30": ClipSpec(720, 1280, 30, 6),
+    "landscape_1080p60": ClipSpec(1920, 1080, 60, 6),
+    "portrait_4k30": ClipSpec(2160, 3840, 30, 3),
+    "portrait_480p24_long": ClipSpec(480, 854, 24, 30),
+}
+
+CADENCE = 170               # steps per minute of the synthetic runner
+THIGH, SHANK, FOOT, TRUNK = 0.45, 0.43, 0.22, 0.52   # segment lengths in metres
+HIP_WIDTH, SHOULDER_WIDTH = 0.18, 0.36
+_LEFT_ELBOW, _RIGHT_ELBOW, _LEFT_WRIST, _RIGHT_WRIST = 13, 14, 15, 16
+BONES = ((LEFT_SHOULDER, RIGHT_SHOULDER), (LEFT_HIP, RIGHT_HIP),
+         (LEFT_SHOULDER, LEFT_HIP), (RIGHT_SHOULDER, RIGHT_HIP),
+         (LEFT_SHOULDER, _LEFT_ELBOW), (_LEFT_ELBOW, _LEFT_WRIST),
+         (RIGHT_SHOULDER, _RIGHT_ELBOW), (_RIGHT_ELBOW, _RIGHT_WRIST),
+         (LEFT_HIP, LEFT_KNEE), (LEFT_KNEE, LEFT_ANKLE), (LEFT_ANKLE, LEFT_HEEL), (LEFT_HEEL, LEFT_FOOT),
+         (LEFT_ANKLE, LEFT_FOOT),
+         (RIGHT_HIP, RIGHT_KNEE), (RIGHT_KNEE, RIGHT_ANKLE), (RIGHT_ANKLE, RIGHT_HEEL), (RIGHT_HEEL, RIGHT_FOOT),
+         (RIGHT_ANKLE, RIGHT_FOOT))
+
+
+def _direction(angle):
+    """Unit (forward, down) vector ``angle`` radians forward of straight down."""
+    return np.stack([np.sin(angle), np.cos(angle)], axis=-1)
+
+
+def synthetic_landmarks(n, sample_rate, cadence=CADENCE, noise=0.0, seed=0):
+    """Image and world landmarks of the synthetic runner, ``(n, 33, 4)`` float32 each.
+
+    The runner faces +x, seen from its left side. World landmarks are metric
+    and hip-centred with y down, like MediaPipe's; image landmarks are
+    normalised to an upright 9:16 frame. ``noise`` adds Gaussian jitter (in
+    normalised image units) to the image landmarks only.
+    """
+    t = np.arange(n) / sample_rate
+    phase = 2 * np.pi * cadence / 120 * t
+    world = np.zeros((n, LANDMARK_COUNT, 4))
+    world[..., 3] = 0.99
+
+    for sign, offset, (hip, knee, ankle, heel, toe, shoulder, elbow, wrist) in (
+            (1, 0.0, (LEFT_HIP, LEFT_KNEE, LEFT_ANKLE, LEFT_HEEL, LEFT_FOOT, LEFT_SHOULDER,
+                      _LEFT_ELBOW, _LEFT_WRIST)),
+            (-1, np.pi, (RIGHT_HIP, RIGHT_KNEE, RIGHT_ANKLE, RIGHT_HEEL, RIGHT_FOOT, RIGHT_SHOULDER,
+                         _RIGHT_ELBOW, _RIGHT_WRIST))):
+        p = phase + offset
+        thigh = np.radians(12 + 28 * np.sin(p))
+        knee_flexion = np.radians(55 - 45 * np.cos(p - 0.9))
+        shank = thigh - knee_flexion
+        foot = shank + np.radians(80 + 12 * np.sin(p - 0.5))
+        z = sign * HIP_WIDTH / 2
+        world[:, hip, :3] = [0, 0, z]
+        world[:, knee, [0, 1]] = THIGH * _direction(thigh)
+        world[:, ankle, [0, 1]] = world[:, knee, [0, 1]] + SHANK * _direction(shank)
+        world[:, toe, [0, 1]] = world[:, ankle, [0, 1]] + 0.8 * FOOT * _direction(foot)
+        world[:, heel, [0, 1]] = world[:, ankle, [0, 1]] - 0.2 * FOOT * _direction(foot) + [0, 0.05]
+        world[:, shoulder, :3] = [0.08, -TRUNK, sign * SHOULDER_WIDTH / 2]
+        arm = np.radians(-35 * np.sin(p))
+        world[:, elbow, [0, 1]] = world[:, shoulder, [0, 1]] + 0.28 * _direction(arm)
+        world[:, wrist, [0, 1]] = world[:, elbow, [0, 1]] + 0.25 * _direction(arm - np.radians(80))
+        for joint in (knee, ankle, heel, toe, elbow, wrist):
+            world[:, joint, 2] = z
+    # Face and hands sit on the head and wrists; only their position matters here
+    world[:, :11, :3] = world[:, [LEFT_SHOULDER, RIGHT_SHOULDER], :3].mean(axis=1, keepdims=True) + [0.1, -0.22, 0]
+    world[:, 17:23:2, :3] = world[:, [_LEFT_WRIST], :3]
+    world[:, 18:23:2, :3] = world[:, [_RIGHT_WRIST], :3]
+
+    # Side view: image x follows forward, image y follows down, plus a bounce twice per stride
+    image = world.copy()
+    bounce = 0.03 * np.cos(2 * phase)[:, None]
+    image[..., 0] = 0.5 + world[..., 0] * 0.3 * 16 / 9
+    image[..., 1] = 0.5 + (world[..., 1] + bounce) * 0.3
+    image[..., 2] = world[..., 2]
+    if noise:
+        image[..., :2] += np.random.default_rng(seed).normal(0, noise, image[..., :2].shape)
+    return image.astype(np.float32), world.astype(np.float32)
+
+
+def _background(width, height, seed):
+    """Smooth coloured texture and a ground band, so frames are not trivially compressible."""
+    rng = np.random.default_rng(seed)
+    coarse = rng.integers(40, 200, (max(2, height // 48), max(2, width // 48), 3), dtype=np.uint8)
+    background = cv2.resize(coarse, (width, height), interpolation=cv2.INTER_CUBIC)
+    background[int(height * 0.82):] = (60, 90, 60)
+    return background
+
+
+def draw_runner(canvas, landmarks):
+    """Draw one frame's image landmarks onto an upright ``canvas`` in place."""
+    height, width = canvas.shape[:2]
+    points = np.round(landmarks[:, :2] * [width, height]).astype(int)
+    thickness = max(2, height // 90)
+    for a, b in BONES:
+        cv2.line(canvas, tuple(points[a]), tuple(points[b]), (40, 40, 230), thickness, cv2.LINE_AA)
+    cv2.circle(canvas, tuple(points[0]), thickness * 3, (170, 200, 240), -1, cv2.LINE_AA)
+    return canvas
+
+
+def synthetic_clip(path, spec, seed=0):
+    """Encode the synthetic runner for ``spec`` to ``path`` (mp4v) and return the path."""
+    width, height, fps, seconds = spec
+    rotated = width > height
+    upright = (height, width) if rotated else (width, height)
+    n = int(round(fps * seconds))
+    image, _ = synthetic_landmarks(n, fps, seed=seed)
+    background = _background(*upright, seed)
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"mp4v"), fps, (width, height))
+    if not writer.isOpened():
+        raise RuntimeError(f"cv2.VideoWriter could not open {path}")
+    try:
+        for landmarks in image:
+            frame = draw_runner(background.copy(), landmarks)
+            # Stored as a sideways phone recording; the app rotates it back clockwise
+            writer.write(cv2.rotate(frame, cv2.ROTATE_90_COUNTERCLOCKWISE) if rotated else frame)
+    finally:
+        writer.release()
+    return path
+
+
+def clip_path(name, directory=CLIP_DIR, seed=0):
+    """Path of the synthetic clip ``name`` from ``CLIPS``, encoding it first if missing."""
+    path = Path(directory) / f"{name}_s{seed}.mp4"
+    if not path.exists():
+        synthetic_clip(path, CLIPS[name], seed)
+    return path
+
+
+def record_landmarks(video_path, gait_type, path, long_edge=None):
+    """Extract a real clip's landmarks the way the app does and save them as a fixture."""
+    from stride_sync.analysis import extract_landmarks
+
+    kwargs = {} if long_edge is None else dict(long_edge=long_edge)
+    buffer, meta = extract_landmarks(video_path, gait_type, **kwargs)
+    meta = dict(meta, frame_size=list(meta["frame_size"]), stage_stats={}, source=Path(video_path).name)
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    np.savez_compressed(path, meta=json.dumps(meta), **buffer.arrays())
+    return path
+
+
+def load_landmarks(path):
+    """``(LandmarkBuffer, meta)`` of a recorded fixture, ready for ``kinematics_from_landmarks``."""
+    with np.load(path) as data:
+        meta = json.loads(str(data["meta"]))
+        buffer = LandmarkBuffer.from_arrays(data["frames"], data["landmarks"], data["world"], data["detected"])
+    meta.pop("source", None)
+    meta["frame_size"] = tuple(meta["frame_size"])
+    return buffer, meta
+
+
+def synthetic_fixture(seconds, fps=30, frame_skip=3, noise=0.002, seed=0):
+    """``(LandmarkBuffer, meta)`` of the synthetic runner, shaped like a recorded fixture."""
+    n = int(seconds * fps / frame_skip)
+    image, world = synthetic_landmarks(n, fps / frame_skip, noise=noise, seed=seed)
+    buffer = LandmarkBuffer.from_arrays(np.arange(n) * frame_skip, image, world)
+    meta = dict(fps=float(fps), frame_skip=frame_skip, rotated=False, frame_size=(1080, 1920),
+                duration=n * frame_skip / fps, stage_stats={})
+    return buffer, meta
+
+
+def fixture_names(directory=FIXTURE_DIR):
+    return sorted(path.stem for path in Path(directory).glob("*.npz"))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    clips = commands.add_parser("clips", help="encode the synthetic clips")
+    clips.add_argument("names", nargs="*", default=list(CLIPS))
+    clips.add_argument("--seed", type=int, default=0)
+    record = commands.add_parser("record", help="save a real clip's landmarks as a fixture")
+    record.add_argument("video")
+    record.add_argument("name")
+    record.add_argument("--gait-type", default="running")
+    args = parser.parse_args(argv)
+
+    if args.command == "clips":
+        for name in args.names:
+            print(clip_path(name, seed=args.seed))
+    else:
+        print(record_landmarks(args.video, args.gait_type, FIXTURE_DIR / f"{args.name}.npz"))
+
+
+if __name__ == "__main__":
+    main()
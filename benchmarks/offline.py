@@ -0,0 +1,99 @@
+"""Live graph against batched offline inference on the app's sampled frames.
+
+For each clip both paths run on the frames ``extract_landmarks`` would
+sample. The script reports wall-clock frames per second, frames per
+CPU-second (``time.process_time``, all threads) and how closely the
+offline joint angles follow the live graph, as in ``benchmarks.downscale``::
+
+    python -m benchmarks.offline videos/matt-palmer-back-run1.MP4 --batch-size 10 --threads 4
+
+The live graph smooths landmarks over time and the offline path does not,
+so ``--raw`` also runs the live graph with ``smooth_landmarks=False``: the
+gap between the two live runs is the scale to judge the offline errors by.
+"""
+
+import argparse
+import json
+import time
+
+import mediapipe as mp
+
+from benchmarks.downscale import agreement
+from stride_sync.analysis import TARGET_SAMPLE_FPS, collect_landmarks, crop_range, is_rotated
+from stride_sync.offline import DEFAULT_BATCH, BatchPoseModel, collect_landmarks_offline
+from stride_sync.pose import DEFAULT_POSE_SETTINGS
+from stride_sync.video import FrameSource
+
+
+def timed_run(fn):
+    """``fn()``'s landmarks plus wall and CPU seconds."""
+    wall, cpu = time.perf_counter(), time.process_time()
+    buffer, _ = fn()
+    return buffer, time.perf_counter() - wall, time.process_time() - cpu
+
+
+def angle_errors(reference, buffer, sample_rate):
+    """Per joint: p95 per-frame angle error and range-of-motion error against ``reference``, in degrees."""
+    stats = agreement(reference.landmarks[:, :, :2].astype(float), buffer.landmarks[:, :, :2].astype(float),
+                      sample_rate)
+    return {joint: {key: None if values[key] is None else round(values[key], 2) for key in ("p95", "rom")}
+            for joint, values in stats.items()}
+
+
+def bench_clip(path, gait_type, model, raw=False):
+    with FrameSource(path) as source:
+        _, frame = source.read_frame(0)
+        rotated = is_rotated(frame, gait_type)
+        start, stop = crop_range(source.frame_count, source.fps)
+        step = max(1, int(source.fps // TARGET_SAMPLE_FPS))
+        sample_rate = source.fps / step
+
+        runs = {}
+        with mp.solutions.pose.Pose(**DEFAULT_POSE_SETTINGS) as pose:
+            runs["live"] = timed_run(lambda: collect_landmarks(pose, source, start, stop, step, rotated))
+        if raw:
+            with mp.solutions.pose.Pose(smooth_landmarks=False, **DEFAULT_POSE_SETTINGS) as pose:
+                runs["live_raw"] = timed_run(lambda: collect_landmarks(pose, source, start, stop, step, rotated))
+        with mp.solutions.pose.Pose(**DEFAULT_POSE_SETTINGS) as pose:
+            runs["offline"] = timed_run(lambda: collect_landmarks_offline(source, start, stop, step, rotated,
+                                                                          model, pose))
+
+    reference = runs["live"][0]
+    results = {}
+    for name, (buffer, wall, cpu) in runs.items():
+        frames = len(buffer)
+        results[name] = dict(frames=frames, detected=int(buffer.detected.sum()), wall_s=round(wall, 3),
+                             fps=round(frames / wall, 2), frames_per_cpu_s=round(frames / cpu, 2))
+        if name != "live":
+            results[name]["vs_live"] = angle_errors(reference, buffer, sample_rate)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("videos", nargs="+")
+    parser.add_argument("--gait-type", default="running")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH)
+    parser.add_argument("--threads", type=int, default=None, help="interpreter threads (default: every core)")
+    parser.add_argument("--raw", action="store_true", help="also run the live graph without smoothing")
+    parser.add_argument("--json", help="write the results to this file")
+    args = parser.parse_args(argv)
+
+    model = BatchPoseModel(batch_size=args.batch_size, num_threads=args.threads)
+    results = {"batch_size": args.batch_size, "threads": args.threads, "clips": {}}
+    for path in args.videos:
+        clip = results["clips"][path] = bench_clip(path, args.gait_type, model, args.raw)
+        print(path)
+        for name, run in clip.items():
+            print(f"  {name:<9} {run['detected']:>4}/{run['frames']:<4} {run['fps']:8.1f} fps "
+                  f"{run['frames_per_cpu_s']:8.1f} frames/CPU-s")
+            for joint, error in run.get("vs_live", {}).items():
+                print(f"    {joint:<14} p95 {error['p95']} deg, ROM {error['rom']} deg")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
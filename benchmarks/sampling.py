@@ -0,0 +1,213 @@
+"""Report accuracy of sparser and adaptive pose sampling against a dense-sampled baseline.
+
+Each clip is inferred once at full frame rate; that series, analysed the
+way the Gait page analyses a clip, is the reference. Every sampling rate
+is then simulated by taking every n-th dense frame, at every phase offset,
+and analysed twice: as is, and smoothed onto the app's 10 Hz grid by
+``stride_sync.smoothing``. The adaptive sampler (``stride_sync.adaptive``)
+is simulated the same way: its coarse pass at every offset, its dense pass
+from the dense frames it asks for. The script reports the frames each
+strategy infers, the mean and worst error in peak angle, trough angle and
+range of motion over the lower-limb joints, the error in the knees' peak
+flexion, and the signed peak error of every lower-limb joint (so a
+strategy that helps the knees but distorts the ankles shows up)::
+
+    python -m benchmarks.sampling videos/matt-palmer-back-run1.MP4 --rates 10 7.5 6 5
+
+``--dropout``/``--outliers`` drop that fraction of the samples and throw
+that fraction of landmarks off course to see how both paths degrade.
+``--infer`` also runs real inference with the fixed 10 Hz stride, each
+smoothed rate and the adaptive sampler, and reports their wall time and
+errors: tracking behaves a little differently on sparse or jumping frames
+than in a subsampled dense run.
+"""
+
+import argparse
+import json
+import time
+
+import numpy as np
+
+from stride_sync.adaptive import (COARSE_SAMPLE_FPS, DENSE_SAMPLE_FPS, READOUT_ACCELERATION, coarse_extrema,
+                                  dense_frames, merge)
+from stride_sync.analysis import (CUTOFF_FREQUENCY, PEAK_MIN_SECONDS, PEAK_PROMINENCE, TARGET_SAMPLE_FPS,
+                                  analyze_kinematics, collect_landmarks, collect_landmarks_adaptive, crop_range,
+                                  is_rotated, kinematics_from_landmarks)
+from stride_sync.landmarks import LandmarkBuffer
+from stride_sync.pose import DEFAULT_POSE_SETTINGS, default_pool
+from stride_sync.smoothing import smooth_landmarks
+from stride_sync.video import FrameSource
+
+JOINTS = ("left_hip", "right_hip", "left_knee", "right_knee", "left_ankle", "right_ankle")
+KNEES = ("left_knee", "right_knee")
+
+
+def infer(source, start, stop, step, rotated, adaptive=False):
+    """Landmarks of every ``step``-th frame in [start, stop) (or adaptively sampled) and the wall seconds."""
+    wall = time.perf_counter()
+    with default_pool().checkout(**DEFAULT_POSE_SETTINGS) as pose:
+        if adaptive:
+            buffer, _ = collect_landmarks_adaptive(pose, source, start, stop, rotated)
+        else:
+            buffer, _ = collect_landmarks(pose, source, start, stop, step, rotated)
+    return buffer, time.perf_counter() - wall
+
+
+def summarize(buffer, meta, step, gait_type):
+    """Peak, trough and ROM of every joint for a buffer sampled every ``step`` frames."""
+    kinematics = kinematics_from_landmarks(buffer, dict(meta, frame_skip=step))
+    joints = analyze_kinematics(kinematics, gait_type, "back").joints
+    return {joint: (joints[joint].max_angle, joints[joint].min_angle, joints[joint].rom) for joint in JOINTS}
+
+
+def errors(reference, summary):
+    """Mean and worst absolute error (degrees) over joints and over peak, trough and ROM, the knee peak error,
+    then the signed peak error of each of ``JOINTS``."""
+    diff = np.abs(np.array([summary[joint] for joint in JOINTS]) - np.array([reference[joint] for joint in JOINTS]))
+    knee_peak = np.mean([abs(summary[joint][0] - reference[joint][0]) for joint in KNEES])
+    peaks = [summary[joint][0] - reference[joint][0] for joint in JOINTS]
+    return (float(np.nanmean(diff)), float(np.nanmax(diff)), float(knee_peak)) + tuple(float(v) for v in peaks)
+
+
+def corrupt(buffer, dropout, outliers, rng):
+    """Copy of ``buffer`` with samples dropped and landmarks knocked off course at low visibility."""
+    landmarks, world, detected = buffer.landmarks.copy(), buffer.world.copy(), buffer.detected.copy()
+    detected &= rng.random(len(detected)) >= dropout
+    hit = rng.random(landmarks.shape[:2]) < outliers
+    landmarks[hit, :2] += rng.normal(0.0, 0.08, (int(hit.sum()), 2))
+    landmarks[hit, 3] *= 0.3
+    landmarks[~detected] = np.nan
+    world[~detected] = np.nan
+    return LandmarkBuffer.from_arrays(buffer.frames.copy(), landmarks, world, detected)
+
+
+def rows_of(dense, frames):
+    """The dense run's rows at ``frames``, as if only those had been inferred."""
+    rows = np.searchsorted(dense.frames, frames)
+    return LandmarkBuffer.from_arrays(dense.frames[rows], dense.landmarks[rows], dense.world[rows],
+                                      dense.detected[rows])
+
+
+def simulate_adaptive(dense, fps, start, stop, offset, degrade):
+    """The adaptive sampler's two passes taken from the dense run, coarse pass starting at ``offset``."""
+    coarse = degrade(rows_of(dense, np.arange(start + offset, stop, max(1, int(fps // COARSE_SAMPLE_FPS)))))
+    extrema, _ = coarse_extrema(coarse, fps, start, stop, PEAK_PROMINENCE, max(1.0, fps * PEAK_MIN_SECONDS),
+                                CUTOFF_FREQUENCY)
+    fixed = len(range(start, stop, max(1, int(fps // TARGET_SAMPLE_FPS))))
+    positions = dense_frames(extrema, start, stop, max(1, int(fps // DENSE_SAMPLE_FPS)), coarse.frames,
+                             max(0, fixed - len(coarse) - 1))
+    return merge(coarse, degrade(rows_of(dense, positions)))
+
+
+def report(values):
+    return [round(v, 2) for v in np.mean(values, axis=0)]
+
+
+def peak_line(errors):
+    """The signed per-joint peak errors at the end of ``errors`` as one printable line."""
+    return "      peak error by joint: " + ", ".join(
+        f"{joint} {value:+.1f}" for joint, value in zip(JOINTS, errors[3:]))
+
+
+def bench_clip(path, gait_type, rates, dropout=0.0, outliers=0.0, run_inference=False, seed=0):
+    rng = np.random.default_rng(seed)
+
+    def degrade(buffer):
+        return corrupt(buffer, dropout, outliers, rng) if dropout or outliers else buffer
+
+    with FrameSource(path) as source:
+        _, frame = source.read_frame(0)
+        rotated = is_rotated(frame, gait_type)
+        start, stop = crop_range(source.frame_count, source.fps)
+        fps = source.fps
+        frame_size = (source.height, source.width) if rotated else (source.width, source.height)
+        meta = dict(fps=fps, rotated=rotated, frame_size=frame_size,
+                    duration=(stop - start) / fps, stage_stats={})
+        dense, dense_s = infer(source, start, stop, 1, rotated)
+        grid_step = max(1, int(fps // TARGET_SAMPLE_FPS))
+        dense_step = max(1, int(fps // DENSE_SAMPLE_FPS))
+        real = {}
+        if run_inference:
+            real["fixed"] = infer(source, start, stop, grid_step, rotated)
+            for rate in rates:
+                real[rate] = infer(source, start, stop, max(1, int(fps // rate)), rotated)
+            real["adaptive"] = infer(source, start, stop, dense_step, rotated, adaptive=True)
+
+    reference = summarize(dense, meta, 1, gait_type)
+    results = {"dense": dict(frames=len(dense), wall_s=round(dense_s, 3))}
+    for rate in rates:
+        step = max(1, int(fps // rate))
+        plain, smoothed = [], []
+        for offset in range(step):
+            buffer = degrade(rows_of(dense, np.arange(start + offset, stop, step)))
+            plain.append(errors(reference, summarize(buffer, meta, step, gait_type)))
+            grid, _ = smooth_landmarks(buffer, fps, grid_step, start, stop)
+            smoothed.append(errors(reference, summarize(grid, meta, grid_step, gait_type)))
+        results[rate] = dict(step=step, frames=len(range(start, stop, step)), plain=report(plain),
+                             smoothed=report(smoothed))
+
+    coarse_step = max(1, int(fps // COARSE_SAMPLE_FPS))
+    frames, adaptive = [], []
+    for offset in range(coarse_step):
+        buffer = simulate_adaptive(dense, fps, start, stop, offset, degrade)
+        frames.append(len(buffer))
+        grid, _ = smooth_landmarks(buffer, fps, dense_step, start, stop, acceleration_scale=READOUT_ACCELERATION)
+        adaptive.append(errors(reference, summarize(grid, meta, dense_step, gait_type)))
+    results["adaptive"] = dict(frames=round(float(np.mean(frames)), 1), smoothed=report(adaptive))
+
+    if real:
+        results["inferred"] = {}
+        for name, (buffer, wall) in real.items():
+            if name == "fixed":
+                summary = summarize(buffer, meta, grid_step, gait_type)
+            elif name == "adaptive":
+                grid, _ = smooth_landmarks(buffer, fps, dense_step, start, stop,
+                                           acceleration_scale=READOUT_ACCELERATION)
+                summary = summarize(grid, meta, dense_step, gait_type)
+            else:
+                summary = summarize(smooth_landmarks(buffer, fps, grid_step, start, stop)[0], meta, grid_step,
+                                    gait_type)
+            results["inferred"][name] = dict(frames=len(buffer), wall_s=round(wall, 3),
+                                             errors=[round(v, 2) for v in errors(reference, summary)])
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("videos", nargs="+")
+    parser.add_argument("--gait-type", default="running")
+    parser.add_argument("--rates", type=float, nargs="+", default=[10, 7.5, 6, 5])
+    parser.add_argument("--dropout", type=float, default=0.0, help="fraction of samples without a pose")
+    parser.add_argument("--outliers", type=float, default=0.0, help="fraction of landmarks thrown off")
+    parser.add_argument("--infer", action="store_true", help="also run real inference for each strategy")
+    parser.add_argument("--json", help="write the results to this file")
+    args = parser.parse_args(argv)
+
+    results = {}
+    for path in args.videos:
+        clip = results[path] = bench_clip(path, args.gait_type, args.rates, args.dropout, args.outliers, args.infer)
+        print(f"{path}: dense {clip['dense']['frames']} frames in {clip['dense']['wall_s']} s")
+        print("  sampling   frames   plain mean/max/knee peak   smoothed mean/max/knee peak (deg)")
+        for rate in args.rates:
+            run = clip[rate]
+            print(f"  {rate:<6} fps {run['frames']:>6}   {run['plain'][0]:5.1f} / {run['plain'][1]:5.1f} / "
+                  f"{run['plain'][2]:4.1f}     {run['smoothed'][0]:5.1f} / {run['smoothed'][1]:5.1f} / "
+                  f"{run['smoothed'][2]:4.1f}")
+            print(peak_line(run["smoothed"]))
+        run = clip["adaptive"]
+        print(f"  adaptive   {run['frames']:>6}   {'':>22}     {run['smoothed'][0]:5.1f} / "
+              f"{run['smoothed'][1]:5.1f} / {run['smoothed'][2]:4.1f}")
+        print(peak_line(run["smoothed"]))
+        for name, run in clip.get("inferred", {}).items():
+            label = f"{name} fps" if not isinstance(name, str) else name
+            print(f"  inferred {label:<10} {run['frames']:>4} frames {run['wall_s']:6.2f} s   "
+                  f"{run['errors'][0]:5.1f} / {run['errors'][1]:5.1f} / {run['errors'][2]:4.1f}")
+            print(peak_line(run["errors"]))
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,332 @@
+"""Per-stage timings of the Gait page on fixed fixtures, saved as JSON.
+
+Every stage the page goes through is timed on the same inputs, so two runs
+(before and after a change) can be compared number for number::
+
+    python -m benchmarks.suite --json before.json
+    ... change something ...
+    python -m benchmarks.suite --json after.json --compare before.json
+
+Stages:
+
+- ``decode``: sampled-frame decode rate of each synthetic clip (``CLIPS``)
+  through ``FrameSource`` at the app's crop range and sample step;
+- ``inference``: ``to_model_input`` + ``pose.process`` per frame, and the
+  full threaded ``collect_landmarks`` path, on the first ``--max-frames``
+  sampled frames of each clip (add real clips with ``--video``);
+- ``analysis``: joint angles, filtering, peak segmentation, gait events,
+  ensembles and the whole ``analyze_kinematics`` on each landmark fixture
+  (the recorded ``fixtures/*.npz`` plus a synthetic 60 s session);
+- ``report``: the page's Plotly figures and ``generate_pdf``. These live in
+  ``pages/gait.py``, so they need its dependencies (Streamlit, fpdf, ...)
+  and ``generate_pdf`` fetches the logo over the network; a stage that
+  cannot run is recorded with its error instead of failing the suite.
+
+Times are the median of ``--repeat`` runs; rates are frames per second.
+
+Before timing anything the suite checks the vectorised analysis steps
+against known answers (``check_known_answers``), so a speed-up that changes
+the numbers fails the run instead of showing up as a better time.
+"""
+
+import argparse
+import importlib.util
+import json
+import os
+import platform
+import subprocess
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from benchmarks.fixtures import CLIPS, FIXTURE_DIR, clip_path, fixture_names, load_landmarks, synthetic_fixture
+from stride_sync.analysis import (CUTOFF_FREQUENCY, JOINTS, PEAK_MIN_SECONDS, PEAK_PROMINENCE, TARGET_SAMPLE_FPS,
+                                  analyze_kinematics, collect_landmarks, crop_range, is_rotated,
+                                  kinematics_from_landmarks)
+from stride_sync.cycles import cycle_stats, detect_mins, detect_peaks, segment_cycles
+from stride_sync.ensemble import PERCENT, cycle_ensemble
+from stride_sync.events import detect_gait_events
+from stride_sync.filtering import bridge_gaps, butter_lowpass_filter
+from stride_sync.landmarks import LandmarkBuffer, pose_array
+from stride_sync.pose import DEFAULT_POSE_SETTINGS, default_pool
+from stride_sync.store import SessionStore, on_grid
+from stride_sync.video import DEFAULT_LONG_EDGE, FrameSource, to_model_input
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+SYNTHETIC_SESSION_SECONDS = 60
+
+
+def timed(fn, repeat=1):
+    """Median wall-clock seconds of ``repeat`` calls and the last call's result."""
+    times, result = [], None
+    for _ in range(max(1, repeat)):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return float(np.median(times)), result
+
+
+def environment():
+    """What the numbers were measured on."""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    try:
+        import mediapipe
+        mediapipe_version = mediapipe.__version__
+    except ImportError:
+        mediapipe_version = None
+    return dict(commit=commit, time=time.strftime("%Y-%m-%dT%H:%M:%S"), python=platform.python_version(),
+                platform=platform.platform(), cpus=os.cpu_count(), numpy=np.__version__, opencv=cv2.__version__,
+                mediapipe=mediapipe_version, long_edge=DEFAULT_LONG_EDGE)
+
+
+def sample_plan(source, gait_type):
+    """(start, stop, step, rotated) the app would use for ``source``."""
+    ok, frame = source.read_frame(0)
+    if not ok:
+        raise ValueError(f"Couldn't read from {source.video_path}")
+    start, stop = crop_range(source.frame_count, source.fps)
+    return start, stop, max(1, int(source.fps // TARGET_SAMPLE_FPS)), is_rotated(frame, gait_type)
+
+
+def bench_decode(video_path, gait_type):
+    with FrameSource(video_path) as source:
+        start, stop, step, _ = sample_plan(source, gait_type)
+        begin = time.perf_counter()
+        n = sum(1 for _ in source.frames(start, stop, step))
+        seconds = time.perf_counter() - begin
+        return dict(frames=n, seconds=seconds, fps=n / seconds if seconds else None,
+                    grabbed=source.frames_grabbed, seeks=source.seeks, size=[source.width, source.height])
+
+
+def bench_inference(video_path, gait_type, max_frames):
+    with FrameSource(video_path) as source:
+        start, stop, step, rotated = sample_plan(source, gait_type)
+        stop = min(stop, start + max_frames * step)
+        frames = [frame for _, frame in source.frames(start, stop, step)]
+    n = len(frames)
+    landmarks = LandmarkBuffer(n).landmarks
+    prep = infer = 0.0
+    detected = 0
+    with default_pool().checkout(**DEFAULT_POSE_SETTINGS) as pose:
+        pose.process(to_model_input(frames[0], rotated))  # model warm-up
+        pose.reset()
+        for i, frame in enumerate(frames):
+            begin = time.perf_counter()
+            model_input = to_model_input(frame, rotated)
+            prepared = time.perf_counter()
+            results = pose.process(model_input)
+            infer += time.perf_counter() - prepared
+            prep += prepared - begin
+            detected += pose_array(results, landmarks[i]) is not None
+        pose.reset()
+
+        # The threaded decode -> ROI crop -> inference path the page actually runs
+        with FrameSource(video_path) as source:
+            begin = time.perf_counter()
+            buffer, stages = collect_landmarks(pose, source, start, stop, step, rotated)
+            pipeline = time.perf_counter() - begin
+    return dict(frames=n, detected=int(detected), prep_ms=prep / n * 1000, infer_ms=infer / n * 1000,
+                inference_fps=n / infer if infer else None,
+                pipeline_fps=len(buffer) / pipeline if pipeline else None,
+                pipeline_detected=int(buffer.detected[:len(buffer)].sum()),
+                pipeline_stages=stages)
+
+
+def bench_analysis(buffer, meta, repeat):
+    """Milliseconds of each analysis step on one landmark fixture."""
+    sample_rate = meta["fps"] / meta["frame_skip"]
+    # SessionStore compacts its buffer in place, so every run starts from a fresh copy
+    def fresh():
+        return LandmarkBuffer.from_arrays(*(array.copy() for array in (
+            buffer.frames, buffer.landmarks, buffer.world, buffer.detected)))
+
+    angles_s, store = timed(lambda: SessionStore(fresh(), JOINTS, meta["fps"]), repeat)
+    positions = store.grid_positions(meta["frame_skip"])
+    raw = on_grid(store.angles, positions)
+    filter_s, filtered = timed(lambda: butter_lowpass_filter(raw, CUTOFF_FREQUENCY, sample_rate), repeat)
+    distance = max(1.0, sample_rate * PEAK_MIN_SECONDS)
+    peaks_s, _ = timed(lambda: segment_cycles(bridge_gaps(filtered), PEAK_PROMINENCE, distance), repeat)
+    events_s, events = timed(lambda: detect_gait_events(store.world, store.time, sample_rate, positions), repeat)
+
+    kinematics = kinematics_from_landmarks(fresh(), meta)
+    analyze_s, result = timed(lambda: analyze_kinematics(kinematics, "running", "side"), repeat)
+
+    def ensembles():
+        result.__dict__.pop("ensembles", None)  # drop the cached_property value
+        return result.ensembles
+
+    ensembles_s, _ = timed(ensembles, repeat)
+    return dict(samples=len(store), sample_rate=sample_rate, angles_ms=angles_s * 1000, filter_ms=filter_s * 1000,
+                peaks_ms=peaks_s * 1000, events_ms=events_s * 1000, analyze_ms=analyze_s * 1000,
+                ensembles_ms=ensembles_s * 1000,
+                cadence=None if events is None else events.cadence), result
+
+
+def check_cycles(rng):
+    """``segment_cycles`` against ``find_peaks`` per row, and ``cycle_stats`` against a loop over strides."""
+    table = np.cumsum(rng.normal(0.0, 3.0, (7, 400)), axis=1)
+    table[2, 50:60] = np.nan  # a dropout must not leak peaks into the neighbouring rows
+    for distance in (1, 4.5, 15):
+        peaks, mins = segment_cycles(table, PEAK_PROMINENCE, distance)
+        for row, found_peaks, found_mins in zip(table, peaks, mins):
+            np.testing.assert_array_equal(found_peaks, detect_peaks(row, PEAK_PROMINENCE, distance))
+            np.testing.assert_array_equal(found_mins, detect_mins(row, PEAK_PROMINENCE, distance))
+
+    values = table[0]
+    found = detect_peaks(values, PEAK_PROMINENCE, 4.5)
+    stats = cycle_stats(values, found)
+    cycles = [values[a:b] for a, b in zip(found[:-1], found[1:])]
+    np.testing.assert_array_equal(stats["cycle"], np.arange(1, len(cycles) + 1))
+    np.testing.assert_allclose(stats["mean"], [c.mean() for c in cycles])
+    np.testing.assert_allclose(stats["std"], [c.std() for c in cycles], atol=1e-9)
+    np.testing.assert_array_equal(stats["max"], [c.max() for c in cycles])
+    np.testing.assert_array_equal(stats["min"], [c.min() for c in cycles])
+    assert len(cycle_stats(values, found[:1])) == 0
+
+
+def check_ensemble():
+    """``cycle_ensemble`` of a sine with fractional cycle starts is one period on the 101-point grid."""
+    period, phase = 200.5, 3.25
+    values = 30 * np.sin(2 * np.pi * (np.arange(2000) - phase) / period)
+    starts = phase + period * np.arange(9)
+    ensemble = cycle_ensemble(values, starts)
+    assert ensemble.curves.shape == (8, len(PERCENT))
+    # Linear interpolation of 200 samples per period is within 30 * (2 pi / 200)^2 / 8 degrees
+    np.testing.assert_allclose(ensemble.mean, 30 * np.sin(2 * np.pi * PERCENT / 100), atol=4e-3)
+    np.testing.assert_allclose(ensemble.sd, 0, atol=4e-3)
+    assert np.isnan(cycle_ensemble(values, starts[:1]).mean).all()
+
+
+def check_known_answers(seed=0):
+    """Fail loudly if a vectorised analysis step no longer gives the reference result."""
+    check_cycles(np.random.default_rng(seed))
+    check_ensemble()
+
+
+def load_gait_page():
+    """``pages/gait.py`` as a module, without running the page."""
+    spec = importlib.util.spec_from_file_location("gait_page", REPO_ROOT / "pages" / "gait.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def bench_report(result, repeat):
+    """Plotly figure build and ``generate_pdf`` milliseconds for one analysed result."""
+    gait = load_gait_page()
+    time_axis, angles = np.asarray(result.time), result.angles
+    frame_time = float(time_axis[len(time_axis) // 2])
+
+    def figures():
+        figs = [gait.plot_joint_angles(time_axis, angles[joint], joint, frame_time) for joint in JOINTS]
+        figs.append(gait.plot_asymmetry_bar_chart(*(result.joints[joint].rom for joint in JOINTS[1:])))
+        figs += [gait.plot_gait_cycle_ensemble(result.ensembles, base, base.title())
+                 for base in ("hip", "knee", "ankle")]
+        return figs
+
+    plotly_s, figs = timed(figures, repeat)
+    stats = dict(plotly_figures=len(figs), plotly_ms=plotly_s * 1000)
+    text_info = {f"{joint.replace('_', ' ')}{suffix}": "" for joint in JOINTS for suffix in ("", " summary")}
+    text_info["spine"] = text_info["spine summary"] = ""
+    pdf_s, _ = timed(lambda: gait.generate_pdf(None, result.rom_table(), None, None, text_info, "side", "running",
+                                               "benchmark", ensembles=result.ensembles), repeat)
+    stats["generate_pdf_ms"] = pdf_s * 1000
+    return stats
+
+
+def _stage(results, name, fn):
+    """Run one benchmark, recording its error instead of aborting the suite."""
+    try:
+        results[name] = fn()
+    except Exception as error:  # missing optional dependency, no network, unreadable clip, ...
+        results[name] = dict(error=f"{type(error).__name__}: {error}")
+    return results[name]
+
+
+def flatten(results, prefix=""):
+    """``{"a.b.c": number}`` of every numeric leaf, for comparing runs."""
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, name + "."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+
+def compare(before, after):
+    """Print every timing/rate present in both runs with its relative change."""
+    old, new = flatten(before), flatten(after)
+    print(f"\n{'metric':<60} {'before':>10} {'after':>10} {'change':>8}")
+    for name in sorted(old.keys() & new.keys()):
+        if not name.endswith(("_ms", "fps", "seconds")) or not old[name]:
+            continue
+        print(f"{name:<60} {old[name]:10.2f} {new[name]:10.2f} {(new[name] / old[name] - 1) * 100:7.1f}%")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clips", nargs="*", default=list(CLIPS), help="synthetic clip specs to decode and infer")
+    parser.add_argument("--video", nargs="*", default=[], help="real clips to add to decode/inference")
+    parser.add_argument("--gait-type", default="running")
+    parser.add_argument("--fixtures", nargs="*", default=None, help="landmark fixtures (default: all recorded)")
+    parser.add_argument("--max-frames", type=int, default=60, help="sampled frames per clip for inference")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--skip", nargs="*", default=[], choices=["decode", "inference", "analysis", "report"])
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--compare", help="earlier --json output to compare against")
+    args = parser.parse_args(argv)
+
+    check_known_answers()
+    results = dict(environment=environment(), decode={}, inference={}, analysis={}, report={})
+    videos = {name: clip_path(name) for name in args.clips}
+    videos.update({Path(path).name: path for path in args.video})
+    for name, path in videos.items():
+        if "decode" not in args.skip:
+            stats = _stage(results["decode"], name, lambda: bench_decode(path, args.gait_type))
+            print(f"decode    {name:<28} {stats.get('fps') or 0:8.1f} fps  {stats.get('error', '')}")
+        if "inference" not in args.skip:
+            stats = _stage(results["inference"], name,
+                           lambda: bench_inference(path, args.gait_type, args.max_frames))
+            print(f"inference {name:<28} {stats.get('inference_fps') or 0:8.1f} fps  "
+                  f"pipeline {stats.get('pipeline_fps') or 0:6.1f} fps  {stats.get('error', '')}")
+
+    analysed = None
+    if not {"analysis", "report"} <= set(args.skip):
+        fixtures = {name: load_landmarks(FIXTURE_DIR / f"{name}.npz")
+                    for name in (fixture_names() if args.fixtures is None else args.fixtures)}
+        fixtures[f"synthetic_{SYNTHETIC_SESSION_SECONDS}s"] = synthetic_fixture(SYNTHETIC_SESSION_SECONDS)
+        for name, (buffer, meta) in fixtures.items():
+            stats, result = bench_analysis(buffer, meta, args.repeat)
+            # The report is built from the first (recorded, when there is one) fixture
+            analysed = analysed or result
+            results["analysis"][name] = stats
+            print(f"analysis  {name:<28} angles {stats['angles_ms']:.2f} ms  filter {stats['filter_ms']:.2f} ms  "
+                  f"peaks {stats['peaks_ms']:.2f} ms  events {stats['events_ms']:.2f} ms  "
+                  f"analyze {stats['analyze_ms']:.2f} ms  ensembles {stats['ensembles_ms']:.2f} ms")
+
+    if "report" not in args.skip and analysed is not None:
+        stats = _stage(results, "report", lambda: bench_report(analysed, max(1, args.repeat // 2)))
+        if "error" in stats:
+            print(f"report    skipped: {stats['error']}")
+        else:
+            print(f"report    plotly {stats['plotly_ms']:.1f} ms for {stats['plotly_figures']} figures  "
+                  f"generate_pdf {stats['generate_pdf_ms']:.1f} ms")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), results)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,12 +4,12 @@
 
 
 
-import gc  # For memory management
 import os
 import smtplib
 import tempfile
 import time
 from datetime import datetime
+from functools import wraps
 from email import encoders
 from email.message import EmailMessage
 from email.mime.base import MIMEBase
@@ -33,7 +33,13 @@ import matplotlib.colors as mcolors
 from matplotlib.colors import LinearSegmentedColormap
 from mediapipe import solutions
 from PIL import Image, ImageOps
-from scipy.signal import butter, find_peaks, lfilter
+
+from stride_sync.analysis import analyze_kinematics, load_kinematics
+from stride_sync.cache import LandmarkCache
+from stride_sync.ensemble import PERCENT
+from stride_sync.pose import DEFAULT_POSE_SETTINGS, default_pool
+from stride_sync.profiling import CAPTURES, annotate, current, profiling, span, traced
+from stride_sync.session import load_session_kinematics
 # from sklearn.decomposition import PCA
 
 # project_ID = "stride-sync-469315"
@@ -76,6 +82,7 @@ def get_color(value, good_range, moderate_range):
     else:
         return "lightcoral"
     
+@traced()
 def create_spider_matplotlib(camera_side, gait_type, rom_values, joint_labels, save_path,
                             bad_rom_outer=None, bad_rom_inner=None, moderate_rom_outer=None, 
                             moderate_rom_inner=None, ideal_rom_outer=None, ideal_rom_inner=None):
@@ -282,6 +289,7 @@ def create_spider_matplotlib(camera_side, gait_type, rom_values, joint_labels, s
     fig.savefig(save_path, dpi=300, facecolor=fig.get_facecolor(), bbox_inches="tight")    
     plt.close(fig)
 
+@traced()
 def create_asymmetry_bar_matplotlib(asymmetry_dict, save_path):
     """Create & save a horizontal bar chart for asymmetry with a green-yellow-red scale."""
     joints  = list(asymmetry_dict.keys())
@@ -343,7 +351,33 @@ def create_asymmetry_bar_matplotlib(asymmetry_dict, save_path):
                 facecolor=fig.get_facecolor())
     plt.close(fig)
 
-def generate_pdf(pose_image_path, df_rom, spider_plot, asymmetry_plot, text_info, camera_side, gait_type, user_footwear):
+@traced()
+def create_ensemble_matplotlib(ensembles, save_path):
+    """Save mean ± SD gait-cycle curves of hip, knee and ankle (left and right) side by side."""
+    fig, axes = plt.subplots(1, 3, figsize=(9, 2.8), dpi=300)
+    fig.patch.set_facecolor("black")
+    for ax, base in zip(axes, ("hip", "knee", "ankle")):
+        ax.set_facecolor("black")
+        for side, color in (("left", "deepskyblue"), ("right", "lightgreen")):
+            ensemble = ensembles[f"{side}_{base}"]
+            if not ensemble.n_cycles:
+                continue
+            ax.fill_between(PERCENT, ensemble.mean - ensemble.sd, ensemble.mean + ensemble.sd, color=color, alpha=0.25)
+            ax.plot(PERCENT, ensemble.mean, color=color, linewidth=1.5, label=f"{side.title()} ({ensemble.n_cycles})")
+        ax.set_title(base.title(), color="white", fontweight="bold")
+        ax.set_xlabel("Gait Cycle (%)", color="white")
+        ax.tick_params(colors="white")
+        for spine in ax.spines.values():
+            spine.set_color("white")
+        ax.legend(fontsize=7, facecolor="black", labelcolor="white", frameon=False)
+    axes[0].set_ylabel("Angle (°)", color="white")
+
+    plt.tight_layout()
+    fig.savefig(save_path, bbox_inches="tight", dpi=300, facecolor=fig.get_facecolor())
+    plt.close(fig)
+
+@traced()
+def generate_pdf(pose_image_path, df_rom, spider_plot, asymmetry_plot, text_info, camera_side, gait_type, user_footwear, ensembles=None):
     """Generates a PDF with the pose estimation, given plots, and text. FPDF document (A4 size, 210mm width x 297mm height)"""
     pdf = CustomPDF()
     pdf.set_auto_page_break(auto=True, margin=15)
@@ -365,7 +399,8 @@ def generate_pdf(pose_image_path, df_rom, spider_plot, asymmetry_plot, text_info
     # add logo in the top right corner
     github_url = "https://raw.githubusercontent.com/dholling4/markerless_project/main/"
     logo_path = github_url + "stride sycn logo stacked white.png"
-    logo = requests.get(logo_path)
+    with span("pdf_logo_download"):
+        logo = requests.get(logo_path)
     logo_img = Image.open(BytesIO(logo.content))
     logo_img_path = tempfile.mktemp(suffix=".png")
     logo_img.save(logo_img_path)
@@ -607,9 +642,10 @@ def generate_pdf(pose_image_path, df_rom, spider_plot, asymmetry_plot, text_info
 
     # -- SAVE ONCE, *after* everything is styled -------------------------------
     plt.tight_layout(pad=0.1)
-    fig.savefig(rom_chart_path,
-                bbox_inches="tight",
-                facecolor=fig.get_facecolor())
+    with span("pdf_rom_table_render"):
+        fig.savefig(rom_chart_path,
+                    bbox_inches="tight",
+                    facecolor=fig.get_facecolor())
 
     # Place ROM Table - moved up and centered
     pdf.image(rom_chart_path, x=40, y=165, w=130)  # Moved up from 170 to 165, centered more 
@@ -1020,37 +1056,106 @@ def generate_pdf(pose_image_path, df_rom, spider_plot, asymmetry_plot, text_info
     pdf.cell(90, 5, "Scan QR code for more info", align='C')
     pdf.image(qr_code_path, x=155, y=265, w=30)  # Adjusted x position for better centering
 
+    # ✅ Gait-cycle curves (same ensembles as the app's Stride Cycle Analysis)
+    if ensembles:
+        pdf.add_page()
+        pdf.set_font("Arial", style='B', size=16)
+        pdf.set_text_color(96, 194, 228)
+        pdf.cell(190, 10, "Average Gait Cycle (mean ± SD)", ln=True, align='C')
+        ensemble_plot_path = tempfile.mktemp(suffix=".png")
+        create_ensemble_matplotlib(ensembles, ensemble_plot_path)
+        pdf.image(ensemble_plot_path, x=10, y=25, w=190)
+
     # ✅ Save PDF
     pdf_file_path = tempfile.mktemp(suffix=".pdf")
-    pdf.output(pdf_file_path)
+    with span("pdf_output"):
+        pdf.output(pdf_file_path)
     
     return pdf_file_path
 
-def detect_peaks(data, column, prominence, distance):
-    peaks, _ = find_peaks(data[column], prominence=prominence, distance=distance)
-    return peaks
-
-def detect_mins(data, column, prominence, distance):
-    mins, _ = find_peaks(-data[column], prominence=prominence, distance=distance)
-    return mins
-
-def compute_stats(data, peaks, column):
-    cycle_stats = []
-    for i in range(len(peaks) - 1):
-        cycle_data = data[column][peaks[i]:peaks[i + 1]]
-        cycle_stats.append({
-            "Cycle": i + 1,
-            "Mean": np.mean(cycle_data),
-            "Std Dev": np.std(cycle_data),
-            "Max": np.max(cycle_data),
-            "Min": np.min(cycle_data)
-        })
-    return pd.DataFrame(cycle_stats)
-
 # Setup MediaPipe Pose model
 mp_pose = mp.solutions.pose
 mp_drawing = mp.solutions.drawing_utils
 
+@st.cache_resource
+def get_pose_pool():
+    """Pose engine pool shared across reruns, sessions and pages."""
+    return default_pool()
+
+@st.cache_resource
+def get_landmark_cache():
+    """On-disk landmark store shared across reruns and sessions."""
+    return LandmarkCache()
+
+@st.cache_data(max_entries=16, show_spinner="Analysing video...")
+def get_kinematics(video_path, gait_type, full_session=False):
+    """Filtered joint angles of a clip, computed once per upload.
+
+    Widget changes rerun the page; keeping the angle arrays here means the
+    time-range slider only re-crops and re-detects peaks. ``full_session``
+    samples the whole recording across worker processes instead of the
+    middle 12 seconds. The pose model is the heaviest one this host can run
+    within the report budget (``stride_sync.autotune``).
+    """
+    if full_session:
+        return load_session_kinematics(video_path, gait_type, cache=get_landmark_cache(), model_complexity="auto")
+    return load_kinematics(video_path, gait_type, pose_pool=get_pose_pool(), cache=get_landmark_cache(),
+                           model_complexity="auto")
+
+def debug_profiling_settings():
+    """``(show_panel, capture)`` from ``?debug=1[&profile=cprofile|pyinstrument]`` or ``debug_profiling`` in secrets.
+
+    The secret may be ``true`` or the name of a capture to always take.
+    """
+    try:
+        secret = st.secrets.get("debug_profiling", False)
+    except Exception:  # no secrets file
+        secret = False
+    show = st.query_params.get("debug") == "1" or bool(secret)
+    capture = st.query_params.get("profile", secret if secret in CAPTURES else None) if show else None
+    return show, capture if capture in CAPTURES else None
+
+def show_profile(profile, key):
+    """Debug expander: per-stage time and memory of one run, plus the call-profile download."""
+    with st.expander(f"🛠️ Debug: {profile.name} took {profile.seconds:.2f}s"):
+        st.write("Per stage (slowest first)")
+        st.dataframe(pd.DataFrame(profile.totals()))
+        columns = ("name", "parent", "depth", "start_s", "seconds", "frames", "rss_mb", "peak_rss_mb", "peak_growth_mb")
+        st.write("Spans in order")
+        st.dataframe(pd.DataFrame([{column: span.get(column) for column in columns} for span in profile.spans]))
+        st.json(profile.to_dict(), expanded=False)
+        if profile.capture_data:
+            st.download_button(f"Download {profile.capture} capture", profile.capture_data, profile.capture_file,
+                               key=f"capture_{key}")
+        summary = profile.capture_summary()
+        if summary:
+            st.code(summary)
+
+def profiled_page(fn):
+    """Profile every run of a page function; logged always, shown when debugging is on."""
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        nested = current() is not None
+        show, capture = debug_profiling_settings()
+        with profiling(fn.__name__, capture=capture) as profile:
+            result = fn(*args, **kwargs)
+        if show and not nested:
+            show_profile(profile, f"{fn.__name__}_{abs(hash((args, tuple(sorted(kwargs.items())))))}")
+        return result
+    return wrapper
+
+def save_upload(uploaded_file):
+    """Write an upload to a temp file once and return the same path on every rerun."""
+    saved = st.session_state.setdefault("saved_uploads", {})
+    path = saved.get(uploaded_file.file_id)
+    if path is None or not os.path.exists(path):
+        ext = os.path.splitext(uploaded_file.name)[1]
+        with tempfile.NamedTemporaryFile(delete=False, suffix=ext) as temp_video_file:
+            temp_video_file.write(uploaded_file.getbuffer())
+            path = temp_video_file.name
+        saved[uploaded_file.file_id] = path
+    return path
+
 KEYPOINTS_OF_INTEREST = {
     23: "Left Hip",
     24: "Right Hip",
@@ -1064,6 +1169,7 @@ KEYPOINTS_OF_INTEREST = {
     32: "Right Foot"
 }
 
+@traced()
 def process_first_frame_report(video_path, video_index):
     """Use pose estimation overlay for generate pdf report."""
     neon_green = (57, 255, 20)
@@ -1111,7 +1217,7 @@ def process_first_frame_report(video_path, video_index):
 
     frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
 
-    with mp_pose.Pose(min_detection_confidence=0.5, min_tracking_confidence=0.5) as pose:
+    with get_pose_pool().checkout(**DEFAULT_POSE_SETTINGS) as pose:
         results = pose.process(frame_rgb)
         if results.pose_landmarks:
             annotated_frame = frame.copy()
@@ -1133,6 +1239,7 @@ def process_first_frame_report(video_path, video_index):
     cap.release()
     return None, None, None
 
+@profiled_page
 def process_first_frame(video_path, video_index):
     """Processes a selected frame from a video and shows frame number and timestamp with pose overlay."""
 
@@ -1188,7 +1295,7 @@ def process_first_frame(video_path, video_index):
     frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
 
     # ✅ Run pose detection
-    with mp_pose.Pose(min_detection_confidence=0.5, min_tracking_confidence=0.5) as pose:
+    with get_pose_pool().checkout(**DEFAULT_POSE_SETTINGS) as pose:
         results = pose.process(frame_rgb)
         if results.pose_landmarks:
             annotated_frame = frame.copy()
@@ -1208,18 +1315,8 @@ def process_first_frame(video_path, video_index):
             st.warning("Pose landmarks not detected.")
             return frame_number_selected, time, None
 
-def calculate_angle(v1, v2):
-    """
-    Calculate the angle between two vectors using the dot product.
-    """
-    dot_product = np.dot(v1, v2)
-    magnitude_v1 = np.linalg.norm(v1)
-    magnitude_v2 = np.linalg.norm(v2)
-    angle_radians = np.arccos(dot_product / (magnitude_v1 * magnitude_v2))
-    angle_degrees = np.degrees(angle_radians)
-    return angle_degrees
-
 ###
+@traced()
 def plot_joint_angles(time, angles, label, frame_time):
     fig = go.Figure()
     
@@ -1401,6 +1498,26 @@ def plot_joint_angles(time, angles, label, frame_time):
 #             key=f"pca_3d_{video_index}"
 #         )
 
+@traced()
+def plot_gait_cycle_ensemble(ensembles, base, label):
+    """Left and right mean ± SD curves of one joint over 0-100 % of the gait cycle."""
+    fig = go.Figure()
+    for side, color, band in (("left", "lightblue", "rgba(173, 216, 230, 0.25)"),
+                              ("right", "lightgreen", "rgba(144, 238, 144, 0.25)")):
+        ensemble = ensembles[f"{side}_{base}"]
+        if not ensemble.n_cycles:
+            continue
+        fig.add_trace(go.Scatter(
+            x=np.concatenate([PERCENT, PERCENT[::-1]]),
+            y=np.concatenate([ensemble.mean + ensemble.sd, (ensemble.mean - ensemble.sd)[::-1]]),
+            fill='toself', fillcolor=band, line=dict(width=0), hoverinfo='skip', showlegend=False))
+        fig.add_trace(go.Scatter(x=PERCENT, y=ensemble.mean, mode='lines', line=dict(color=color),
+                                 name=f"{side.title()} {label} ({ensemble.n_cycles} cycles, SD {ensemble.mean_sd:.1f}°)"))
+    fig.update_layout(title=f"{label} Angle Over the Gait Cycle", xaxis_title="Gait Cycle (%)",
+                      yaxis_title="Angle (degrees)")
+    return fig
+
+@traced()
 def plot_asymmetry_bar_chart(left_hip, right_hip, left_knee, right_knee, left_ankle, right_ankle):
     # Calculate the range of motion differences (right - left)
     hip_asymmetry = right_hip - left_hip
@@ -1473,188 +1590,42 @@ def plot_asymmetry_bar_chart(left_hip, right_hip, left_knee, right_knee, left_an
 
     return fig
 
-# Butterworth lowpass filter functions
-def butter_lowpass_filter(data, cutoff=6, fs=30, order=4):
-    nyq = 0.5 * fs
-    normal_cutoff = cutoff / nyq
-    b, a = butter(order, normal_cutoff, btype='low', analog=False)
-    return lfilter(b, a, data)
-
-def process_video(user_footwear, gait_type, camera_side, video_path, output_txt_path, frame_time, video_index):
-    # OPTIMIZATION: Clear memory before processing large videos
-    gc.collect()
-    
-    # add after uploading 
-    cap = cv2.VideoCapture(video_path)
-    fps = cap.get(cv2.CAP_PROP_FPS)
-    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-    duration = total_frames / fps  
-
-    # ➕ Check if video is rotated based on first frame
-    ret, test_frame = cap.read()
-    if not ret:
-        raise ValueError("Couldn't read from video.")
-
-    rotated = False
-    if (test_frame.shape[0] < test_frame.shape[1]) and (gait_type != "pickup pen"):  # height < width → probably rotated
-        rotated = True
- 
-    # cap.set(cv2.CAP_PROP_POS_FRAMES, 0)  # Reset back to start
-    ### done add after uploading
-  
-    # start_frame = 0
-    # end_frame = total_frames
-    
-    # Arrays will be initialized in optimized processing section
-    thorax_angles, lumbar_angles = [], []
-
-    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-    
-    # If the video is longer than 12 seconds, capture only the middle 12 seconds
-    if duration > 12:
-        start_frame_crop = int(total_frames // 2 - (6 * fps))  # 6 seconds before center
-        end_frame_crop = int(total_frames // 2 + (6 * fps))    # 6 seconds after center
-    else:
-        # If video is 12 seconds or shorter, use the entire video
-        start_frame_crop = 0
-        end_frame_crop = total_frames
-    
-    cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame_crop)
-    total_frames = int(end_frame_crop - start_frame_crop)
-    duration = total_frames / fps
-
-    with mp_pose.Pose(min_detection_confidence=0.5, min_tracking_confidence=0.5) as pose:
-        # OPTIMIZATION 1: Sample every Nth frame instead of processing all frames
-        frame_skip = max(1, int(fps // 10))  # Process ~10 frames per second maximum
-        
-        # OPTIMIZATION 2: Pre-allocate arrays with known size
-        expected_frames = (end_frame_crop - start_frame_crop) // frame_skip
-        left_knee_angles = []
-        right_knee_angles = []
-        left_hip_angles = []
-        right_hip_angles = []
-        left_ankle_angles = []
-        right_ankle_angles = []
-        spine_segment_angles = []
-        
-        frame_idx = 0
-        for frame_pos in range(start_frame_crop, end_frame_crop, frame_skip):
-            # OPTIMIZATION 3: Jump directly to target frames
-            cap.set(cv2.CAP_PROP_POS_FRAMES, frame_pos)
-            ret, frame = cap.read()
-            
-            if not ret:
-                break
-                
-            # OPTIMIZATION 4: Only rotate if actually rotated
-            if rotated:
-                frame = cv2.rotate(frame, cv2.ROTATE_90_CLOCKWISE)
-            
-            # OPTIMIZATION 5: Process frame
-            frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            results = pose.process(frame_rgb)
-            
-            if results.pose_landmarks:
-                landmarks = results.pose_landmarks.landmark
-                def get_coords(landmark):
-                    return np.array([landmark.x, landmark.y])
-                
-                left_shoulder = get_coords(landmarks[11])
-                right_shoulder = get_coords(landmarks[12])                 
-                
-                left_hip = get_coords(landmarks[23])
-                right_hip = get_coords(landmarks[24])
-                left_knee = get_coords(landmarks[25])
-                right_knee = get_coords(landmarks[26])
-                left_ankle = get_coords(landmarks[27])
-                right_ankle = get_coords(landmarks[28])
-                left_foot = get_coords(landmarks[31])
-                right_foot = get_coords(landmarks[32])
-
-                # midpoint of trunk vector
-                shoulder_mid = (left_shoulder + right_shoulder) / 2
-                hip_mid = (left_hip + right_hip) / 2
-                
-                trunk_vector = shoulder_mid - hip_mid
-
-                # Upward vertical in image coordinates
-                vertical_vector = np.array([0, -1])  
-                left_trunk_vector = left_shoulder - left_hip
-                right_trunk_vector = right_shoulder - right_hip
-                left_thigh_vector = left_hip - left_knee
-                left_shank_vector = left_knee - left_ankle
-                right_thigh_vector = right_hip - right_knee
-                right_shank_vector = right_knee - right_ankle
-                left_foot_vector = left_ankle - left_foot
-                right_foot_vector = right_ankle - right_foot
-
-                # spine segment angle
-                spine_segment_angles.append(calculate_angle(trunk_vector, vertical_vector))                
-                left_hip_angles.append(calculate_angle(left_trunk_vector, left_thigh_vector))
-                right_hip_angles.append(calculate_angle(right_trunk_vector, right_thigh_vector))
-                left_knee_angles.append(calculate_angle(left_thigh_vector, left_shank_vector))
-                right_knee_angles.append(calculate_angle(right_thigh_vector, right_shank_vector))
-                left_ankle_angles.append(calculate_angle(left_shank_vector, left_foot_vector))
-                right_ankle_angles.append(calculate_angle(right_shank_vector, right_foot_vector))
-                
-            frame_idx += 1
-            
-            # OPTIMIZATION 7: Periodic memory cleanup for very long videos
-            if frame_idx % 50 == 0:  # Every 50 processed frames
-                gc.collect()
-
-    # OPTIMIZATION 6: Adjust time array for frame skipping
-    time = np.arange(0, len(left_hip_angles)) * frame_skip / fps  # Time in seconds accounting for frame skip
-    cap.release()
-
-    # OPTIMIZATION 8: Batch apply lowpass filters for efficiency
-    cutoff_frequency = 6  # Adjust cutoff frequency based on signal characteristics
-    angles_dict = {
-        'left_hip': left_hip_angles,
-        'right_hip': right_hip_angles,
-        'left_knee': left_knee_angles,
-        'right_knee': right_knee_angles,
-        'left_ankle': left_ankle_angles,
-        'right_ankle': right_ankle_angles,
-        'spine_segment': spine_segment_angles
-    }
-    
-    # Apply filters in batch
-    for key, angles in angles_dict.items():
-        angles_dict[key] = butter_lowpass_filter(angles, cutoff_frequency, fps)
-    
-    # Extract filtered angles
-    left_hip_angles = angles_dict['left_hip']
-    right_hip_angles = angles_dict['right_hip']
-    left_knee_angles = angles_dict['left_knee']
-    right_knee_angles = angles_dict['right_knee']
-    left_ankle_angles = angles_dict['left_ankle']
-    right_ankle_angles = angles_dict['right_ankle']
-    spine_segment_angles = angles_dict['spine_segment'] 
+@st.fragment
+@profiled_page
+def process_video(user_footwear, gait_type, camera_side, video_path, output_txt_path, frame_time, video_index, full_session=False):
+    # Decoding, pose inference, filtering and peak detection live in the
+    # headless engine (stride_sync.analysis); this function only lays out the page.
+    # As a fragment, moving the time-range slider reruns just this function on
+    # the cached angle arrays instead of the whole page.
+    annotate(gait_type=gait_type, camera_side=camera_side, full_session=full_session)
+    # Only a cache miss records the decode/inference/filter spans beneath this one
+    with span("kinematics"):
+        kinematics = get_kinematics(video_path, gait_type, full_session)
+    annotate(model_complexity=kinematics.model_complexity)
+    fps = kinematics.fps
 
     ### CROP HERE ###
     start_time, end_time = st.slider(
     "Select time range",
     min_value=float(0),
-    max_value=float(total_frames/fps - 1),
-    value=(float(0), float(total_frames/fps - 1)),
+    max_value=float(kinematics.duration),
+    value=(float(0), float(kinematics.duration)),
     key=f"side_time_range_{video_index}_{camera_side}_{hash(video_path)}")
     
-    start_frame_crop = int(start_time * fps)
-    end_frame_crop = int(end_time * fps)
-    st.write(f"Selected frame range: {start_frame_crop} to {end_frame_crop}")
-    st.write(f"Selected time range: {start_frame_crop/fps:.2f}s to {end_frame_crop/fps:.2f}s")
-
-    mask = (time >= start_frame_crop) & (time <= end_frame_crop)
-    filtered_time = time[mask]
-
-    filtered_spine_segment_angles = np.array(spine_segment_angles)[mask]
-    filtered_left_hip_angles = np.array(left_hip_angles)[mask]
-    filtered_right_hip_angles = np.array(right_hip_angles)[mask]
-    filtered_left_knee_angles = np.array(left_knee_angles)[mask]
-    filtered_right_knee_angles = np.array(right_knee_angles)[mask]
-    filtered_left_ankle_angles = np.array(left_ankle_angles)[mask]
-    filtered_right_ankle_angles = np.array(right_ankle_angles)[mask]
+    st.write(f"Selected frame range: {int(start_time * fps)} to {int(end_time * fps)}")
+    st.write(f"Selected time range: {start_time:.2f}s to {end_time:.2f}s")
+
+    with span("analyze", samples=len(kinematics.store)):
+        result = analyze_kinematics(kinematics, gait_type, camera_side, time_range=(start_time, end_time))
+    filtered_time = result.time
+
+    filtered_spine_segment_angles = result.angles["spine_segment"]
+    filtered_left_hip_angles = result.angles["left_hip"]
+    filtered_right_hip_angles = result.angles["right_hip"]
+    filtered_left_knee_angles = result.angles["left_knee"]
+    filtered_right_knee_angles = result.angles["right_knee"]
+    filtered_left_ankle_angles = result.angles["left_ankle"]
+    filtered_right_ankle_angles = result.angles["right_ankle"]
 
     hip_data = {
     "Time (s)": filtered_time,
@@ -1662,95 +1633,24 @@ def process_video(user_footwear, gait_type, camera_side, video_path, output_txt_
     "Right Hip Angle (degrees)": filtered_right_hip_angles
     }
 
-    knee_data = {
-        "Time (s)": filtered_time,
-        "Left Knee Angle (degrees)": filtered_left_knee_angles,
-        "Right Knee Angle (degrees)": filtered_right_knee_angles
-    }
-
-    ankle_data = {
-        "Time (s)": filtered_time,
-        "Left Ankle Angle (degrees)": filtered_left_ankle_angles,
-        "Right Ankle Angle (degrees)": filtered_right_ankle_angles
-    }
-
     # Create a DataFrame
     hip_df = pd.DataFrame(hip_data)
-    knee_df = pd.DataFrame(knee_data)
-    ankle_df = pd.DataFrame(ankle_data)
-
-     # HIP RANGES
-    column_left = "Left Hip Angle (degrees)"
-    prominence = 4
-    distance = fps / 2  # Assuming fps/2 equivalent    
-    peaks_left = detect_peaks(hip_df, column_left, prominence, distance)
-    mins_left = detect_mins(hip_df, column_left, prominence, distance)
-    hip_left_mins_mean = np.mean(hip_df[column_left].iloc[mins_left])
-    hip_left_mins_std = np.std(hip_df[column_left].iloc[mins_left])
-    hip_left_peaks_mean = np.mean(hip_df[column_left].iloc[peaks_left])
-    hip_left_peaks_std = np.std(hip_df[column_left].iloc[peaks_left])    
-    column_right = "Right Hip Angle (degrees)"
-    peaks_right = detect_peaks(hip_df, column_right, prominence, distance)
-    mins_right = detect_mins(hip_df, column_right, prominence, distance)
-    hip_right_mins_mean = np.mean(hip_df[column_right].iloc[mins_right])
-    hip_right_mins_std = np.std(hip_df[column_right].iloc[mins_right])
-    hip_right_peaks_mean = np.mean(hip_df[column_right].iloc[peaks_right])
-    hip_right_peaks_std = np.std(hip_df[column_right].iloc[peaks_right])
-        
-    # KNEE CYCLES
-    column_left = "Left Knee Angle (degrees)"
-    prominence = 4
-    distance = fps / 2
-    peaks_left = detect_peaks(knee_df, column_left, prominence, distance)
-    mins_left = detect_mins(knee_df, column_left, prominence, distance)
-    knee_left_mins_mean = np.mean(knee_df[column_left].iloc[mins_left])
-    knee_left_mins_std = np.std(knee_df[column_left].iloc[mins_left])
-    knee_left_peaks_mean = np.mean(knee_df[column_left].iloc[peaks_left])
-    knee_left_peaks_std = np.std(knee_df[column_left].iloc[peaks_left])
-    column_right = "Right Knee Angle (degrees)"
-    peaks_right = detect_peaks(knee_df, column_right, prominence, distance)
-    mins_right = detect_mins(knee_df, column_right, prominence, distance)
-    knee_right_mins_mean = np.mean(knee_df[column_right].iloc[mins_right])
-    knee_right_mins_std = np.std(knee_df[column_right].iloc[mins_right])
-    knee_right_peaks_mean = np.mean(knee_df[column_right].iloc[peaks_right])
-    knee_right_peaks_std = np.std(knee_df[column_right].iloc[peaks_right])
-    
-    # ANKLE CYCLES
-    column_left = "Left Ankle Angle (degrees)"
-    prominence = 4
-    distance = fps / 2
-    peaks_left = detect_peaks(ankle_df, column_left, prominence, distance)
-    mins_left = detect_mins(ankle_df, column_left, prominence, distance)
-    ankle_left_mins_mean = np.mean(ankle_df[column_left].iloc[mins_left])
-    ankle_left_mins_std = np.std(ankle_df[column_left].iloc[mins_left])
-    ankle_left_peaks_mean = np.mean(ankle_df[column_left].iloc[peaks_left])
-    ankle_left_peaks_std = np.std(ankle_df[column_left].iloc[peaks_left])
-    column_right = "Right Ankle Angle (degrees)"
-    peaks_right = detect_peaks(ankle_df, column_right, prominence, distance)
-    mins_right = detect_mins(ankle_df, column_right, prominence, distance)
-    ankle_right_mins_mean = np.mean(ankle_df[column_right].iloc[mins_right])
-    ankle_right_mins_std = np.std(ankle_df[column_right].iloc[mins_right])
-    ankle_right_peaks_mean = np.mean(ankle_df[column_right].iloc[peaks_right])
-    ankle_right_peaks_std = np.std(ankle_df[column_right].iloc[peaks_right])
-   
-    rom_values = [
-    np.ptp(filtered_right_knee_angles),
-    np.ptp(filtered_right_hip_angles),
-    np.ptp(filtered_spine_segment_angles),
-    np.ptp(filtered_left_hip_angles),
-    np.ptp(filtered_left_knee_angles),
-    np.ptp(filtered_left_ankle_angles),
-    np.ptp(filtered_right_ankle_angles)
-        ]
-    
-    joint_labels = ['Right Joint Knee', 'Right Joint Hip', 'Spine Segment', 'Left Joint Hip', 'Left Joint Knee', 'Left Joint Ankle', 'Right Joint Ankle']
-    knee_right_rom_mean = knee_right_peaks_mean - knee_right_mins_mean
-    knee_left_rom_mean = knee_left_peaks_mean - knee_left_mins_mean
-    hip_right_rom_mean = hip_right_peaks_mean - hip_right_mins_mean
-    hip_left_rom_mean = hip_left_peaks_mean - hip_left_mins_mean
-    ankle_right_rom_mean = ankle_right_peaks_mean - ankle_right_mins_mean
-    ankle_left_rom_mean = ankle_left_peaks_mean - ankle_left_mins_mean
-    spine_segment_rom_mean = np.ptp(filtered_spine_segment_angles)
+
+    # Mean peak (max) and trough (min) angle of every joint over the selected range
+    hip_left_mins_mean, hip_left_peaks_mean = result.joints["left_hip"].min_angle, result.joints["left_hip"].max_angle
+    hip_right_mins_mean, hip_right_peaks_mean = result.joints["right_hip"].min_angle, result.joints["right_hip"].max_angle
+    knee_left_mins_mean, knee_left_peaks_mean = result.joints["left_knee"].min_angle, result.joints["left_knee"].max_angle
+    knee_right_mins_mean, knee_right_peaks_mean = result.joints["right_knee"].min_angle, result.joints["right_knee"].max_angle
+    ankle_left_mins_mean, ankle_left_peaks_mean = result.joints["left_ankle"].min_angle, result.joints["left_ankle"].max_angle
+    ankle_right_mins_mean, ankle_right_peaks_mean = result.joints["right_ankle"].min_angle, result.joints["right_ankle"].max_angle
+
+    knee_right_rom_mean = result.joints["right_knee"].rom
+    knee_left_rom_mean = result.joints["left_knee"].rom
+    hip_right_rom_mean = result.joints["right_hip"].rom
+    hip_left_rom_mean = result.joints["left_hip"].rom
+    ankle_right_rom_mean = result.joints["right_ankle"].rom
+    ankle_left_rom_mean = result.joints["left_ankle"].rom
+    spine_segment_rom_mean = result.joints["spine_segment"].rom
 # HIP JOINT: 
     # 1. https://pmc.ncbi.nlm.nih.gov/articles/PMC9325808/ 
     # 2. https://puresportsmed.com/blog/posts/what-long-distance-runners-can-do-to-avoid-overuse-injuries
@@ -2360,9 +2260,6 @@ def process_video(user_footwear, gait_type, camera_side, video_path, output_txt_
         github_url = "https://raw.githubusercontent.com/dholling4/PolarPlotter/main/"
         st.image(github_url + "photos/spine segmanet angle description.png", use_container_width =True)
 
-    filtered_left_hip_angles = np.array(left_hip_angles)[mask]
-    filtered_right_hip_angles = np.array(right_hip_angles)[mask]
-
     with st.expander("Click here to see your hip angle data"):
         fig = go.Figure()
         fig.add_trace(go.Scatter(x=filtered_time, y=filtered_left_hip_angles, mode='lines', name="Left Hip"))
@@ -2384,9 +2281,6 @@ def process_video(user_footwear, gait_type, camera_side, video_path, output_txt_
         )
         st.image(github_url + "photos/hip flexion angle.png", use_container_width =True)
         
-    filtered_left_knee_angles = np.array(left_knee_angles)[mask]
-    filtered_right_knee_angles = np.array(right_knee_angles)[mask]
-
     with st.expander("Click here to see your knee angle data"):
         fig = go.Figure()
         fig.add_trace(go.Scatter(x=filtered_time, y=filtered_left_knee_angles, mode='lines', name="Left Knee"))
@@ -2418,9 +2312,6 @@ def process_video(user_footwear, gait_type, camera_side, video_path, output_txt_
 
         st.image(github_url + "photos/knee flexion angle.png", use_container_width =True)
     
-    filtered_left_ankle_angles = np.array(left_ankle_angles)[mask]
-    filtered_right_ankle_angles = np.array(right_ankle_angles)[mask]
-
     with st.expander("Click here to see your ankle angle data"):
         fig = go.Figure()
         fig.add_trace(go.Scatter(x=filtered_time, y=filtered_left_ankle_angles, mode='lines', name="Left Ankle"))
@@ -2463,15 +2354,21 @@ def process_video(user_footwear, gait_type, camera_side, video_path, output_txt_
 
     # STRIDE CYCLE DETECTION
     with st.expander("Stride Cycle Analysis"):
-
-        strides = [f"Stride {i+1}" for i in range(min(len(peaks_left), len(mins_left), len(peaks_right), len(mins_right)))]
+        # Strides run heel strike to heel strike (heel / toe landmarks) when the feet were tracked
+        if result.events is not None:
+            st.write(f"Cadence: {result.events.cadence:.0f} steps/min")
+            st.dataframe(pd.DataFrame(result.events.summary()).T.round(2))
+
+        left_max, left_min = result.per_stride("left_hip")
+        right_max, right_min = result.per_stride("right_hip")
+        strides = [f"Stride {i+1}" for i in range(min(len(left_max), len(right_max)))]
         
         # Plotly bar plot showing peaks and minima side by side with thinner bars
         fig = go.Figure()
         column_left = "Left Hip Angle (degrees)"
         column_right = "Right Hip Angle (degrees)"
         fig.add_trace(go.Bar(
-            y=hip_df[column_left].iloc[peaks_left][:len(strides)],
+            y=left_max[:len(strides)],
             x=strides,
             name="Left Peak Flexion",
             marker_color='lightblue',
@@ -2479,7 +2376,7 @@ def process_video(user_footwear, gait_type, camera_side, video_path, output_txt_
         ))
         
         fig.add_trace(go.Bar(
-            y=hip_df[column_right].iloc[peaks_right][:len(strides)],
+            y=right_max[:len(strides)],
             x=strides,
             name="Right Peak Flexion",
             marker_color='lightgreen',
@@ -2487,7 +2384,7 @@ def process_video(user_footwear, gait_type, camera_side, video_path, output_txt_
         ))
 
         fig.add_trace(go.Bar(
-            y=hip_df[column_left].iloc[mins_left][:len(strides)],
+            y=left_min[:len(strides)],
             x=strides,
             name="Left Min Flexion",
             marker_color='blue',
@@ -2495,7 +2392,7 @@ def process_video(user_footwear, gait_type, camera_side, video_path, output_txt_
         ))
         
         fig.add_trace(go.Bar(
-            y=hip_df[column_right].iloc[mins_right][:len(strides)],
+            y=right_min[:len(strides)],
             x=strides,
             name="Right Min Flexion",
             marker_color='green',
@@ -2511,7 +2408,9 @@ def process_video(user_footwear, gait_type, camera_side, video_path, output_txt_
         
         st.plotly_chart(fig, key=f"hip_expander_{video_index}_{camera_side}_{hash(video_path)}")
 
-        strides = [f"Stride {i+1}" for i in range(min(len(peaks_left), len(mins_left), len(peaks_right), len(mins_right)))]
+        left_max, left_min = result.per_stride("left_knee")
+        right_max, right_min = result.per_stride("right_knee")
+        strides = [f"Stride {i+1}" for i in range(min(len(left_max), len(right_max)))]
 
         # Plotly bar plot showing peaks and minima side by side with thinner bars
         fig = go.Figure()
@@ -2519,7 +2418,7 @@ def process_video(user_footwear, gait_type, camera_side, video_path, output_txt_
         column_right = "Right Knee Angle (degrees)"
 
         fig.add_trace(go.Bar(
-            y=knee_df[column_left].iloc[peaks_left][:len(strides)],
+            y=left_max[:len(strides)],
             x=strides,
             name="Left Peak Flexion",
             marker_color='lightblue',
@@ -2527,7 +2426,7 @@ def process_video(user_footwear, gait_type, camera_side, video_path, output_txt_
         ))
 
         fig.add_trace(go.Bar(
-            y=knee_df[column_right].iloc[peaks_right][:len(strides)],
+            y=right_max[:len(strides)],
             x=strides,
             name="Right Peak Flexion",
             marker_color='lightgreen',
@@ -2535,7 +2434,7 @@ def process_video(user_footwear, gait_type, camera_side, video_path, output_txt_
         ))
 
         fig.add_trace(go.Bar(
-            y=knee_df[column_left].iloc[mins_left][:len(strides)],
+            y=left_min[:len(strides)],
             x=strides,
             name="Left Min Flexion",
             marker_color='blue',
@@ -2543,7 +2442,7 @@ def process_video(user_footwear, gait_type, camera_side, video_path, output_txt_
         ))
 
         fig.add_trace(go.Bar(
-            y=knee_df[column_right].iloc[mins_right][:len(strides)],
+            y=right_min[:len(strides)],
             x=strides,
             name="Right Min Flexion",
             marker_color='green',
@@ -2561,7 +2460,9 @@ def process_video(user_footwear, gait_type, camera_side, video_path, output_txt_
 
         # ANKLE CYCLES
 
-        strides = [f"Stride {i+1}" for i in range(min(len(peaks_left), len(mins_left), len(peaks_right), len(mins_right)))]
+        left_max, left_min = result.per_stride("left_ankle")
+        right_max, right_min = result.per_stride("right_ankle")
+        strides = [f"Stride {i+1}" for i in range(min(len(left_max), len(right_max)))]
 
         # Plotly bar plot showing peaks and minima side by side with thinner bars
         fig = go.Figure()
@@ -2569,7 +2470,7 @@ def process_video(user_footwear, gait_type, camera_side, video_path, output_txt_
         column_right = "Right Ankle Angle (degrees)"
 
         fig.add_trace(go.Bar(
-            y=ankle_df[column_left].iloc[peaks_left][:len(strides)],
+            y=left_max[:len(strides)],
             x=strides,
             name="Left Peak Flexion",
             marker_color='lightblue',
@@ -2577,7 +2478,7 @@ def process_video(user_footwear, gait_type, camera_side, video_path, output_txt_
         ))
 
         fig.add_trace(go.Bar(
-            y=ankle_df[column_right].iloc[peaks_right][:len(strides)],
+            y=right_max[:len(strides)],
             x=strides,
             name="Right Peak Flexion",
             marker_color='lightgreen',
@@ -2585,7 +2486,7 @@ def process_video(user_footwear, gait_type, camera_side, video_path, output_txt_
         ))
 
         fig.add_trace(go.Bar(
-            y=ankle_df[column_left].iloc[mins_left][:len(strides)],
+            y=left_min[:len(strides)],
             x=strides,
             name="Left Min Flexion",
             marker_color='blue',
@@ -2593,7 +2494,7 @@ def process_video(user_footwear, gait_type, camera_side, video_path, output_txt_
         ))
 
         fig.add_trace(go.Bar(
-            y=ankle_df[column_right].iloc[mins_right][:len(strides)],
+            y=right_min[:len(strides)],
             x=strides,
             name="Right Min Flexion",
             marker_color='green',
@@ -2609,6 +2510,18 @@ def process_video(user_footwear, gait_type, camera_side, video_path, output_txt_
 
         st.plotly_chart(fig, key=f"ankle_expander_{video_index}_{camera_side}_{hash(video_path)}")
 
+        # Every cycle resampled to 0-100 % and averaged; computed once per result
+        for base, label in (("hip", "Hip"), ("knee", "Knee"), ("ankle", "Ankle")):
+            st.plotly_chart(plot_gait_cycle_ensemble(result.ensembles, base, label),
+                            key=f"{base}_ensemble_{video_index}_{camera_side}_{hash(video_path)}")
+        st.download_button(
+            label="Download Gait Cycle Averages",
+            data=result.ensemble_table().to_csv(index=False).encode('utf-8'),
+            file_name=f"gait_cycle_averages_{camera_side}.csv",
+            mime="text/csv",
+            key=f"gait_cycle_averages_{video_index}_{camera_side}_{hash(video_path)}"
+        )
+
     ### END CROP ###
   # show tables
     df = pd.DataFrame({'Time': filtered_time, 'Spine Segment Angles': filtered_spine_segment_angles, 'Left Joint Hip': filtered_left_hip_angles, 'Right Hip': filtered_right_hip_angles, 'Left Knee': filtered_left_knee_angles, 'Right Knee': filtered_right_knee_angles, 'Left Ankle': filtered_left_ankle_angles, 'Right Ankle': filtered_right_ankle_angles})
@@ -2619,10 +2532,7 @@ def process_video(user_footwear, gait_type, camera_side, video_path, output_txt_
     st.write('### Range of Motion')
     # create dataframe of range of motion
     
-    df_rom = pd.DataFrame({'Joint': ['Spine Segment', 'Left Hip', 'Right Hip', 'Left Knee', 'Right Knee', 'Left Ankle', 'Right Ankle'], 
-    'Min Angle (°)' : [np.min(filtered_spine_segment_angles), hip_left_mins_mean, hip_right_mins_mean, knee_left_mins_mean, knee_right_mins_mean, ankle_left_mins_mean, ankle_right_mins_mean],
-    'Max Angle (°)' : [np.max(filtered_spine_segment_angles), hip_left_peaks_mean, hip_right_peaks_mean, knee_left_peaks_mean, knee_right_peaks_mean, ankle_left_peaks_mean, ankle_right_peaks_mean],
-    'Range of Motion (°)': [np.ptp(filtered_spine_segment_angles), hip_left_peaks_mean - hip_left_mins_mean, hip_right_peaks_mean - hip_right_mins_mean, knee_left_peaks_mean - knee_left_mins_mean, knee_right_peaks_mean - knee_right_mins_mean, ankle_left_peaks_mean - ankle_left_mins_mean, ankle_right_peaks_mean - ankle_right_mins_mean]})
+    df_rom = result.rom_table()
     
     # always show 1 decimal place
     df_rom['Min Angle (°)'] = df_rom['Min Angle (°)'].apply(lambda x: f"{x:.1f}")
@@ -2634,10 +2544,23 @@ def process_video(user_footwear, gait_type, camera_side, video_path, output_txt_
     # if pca_checkbox:
     #     perform_pca(joint_angle_df, video_index)
 
-    _, __, pose_image_path = process_first_frame_report(video_path, video_index)
-    pdf_path = generate_pdf(pose_image_path, df_rom, spider_plot, asymmetry_bar_plot, text_info, camera_side, gait_type, user_footwear)
-    with open(pdf_path, "rb") as file:
-        st.download_button("Download Stride Sync Report", file, "Stride_Sync_Report.pdf", "application/pdf", key=f"pdf_report_{video_index}_{camera_side}_{hash(video_path)}")
+    # The PDF rasterises every chart, so build it on request rather than on every
+    # slider move, and keep it while the time range and footwear it was built from
+    # are unchanged. The download button's key is read-only, so the PDF lives under its own key
+    report_key = f"pdf_report_{video_index}_{camera_side}_{hash(video_path)}"
+    pdf_key = f"{report_key}_pdf"
+    report_state = (round(start_time, 2), round(end_time, 2), user_footwear)
+    report = st.session_state.get(pdf_key)
+    if report is not None and report[0] != report_state:
+        report = None
+    if report is None and st.button("Generate Stride Sync Report", key=f"generate_{report_key}"):
+        _, __, pose_image_path = process_first_frame_report(video_path, video_index)
+        pdf_path = generate_pdf(pose_image_path, df_rom, spider_plot, asymmetry_bar_plot, text_info, camera_side, gait_type, user_footwear,
+                                ensembles=result.ensembles)
+        report = st.session_state[pdf_key] = (report_state, pdf_path)
+    if report is not None:
+        with open(report[1], "rb") as file:
+            st.download_button("Download Stride Sync Report", file, "Stride_Sync_Report.pdf", "application/pdf", key=report_key)
 
     # email me my Stride Sync Report
 #     email = st.text_input("Enter your email address to receive your Stride Sync Report",  
@@ -2762,6 +2685,8 @@ def main():
 
     # user_email = st.text_input("Enter your Email", key="user_email")
     user_footwear = st.text_input("Enter your footwear", key="user_footwear") # maybe checkbox neutral, support, stability --> Opens up a catalogue at their stores...
+    full_session = st.checkbox("Analyse the full session for videos longer than 12 seconds", key="full_session",
+                               help="Treadmill sessions of a few minutes are split across CPU cores; slower than the 12 second window.")
 
     # File uploader for user to upload their own video
     st.title('🚶 Side Walking Gait Analysis')
@@ -2772,27 +2697,25 @@ def main():
         for idx, video_file_side_walk in enumerate(video_files):
             file_name = video_file_side_walk.name
             ext = os.path.splitext(file_name)[1]
-            with tempfile.NamedTemporaryFile(delete=False, suffix=ext) as temp_video_file:
-                temp_video_file.write(video_file_side_walk.read())
-                temp_video_path = temp_video_file.name
-                temp_video_file.close()
-                output_txt_path = '/workspaces/PolarPlotter/results/joint_angles.txt'
-                
-                # OPTIMIZATION: Check video duration before processing
-                cap = cv2.VideoCapture(temp_video_path)
-                fps = cap.get(cv2.CAP_PROP_FPS)
-                total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-                duration = total_frames / fps
-                cap.release()
-                
-                if duration > 12:  # For longer videos, skip frame selection
-                    st.info(f"📊 Video duration: {duration:.1f}s - Using optimized processing (middle 12 seconds)")
-                    frame_time = duration / 2  # Use middle frame timestamp
-                    image_path = None  # Skip image generation for optimization
-                else:
-                    frame_number, frame_time, image_path = process_first_frame(temp_video_path, video_index=idx)
-                
-                process_video(user_footwear, gait_type, camera_side, temp_video_path, output_txt_path, frame_time, video_index=idx)
+            temp_video_path = save_upload(video_file_side_walk)
+            output_txt_path = '/workspaces/PolarPlotter/results/joint_angles.txt'
+            
+            # OPTIMIZATION: Check video duration before processing
+            cap = cv2.VideoCapture(temp_video_path)
+            fps = cap.get(cv2.CAP_PROP_FPS)
+            total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+            duration = total_frames / fps
+            cap.release()
+            
+            if duration > 12:  # For longer videos, skip frame selection
+                st.info(f"📊 Video duration: {duration:.1f}s - Using optimized processing "
+                        f"({'full session' if full_session else 'middle 12 seconds'})")
+                frame_time = duration / 2  # Use middle frame timestamp
+                image_path = None  # Skip image generation for optimization
+            else:
+                frame_number, frame_time, image_path = process_first_frame(temp_video_path, video_index=idx)
+            
+            process_video(user_footwear, gait_type, camera_side, temp_video_path, output_txt_path, frame_time, video_index=idx, full_session=full_session)
 
     # File uploader for user to upload their own video
     st.title('📹 Back Walking Gait Analysis')
@@ -2803,32 +2726,30 @@ def main():
         for idx, video_file_back_walk in enumerate(video_files):
             file_name = video_file_back_walk.name
             ext = os.path.splitext(file_name)[1]
-            with tempfile.NamedTemporaryFile(delete=False, suffix=ext) as temp_video_file:
-                temp_video_file.write(video_file_back_walk.read())
-                temp_video_path = temp_video_file.name
-                temp_video_file.close()
-                output_txt_path = '/workspaces/PolarPlotter/results/joint_angles.txt'
-                
-                # OPTIMIZATION: Check video duration before processing
-                cap = cv2.VideoCapture(temp_video_path)
-                fps = cap.get(cv2.CAP_PROP_FPS)
-                total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-                duration = total_frames / fps
-                cap.release()
-                
-                if duration > 12:  # For longer videos, skip frame selection
-                    st.info(f"📊 Video duration: {duration:.1f}s - Using optimized processing (middle 12 seconds)")
-                    frame_time = duration / 2  # Use middle frame timestamp
-                    image_path = None  # Skip image generation for optimization
-                else:
-                    frame_number, frame_time, image_path = process_first_frame(temp_video_path, video_index=idx)
-                
-                process_video(user_footwear, gait_type, camera_side, temp_video_path, output_txt_path, frame_time, video_index=idx)
-                
-                # Add a button to clear the uploaded file
-                if st.button("Clear Uploaded Video"):
-                    st.session_state.uploaded_file = None # Clear the file from session state
-                    st.session_state.video_uploader = None # Clear the widget's internal state
+            temp_video_path = save_upload(video_file_back_walk)
+            output_txt_path = '/workspaces/PolarPlotter/results/joint_angles.txt'
+            
+            # OPTIMIZATION: Check video duration before processing
+            cap = cv2.VideoCapture(temp_video_path)
+            fps = cap.get(cv2.CAP_PROP_FPS)
+            total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+            duration = total_frames / fps
+            cap.release()
+            
+            if duration > 12:  # For longer videos, skip frame selection
+                st.info(f"📊 Video duration: {duration:.1f}s - Using optimized processing "
+                        f"({'full session' if full_session else 'middle 12 seconds'})")
+                frame_time = duration / 2  # Use middle frame timestamp
+                image_path = None  # Skip image generation for optimization
+            else:
+                frame_number, frame_time, image_path = process_first_frame(temp_video_path, video_index=idx)
+            
+            process_video(user_footwear, gait_type, camera_side, temp_video_path, output_txt_path, frame_time, video_index=idx, full_session=full_session)
+            
+            # Add a button to clear the uploaded file
+            if st.button("Clear Uploaded Video"):
+                st.session_state.uploaded_file = None # Clear the file from session state
+                st.session_state.video_uploader = None # Clear the widget's internal state
     st.title('🏃 Side Running Gait Analysis')
     video_files = st.file_uploader("Upload side running video(s)", type=["mp4", "avi", "mov"], accept_multiple_files=True, key="side_running")
     if video_files:
@@ -2837,27 +2758,25 @@ def main():
         for idx, video_file_side_run in enumerate(video_files):
             file_name = video_file_side_run.name
             ext = os.path.splitext(file_name)[1]
-            with tempfile.NamedTemporaryFile(delete=False, suffix=ext) as temp_video_file:
-                temp_video_file.write(video_file_side_run.read())
-                temp_video_path = temp_video_file.name
-                temp_video_file.close()
-                output_txt_path = '/workspaces/PolarPlotter/results/joint_angles.txt'
-                
-                # OPTIMIZATION: Check video duration before processing
-                cap = cv2.VideoCapture(temp_video_path)
-                fps = cap.get(cv2.CAP_PROP_FPS)
-                total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-                duration = total_frames / fps
-                cap.release()
-                
-                if duration > 12:  # For longer videos, skip frame selection
-                    st.info(f"📊 Video duration: {duration:.1f}s - Using optimized processing (middle 12 seconds)")
-                    frame_time = duration / 2  # Use middle frame timestamp
-                    image_path = None  # Skip image generation for optimization
-                else:
-                    frame_number, frame_time, image_path = process_first_frame(temp_video_path, video_index=idx)
-                
-                process_video(user_footwear, gait_type, camera_side, temp_video_path, output_txt_path, frame_time, video_index=idx)
+            temp_video_path = save_upload(video_file_side_run)
+            output_txt_path = '/workspaces/PolarPlotter/results/joint_angles.txt'
+            
+            # OPTIMIZATION: Check video duration before processing
+            cap = cv2.VideoCapture(temp_video_path)
+            fps = cap.get(cv2.CAP_PROP_FPS)
+            total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+            duration = total_frames / fps
+            cap.release()
+            
+            if duration > 12:  # For longer videos, skip frame selection
+                st.info(f"📊 Video duration: {duration:.1f}s - Using optimized processing "
+                        f"({'full session' if full_session else 'middle 12 seconds'})")
+                frame_time = duration / 2  # Use middle frame timestamp
+                image_path = None  # Skip image generation for optimization
+            else:
+                frame_number, frame_time, image_path = process_first_frame(temp_video_path, video_index=idx)
+            
+            process_video(user_footwear, gait_type, camera_side, temp_video_path, output_txt_path, frame_time, video_index=idx, full_session=full_session)
 
     # File uploader for back video(s)
     st.title('🏃 Back Running Gait Analysis')
@@ -2875,27 +2794,25 @@ def main():
             if ext not in allowed_exts:
                 st.warning(f"⚠️ Skipping file `{file_name}` due to unsupported extension.")
                 continue
-            with tempfile.NamedTemporaryFile(delete=False, suffix=ext) as temp_video_file:
-                temp_video_file.write(video_file_back_run.read())
-                temp_video_path = temp_video_file.name
-                temp_video_file.close()
-                output_txt_path = '/workspaces/PolarPlotter/results/joint_angles.txt'
-                
-                # OPTIMIZATION: Check video duration before processing
-                cap = cv2.VideoCapture(temp_video_path)
-                fps = cap.get(cv2.CAP_PROP_FPS)
-                total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-                duration = total_frames / fps
-                cap.release()
-                
-                if duration > 12:  # For longer videos, skip frame selection
-                    st.info(f"📊 Video duration: {duration:.1f}s - Using optimized processing (middle 12 seconds)")
-                    frame_time = duration / 2  # Use middle frame timestamp
-                    image_path = None  # Skip image generation for optimization
-                else:
-                    frame_number, frame_time, image_path = process_first_frame(temp_video_path, video_index=idx)
-                
-                process_video(user_footwear, gait_type, camera_side, temp_video_path, output_txt_path, frame_time, video_index=idx)
+            temp_video_path = save_upload(video_file_back_run)
+            output_txt_path = '/workspaces/PolarPlotter/results/joint_angles.txt'
+            
+            # OPTIMIZATION: Check video duration before processing
+            cap = cv2.VideoCapture(temp_video_path)
+            fps = cap.get(cv2.CAP_PROP_FPS)
+            total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+            duration = total_frames / fps
+            cap.release()
+            
+            if duration > 12:  # For longer videos, skip frame selection
+                st.info(f"📊 Video duration: {duration:.1f}s - Using optimized processing "
+                        f"({'full session' if full_session else 'middle 12 seconds'})")
+                frame_time = duration / 2  # Use middle frame timestamp
+                image_path = None  # Skip image generation for optimization
+            else:
+                frame_number, frame_time, image_path = process_first_frame(temp_video_path, video_index=idx)
+            
+            process_video(user_footwear, gait_type, camera_side, temp_video_path, output_txt_path, frame_time, video_index=idx, full_session=full_session)
 
 if __name__ == "__main__":
     main()
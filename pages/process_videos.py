@@ -2,76 +2,31 @@ import streamlit as st
 import os
 import zipfile
 import tempfile
-import pandas as pd
 from pathlib import Path
-import cv2
-import numpy as np
-import mediapipe as mp
 
-# --- Pose estimation helper ---
-def extract_joint_angles(video_path):
-    mp_pose = mp.solutions.pose
-    pose = mp_pose.Pose(min_detection_confidence=0.5, min_tracking_confidence=0.5)
+from stride_sync.batch import BatchJob, run_batch
+from stride_sync.export import EXPORT_EXTENSIONS, available_formats
+from stride_sync.offline import runtime_available
 
-    cap = cv2.VideoCapture(video_path)
-    fps = cap.get(cv2.CAP_PROP_FPS)
-    joint_angles = []
-
-    while cap.isOpened():
-        ret, frame = cap.read()
-        if not ret:
-            break
-
-        # Convert frame to RGB
-        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        results = pose.process(frame_rgb)
-
-        if results.pose_landmarks:
-            landmarks = results.pose_landmarks.landmark
-            def get_coords(idx): return np.array([landmarks[idx].x, landmarks[idx].y])
-
-              
-            left_hip = get_coords(23)
-            right_hip = get_coords(24)
-            left_knee = get_coords(25)
-            right_knee = get_coords(26)
-            left_ankle = get_coords(27)
-            right_ankle = get_coords(28)
-
-            # Vectors
-            
-            left_thigh = left_hip - left_knee
-            left_shank = left_knee - left_ankle
-            right_thigh = right_hip - right_knee
-            right_shank = right_knee - right_ankle
-
-            # Simple angle calculation (dot product formula)
-            def calculate_angle(v1, v2):
-                cos_angle = np.dot(v1, v2) / (np.linalg.norm(v1) * np.linalg.norm(v2))
-                angle = np.degrees(np.arccos(np.clip(cos_angle, -1.0, 1.0)))
-                return angle
-            
-
-
-            left_knee_angle = calculate_angle(left_thigh, left_shank)
-            right_knee_angle = calculate_angle(right_thigh, right_shank)
-
-            joint_angles.append({
-                "Frame": int(cap.get(cv2.CAP_PROP_POS_FRAMES)),
-   
-
-                "Left Knee Angle": left_knee_angle,
-                "Right Knee Angle": right_knee_angle,
-     
-
-            })
-
-    cap.release()
-    return pd.DataFrame(joint_angles)
+EXPORT_LABELS = {
+    "csv": "CSV (knee angles)",
+    "ndjson": "NDJSON (all landmarks + joint angles)",
+    "parquet": "Parquet (all landmarks + joint angles)",
+}
 
 # --- Streamlit Interface ---
 st.title("🎥 Batch Video Uploader and Pose Estimator")
 
+with st.expander("Processing settings"):
+    workers = st.number_input("Parallel workers", min_value=1, max_value=os.cpu_count() or 1,
+                              value=max(1, (os.cpu_count() or 1) - 1))
+    memory_limit_mb = st.number_input("Memory ceiling (MB)", min_value=512, value=4096, step=256)
+    offline = runtime_available() and st.checkbox(
+        "Batched inference", value=False,
+        help="Run the pose model on batches of frames with a TFLite interpreter; best with several cores per worker")
+
+export_format = st.selectbox("Results format", ["csv"] + available_formats(), format_func=EXPORT_LABELS.get)
+
 uploaded_files = st.file_uploader(
     "Upload your .mov or .mp4 video files",
     type=["mov", "mp4"],
@@ -83,24 +38,31 @@ if uploaded_files:
         result_dir = Path(temp_dir) / "results"
         result_dir.mkdir(parents=True, exist_ok=True)
 
+        jobs = []
         for uploaded_file in uploaded_files:
             video_path = result_dir / uploaded_file.name
             with open(video_path, "wb") as f:
                 f.write(uploaded_file.read())
 
-            st.info(f"Processing {uploaded_file.name}...")
-            df_angles = extract_joint_angles(str(video_path))
+            # Each result file is written by the batch engine once its video is done
+            result_filename = video_path.stem + "_results" + EXPORT_EXTENSIONS.get(export_format, ".csv")
+            jobs.append(BatchJob(uploaded_file.name, str(video_path), str(result_dir / result_filename)))
 
-            # Save each CSV
-            csv_filename = video_path.stem + "_results.csv"
-            csv_path = result_dir / csv_filename
-            df_angles.to_csv(csv_path, index=False)
+        progress_bars = [st.progress(0.0, text=f"Processing {job.name}...") for job in jobs]
+        for progress in run_batch(jobs, workers=workers, memory_limit_mb=memory_limit_mb,
+                                  export_format=export_format, offline=offline):
+            done = progress.chunks_done == progress.chunks_total
+            progress_bars[progress.index].progress(
+                progress.chunks_done / progress.chunks_total,
+                text=f"{'Finished' if done else 'Processing'} {progress.name}"
+                     f" ({progress.chunks_done}/{progress.chunks_total} chunks)")
 
-        # Zip all CSVs
+        # Zip all results
         zip_path = Path(temp_dir) / "pose_results.zip"
-        with zipfile.ZipFile(zip_path, "w") as zipf:
-            for csv_file in result_dir.glob("*.csv"):
-                zipf.write(csv_file, arcname=csv_file.name)
+        with zipfile.ZipFile(zip_path, "w", compression=zipfile.ZIP_DEFLATED) as zipf:
+            for job in jobs:
+                result_file = Path(job.output_path)
+                zipf.write(result_file, arcname=result_file.name)
 
         # Offer download
         with open(zip_path, "rb") as f:
@@ -119,6 +81,7 @@ st.write('''
          Follow these steps to get started:
             1. Drag and drop batch upload .mov or .mp4 files
             2. Download the zipped file containing all the results
-            3. Unzip the file and open the CSV files in Excel
+            3. Unzip the file and open the CSV files in Excel (NDJSON and Parquet results
+               hold every landmark per frame and load directly with pandas)
 
             Have any questions or need assistance? Reach out to David Hollinger at dh25587@essex.ac.uk ''')
\ No newline at end of file
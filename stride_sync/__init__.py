@@ -0,0 +1 @@
+"""Stride Sync analysis engine shared by the Streamlit pages."""
@@ -0,0 +1,446 @@
+"""Headless gait analysis: video in, typed arrays out.
+
+Nothing here touches Streamlit, so the same engine runs in the Gait page,
+in batch jobs and from a plain Python shell::
+
+    from stride_sync.analysis import analyze
+    result = analyze("side_run.mp4", "running", "side")
+    result.joints["left_knee"].rom
+
+The work is split in two stages so a UI can reuse the expensive one:
+``load_kinematics`` decodes the clip, runs pose inference and filters the
+joint angles; ``analyze_kinematics`` crops to a time range and derives
+peaks, per-cycle stats, range of motion and asymmetry from those arrays.
+"""
+
+import gc
+from dataclasses import dataclass, field
+from functools import cached_property
+
+import numpy as np
+import pandas as pd
+
+from stride_sync.adaptive import (COARSE_SAMPLE_FPS, DENSE_SAMPLE_FPS, READOUT_ACCELERATION, coarse_extrema,
+                                  dense_frames, merge)
+from stride_sync.autotune import choose_complexity
+from stride_sync.backends import as_backend
+from stride_sync.cycles import cycle_stats, detect_mins, detect_peaks, segment_cycles
+from stride_sync.ensemble import PERCENT, cycle_ensemble
+from stride_sync.events import GaitEvents, detect_gait_events, joint_side
+from stride_sync.filtering import bridge_gaps, butter_lowpass_filter
+from stride_sync.landmarks import LandmarkBuffer
+from stride_sync.pipeline import Pipeline
+from stride_sync.pose import DEFAULT_POSE_SETTINGS, default_pool
+from stride_sync.profiling import annotate, span
+from stride_sync.roi import PersonRoi
+from stride_sync.smoothing import smooth_landmarks
+from stride_sync.store import SessionStore, on_grid, rows_at
+from stride_sync.video import DEFAULT_LONG_EDGE, FrameSource, to_model_input, to_pixels
+
+JOINTS = ("spine_segment", "left_hip", "right_hip", "left_knee", "right_knee", "left_ankle", "right_ankle")
+JOINT_LABELS = {
+    "spine_segment": "Spine Segment",
+    "left_hip": "Left Hip", "right_hip": "Right Hip",
+    "left_knee": "Left Knee", "right_knee": "Right Knee",
+    "left_ankle": "Left Ankle", "right_ankle": "Right Ankle",
+}
+
+MAX_ANALYSED_SECONDS = 12   # longer clips are cropped to their middle 12 s
+TARGET_SAMPLE_FPS = 10      # ~10 analysed frames per second
+SPARSE_SAMPLE_FPS = 7.5     # inference rate when the landmarks are smoothed onto the 10 Hz grid
+CUTOFF_FREQUENCY = 6        # Hz, Butterworth low-pass on joint angles
+PEAK_PROMINENCE = 4         # degrees
+PEAK_MIN_SECONDS = 0.5      # peaks of one joint closer than this are treated as one
+
+
+@dataclass
+class Kinematics:
+    """Filtered joint angles for every analysed frame of a clip."""
+    fps: float
+    frame_skip: int
+    duration: float               # seconds of video that were sampled
+    rotated: bool
+    frame_size: tuple             # (width, height) of the original frame after rotation
+    store: SessionStore           # landmarks, timestamps, validity bits and filtered angles per sample
+    stage_stats: dict = field(default_factory=dict)  # pipeline counters; empty when read from cache
+    model_complexity: int = 1     # pose model used: 0 lite, 1 full, 2 heavy
+
+    @property
+    def sample_rate(self):
+        """Samples per second of the analysed series (every ``frame_skip``-th frame)."""
+        return self.fps / self.frame_skip
+
+    @property
+    def frames(self):
+        """Frame position of each analysed sample."""
+        return self.store.frames
+
+    @property
+    def time(self):
+        """Seconds from the start of the sampled range."""
+        return self.store.time
+
+    @property
+    def angles(self):
+        """Joint name -> filtered angle series (degrees), as views into the store."""
+        return self.store.angle_views()
+
+    @property
+    def landmarks(self):
+        """``(n_samples, 33, 4)`` raw landmarks."""
+        return self.store.landmarks
+
+    @property
+    def world_landmarks(self):
+        """``(n_samples, 33, 4)`` metric hip-centred landmarks."""
+        return self.store.world
+
+    def pixel_landmarks(self):
+        """Raw landmarks with x/y in pixels of the original (rotated) frame."""
+        return to_pixels(self.landmarks, *self.frame_size)
+
+
+@dataclass
+class JointSummary:
+    """Peaks, minima and range of motion of one joint angle series."""
+    peaks: np.ndarray             # sample indices of local maxima
+    mins: np.ndarray              # sample indices of local minima
+    min_angle: float
+    max_angle: float
+    min_std: float
+    max_std: float
+    rom: float
+    cycles: np.ndarray            # structured: cycle, mean, std, max, min (peak to peak)
+
+
+@dataclass
+class GaitResult:
+    """Everything the report needs, as arrays and plain numbers."""
+    gait_type: str
+    camera_side: str
+    fps: float
+    time: np.ndarray
+    angles: dict                  # joint name -> angle series within the time range
+    joints: dict                  # joint name -> JointSummary
+    asymmetry: dict = field(default_factory=dict)  # "Ankle"/"Knee"/"Hip" -> right minus left ROM
+    events: GaitEvents = None     # heel strikes, toe-offs and timing; None when the feet were not usable
+    strides: dict = field(default_factory=dict)    # joint name -> CYCLE_DTYPE stats per gait cycle (heel strike to heel strike)
+
+    def per_stride(self, joint):
+        """Peak and minimum angle of every stride of ``joint``.
+
+        Strides run from heel strike to heel strike of the joint's own foot
+        when gait events were found, else from one angle peak to the next.
+        """
+        if joint in self.strides:
+            return self.strides[joint]["max"], self.strides[joint]["min"]
+        summary, values = self.joints[joint], self.angles[joint]
+        n = min(len(summary.peaks), len(summary.mins))
+        return values[summary.peaks][:n], values[summary.mins][:n]
+
+    def cycle_starts(self, joint):
+        """Fractional sample positions where each cycle of ``joint`` starts.
+
+        Heel strikes of the joint's foot when gait events were found, else
+        the joint's angle peaks.
+        """
+        if self.events is not None:
+            strikes = self.events.heel_strikes[joint_side(joint)]
+            if len(strikes) > 1:
+                return np.interp(strikes, self.time, np.arange(len(self.time)))
+        return self.joints[joint].peaks.astype(float)
+
+    @cached_property
+    def ensembles(self):
+        """Joint name -> time-normalised ``Ensemble`` of its cycles, built on first use.
+
+        The page, the PDF and the CSV export all read this one copy.
+        """
+        return {joint: cycle_ensemble(self.angles[joint], self.cycle_starts(joint)) for joint in JOINTS}
+
+    def ensemble_table(self):
+        """Mean and SD of every joint at each percent of the gait cycle."""
+        table = {"Gait Cycle (%)": PERCENT}
+        for joint, ensemble in self.ensembles.items():
+            table[f"{JOINT_LABELS[joint]} Mean (°)"] = ensemble.mean
+            table[f"{JOINT_LABELS[joint]} SD (°)"] = ensemble.sd
+        return pd.DataFrame(table)
+
+    def rom_table(self):
+        """Per-joint min, max and range of motion in the order the report lists them."""
+        return pd.DataFrame({
+            "Joint": [JOINT_LABELS[joint] for joint in JOINTS],
+            "Min Angle (°)": [self.joints[joint].min_angle for joint in JOINTS],
+            "Max Angle (°)": [self.joints[joint].max_angle for joint in JOINTS],
+            "Range of Motion (°)": [self.joints[joint].rom for joint in JOINTS],
+        })
+
+
+def is_rotated(frame, gait_type):
+    """Landscape frames of gait clips were recorded sideways and need rotating."""
+    return frame.shape[0] < frame.shape[1] and gait_type != "pickup pen"
+
+
+def crop_range(total_frames, fps):
+    """Frame range analysed: the middle 12 seconds of long clips, else all of it."""
+    if total_frames / fps > MAX_ANALYSED_SECONDS:
+        half = MAX_ANALYSED_SECONDS / 2
+        return int(total_frames // 2 - (half * fps)), int(total_frames // 2 + (half * fps))
+    return 0, total_frames
+
+
+def extract_landmarks(video_path, gait_type, pose_pool=None, cache=None, long_edge=DEFAULT_LONG_EDGE,
+                      track_roi=True, model_complexity=1, budget_s=None, sample_fps=None, adaptive=False):
+    """``LandmarkBuffer`` of the sampled frames plus the sampling metadata.
+
+    Frames are shrunk to ``long_edge`` pixels before inference; landmarks are
+    normalised, so they describe the full-resolution frame either way. With
+    ``track_roi`` the model only sees a crop around the runner (``PersonRoi``).
+    ``model_complexity="auto"`` picks the heaviest model that finishes
+    within ``budget_s`` seconds (``stride_sync.autotune``).
+
+    With ``sample_fps`` the model only sees that many frames per second and
+    the landmarks are smoothed, cleaned of outliers and gap-filled onto the
+    usual ~10 Hz grid (``stride_sync.smoothing``), so everything downstream
+    sees the same series as before. It is opt-in: with real inference on the
+    sample clip, 7.5 fps raised the worst peak/trough/ROM error against a
+    dense run from 12.8 to 15.4 degrees (``benchmarks.sampling --infer``),
+    although it saves a quarter of the inferences. ``adaptive`` samples coarsely, then at
+    full rate around the knee flexion peaks (``stride_sync.adaptive``), and
+    smooths onto a full-rate grid instead.
+    """
+    gc.collect()
+    with span("video_open"):
+        source = FrameSource(video_path)
+        fps = source.fps
+        ret, test_frame = source.read_frame(0)
+    if not ret:
+        source.release()
+        raise ValueError("Couldn't read from video.")
+    rotated = is_rotated(test_frame, gait_type)
+    annotate(video_size=[source.width, source.height], video_fps=fps, video_frames=source.frame_count,
+             rotated=rotated, long_edge=long_edge)
+
+    start_frame, end_frame = crop_range(source.frame_count, fps)
+    frame_skip = max(1, int(fps // TARGET_SAMPLE_FPS))
+    sample_step = max(1, int(fps // sample_fps)) if sample_fps else frame_skip
+    if adaptive:
+        sample_step = max(1, int(fps // COARSE_SAMPLE_FPS))  # the dense pass is not known yet
+        frame_skip = max(1, int(fps // DENSE_SAMPLE_FPS))
+    frame_size = (source.height, source.width) if rotated else (source.width, source.height)
+    if model_complexity == "auto":
+        model_complexity, _ = choose_complexity(source, start_frame, end_frame, sample_step, rotated, budget_s,
+                                                long_edge, pose_pool)
+    pose_settings = dict(DEFAULT_POSE_SETTINGS, model_complexity=model_complexity)
+    meta = dict(fps=fps, frame_skip=frame_skip, rotated=rotated, frame_size=frame_size,
+                duration=(end_frame - start_frame) / fps, stage_stats={}, model_complexity=model_complexity)
+
+    # The adaptive read-out interpolates coarse samples at full rate, so it runs stiffer (stride_sync.adaptive)
+    acceleration_scale = READOUT_ACCELERATION if adaptive else 1.0
+    if cache is not None:
+        cache_key = cache.key(video_path, pose=pose_settings, frame_skip="adaptive" if adaptive else sample_step,
+                              start=start_frame, stop=end_frame, rotated=rotated, long_edge=long_edge,
+                              roi=track_roi, world=True)
+        with span("cache_lookup") as stage:
+            cached = cache.load(cache_key)
+            stage["hit"] = cached is not None
+        if cached is not None:
+            source.release()
+            buffer = LandmarkBuffer.from_arrays(**cached)
+            if sample_fps or adaptive:
+                buffer = _smoothed(buffer, meta, start_frame, end_frame, acceleration_scale)
+            return buffer, meta
+
+    pose_pool = pose_pool or default_pool()
+    with source, pose_pool.checkout(**pose_settings) as pose, \
+            span("inference", model_complexity=model_complexity) as stage:
+        if adaptive:
+            buffer, meta["stage_stats"] = collect_landmarks_adaptive(
+                pose, source, start_frame, end_frame, rotated, long_edge, track_roi)
+        else:
+            buffer, meta["stage_stats"] = collect_landmarks(
+                pose, source, start_frame, end_frame, sample_step, rotated, long_edge, track_roi)
+        stage.update(frames=len(buffer), detected=int(buffer.detected[:len(buffer)].sum()),
+                     grabbed=source.frames_grabbed, retrieved=source.frames_retrieved, seeks=source.seeks,
+                     pipeline=meta["stage_stats"])
+
+    if cache is not None:
+        cache.store(cache_key, **buffer.arrays())
+    if sample_fps or adaptive:
+        buffer = _smoothed(buffer, meta, start_frame, end_frame, acceleration_scale)
+    return buffer, meta
+
+
+def _smoothed(buffer, meta, start, stop, acceleration_scale=1.0):
+    """``buffer`` smoothed onto the ``meta["frame_skip"]`` grid over [start, stop); counters go to stage_stats."""
+    with span("smoothing", samples=len(buffer)) as stage:
+        buffer, stats = smooth_landmarks(buffer, meta["fps"], meta["frame_skip"], start, stop,
+                                         acceleration_scale=acceleration_scale)
+        stage.update(stats)
+    meta["stage_stats"] = dict(meta["stage_stats"], smoothing=stats)
+    return buffer
+
+
+def collect_landmarks(pose, source, start, stop, step, rotated=False, long_edge=DEFAULT_LONG_EDGE, track_roi=True,
+                      positions=None):
+    """Run ``pose`` on every ``step``-th frame of ``source`` in [start, stop).
+
+    ``pose`` is a ``PoseBackend`` or a raw MediaPipe engine; it is given
+    each frame's timestamp in the clip. ``positions`` (increasing frame
+    numbers) replaces the regular range. Returns a ``LandmarkBuffer``
+    (preallocated from the frame range, each result converted straight
+    into its row) and the pipeline's per-stage counters.
+    """
+    if positions is None:
+        positions = range(start, stop, step)
+    buffer = LandmarkBuffer(len(positions))
+    roi = PersonRoi() if track_roi else None
+    backend = as_backend(pose)
+    ms_per_frame = 1000.0 / source.fps if source.fps else 1.0
+
+    def decode():
+        for frame_pos, frame in source.frames_at(positions):
+            # The ROI crop depends on the previous frame's landmarks, so with
+            # tracking on the inference stage prepares the frame itself
+            yield frame_pos, (frame if roi is not None else to_model_input(frame, rotated, long_edge))
+
+    def infer(item):
+        # Rows are only ever written from this stage, in frame order
+        frame_pos, frame = item
+        row = buffer.next_row(frame_pos)
+        out, world_out = buffer.landmarks[row], buffer.world[row]
+        timestamp_ms = frame_pos * ms_per_frame
+        if roi is not None:
+            landmarks = roi.process(backend, frame, rotated, long_edge, out, world_out, timestamp_ms)
+        else:
+            landmarks = backend.detect(frame, out, world_out, timestamp_ms)
+        buffer.detected[row] = landmarks is not None
+        return row
+
+    # Decode, inference and collection overlap in separate threads
+    pipeline = Pipeline(decode(), [("inference", infer)])
+    for frame_idx, _ in enumerate(pipeline, 1):
+        # Periodic memory cleanup for very long videos
+        if frame_idx % 50 == 0:
+            gc.collect()
+
+    return buffer.trimmed(), pipeline.stats()
+
+
+def collect_landmarks_adaptive(pose, source, start, stop, rotated=False, long_edge=DEFAULT_LONG_EDGE,
+                               track_roi=True):
+    """Coarse pass over [start, stop), then a dense pass at the knee flexion peaks it finds.
+
+    See ``stride_sync.adaptive``. Returns both passes merged into one
+    ``LandmarkBuffer`` ordered by frame, and per-pass counters.
+    """
+    fps = source.fps
+    coarse_step = max(1, int(fps // COARSE_SAMPLE_FPS))
+    dense_step = max(1, int(fps // DENSE_SAMPLE_FPS))
+    coarse, coarse_stats = collect_landmarks(pose, source, start, stop, coarse_step, rotated, long_edge, track_roi)
+    with span("adaptive_plan", samples=len(coarse)) as stage:
+        extrema, stride = coarse_extrema(coarse, fps, start, stop, PEAK_PROMINENCE,
+                                         max(1.0, fps * PEAK_MIN_SECONDS), CUTOFF_FREQUENCY)
+        # Both passes together must stay below the fixed stride's frame count
+        fixed = len(range(start, stop, max(1, int(fps // TARGET_SAMPLE_FPS))))
+        positions = dense_frames(extrema, start, stop, dense_step, skip=coarse.frames,
+                                 limit=max(0, fixed - len(coarse) - 1))
+        cadence = round(60 * fps / stride, 1) if stride else None  # strides per minute
+        stage.update(extrema=len(extrema), cadence=cadence, dense=len(positions))
+    # The dense pass starts back at the beginning of the clip
+    as_backend(pose).reset()
+    dense, dense_stats = collect_landmarks(pose, source, start, stop, dense_step, rotated, long_edge, track_roi,
+                                           positions=positions)
+    stats = dict(coarse=coarse_stats, dense=dense_stats,
+                 adaptive=dict(coarse=len(coarse), dense=len(dense), extrema=len(extrema), cadence=cadence))
+    return merge(coarse, dense), stats
+
+
+def load_kinematics(video_path, gait_type, pose_pool=None, cache=None, long_edge=DEFAULT_LONG_EDGE,
+                    track_roi=True, model_complexity=1, budget_s=None, sample_fps=None, adaptive=False):
+    """Decode, run pose inference and low-pass filter every joint angle of a clip."""
+    buffer, meta = extract_landmarks(video_path, gait_type, pose_pool, cache, long_edge, track_roi,
+                                     model_complexity, budget_s, sample_fps, adaptive)
+    return kinematics_from_landmarks(buffer, meta)
+
+
+def kinematics_from_landmarks(buffer, meta):
+    """Joint angles and filtering for a ``LandmarkBuffer``, however it was extracted."""
+    # Frames without a detected pose are dropped; the store reuses the buffer's arrays
+    with span("angles", frames=len(buffer)):
+        store = SessionStore(buffer, JOINTS, meta["fps"])
+    # All joints in one zero-phase pass, at the rate the samples were actually taken. The
+    # filter runs on the real sample grid, so dropouts are NaN holes that it bridges
+    with span("filter", samples=len(store)):
+        positions = store.grid_positions(meta["frame_skip"])
+        filtered = butter_lowpass_filter(on_grid(store.angles, positions), CUTOFF_FREQUENCY,
+                                         meta["fps"] / meta["frame_skip"])
+        store.angles[:] = filtered[:, positions]
+    return Kinematics(store=store, **meta)
+
+
+def summarize_joint(values, distance, range_only=False, peaks=None, mins=None):
+    """ROM and per-cycle stats of one series; pass ``peaks``/``mins`` if already segmented."""
+    if peaks is None:
+        peaks = detect_peaks(values, PEAK_PROMINENCE, distance)
+    if mins is None:
+        mins = detect_mins(values, PEAK_PROMINENCE, distance)
+    if range_only:
+        # Spine segment: plain range of the series, not mean peak-to-trough
+        min_angle, max_angle = np.min(values), np.max(values)
+        min_std = max_std = 0.0
+    else:
+        min_angle, max_angle = np.mean(values[mins]), np.mean(values[peaks])
+        min_std, max_std = np.std(values[mins]), np.std(values[peaks])
+    return JointSummary(
+        peaks=peaks, mins=mins,
+        min_angle=float(min_angle), max_angle=float(max_angle),
+        min_std=float(min_std), max_std=float(max_std),
+        rom=float(max_angle - min_angle),
+        cycles=cycle_stats(values, peaks),
+    )
+
+
+def analyze_kinematics(kinematics, gait_type, camera_side, time_range=None):
+    """Peaks, per-cycle stats, ROM and asymmetry within ``time_range`` seconds."""
+    store = kinematics.store
+    rows = store.window(*time_range) if time_range is not None else slice(None)
+    angles = store.angle_views(rows)
+    # Every joint is segmented in one pass over the (joints, samples) table. The
+    # original page used fps / 2 *samples* here, i.e. 1.5 s at ~10 Hz sampling,
+    # which skipped every other stride and averaged only the largest peaks
+    distance = max(1.0, kinematics.sample_rate * PEAK_MIN_SECONDS)
+    # Peaks are found on the sample grid, so the distance is in real samples; a
+    # peak inside a dropout was never measured and is left out
+    positions = store.grid_positions(kinematics.frame_skip, rows)
+    with span("peaks"):
+        grid_peaks, grid_mins = segment_cycles(bridge_gaps(on_grid(store.angles[:, rows], positions)),
+                                               PEAK_PROMINENCE, distance)
+        peaks = [rows_at(positions, found) for found in grid_peaks]
+        mins = [rows_at(positions, found) for found in grid_mins]
+        joints = {joint: summarize_joint(angles[joint], distance, joint == "spine_segment", peaks[i], mins[i])
+                  for i, joint in enumerate(JOINTS)}
+    asymmetry = {
+        "Ankle": joints["right_ankle"].rom - joints["left_ankle"].rom,
+        "Knee": joints["right_knee"].rom - joints["left_knee"].rom,
+        "Hip": joints["right_hip"].rom - joints["left_hip"].rom,
+    }
+
+    # One gait-cycle index per foot; per-stride stats of every joint reuse its side's cycles
+    with span("events"):
+        events = detect_gait_events(store.world[rows], store.time[rows], kinematics.sample_rate, positions)
+    strides = {}
+    if events is not None:
+        for joint in JOINTS:
+            starts = events.cycle_starts[joint_side(joint)]
+            if len(starts) > 1:
+                strides[joint] = cycle_stats(angles[joint], starts)
+    return GaitResult(gait_type=gait_type, camera_side=camera_side, fps=kinematics.fps,
+                      time=store.time[rows], angles=angles, joints=joints, asymmetry=asymmetry,
+                      events=events, strides=strides)
+
+
+def analyze(video_path, gait_type, camera_side, time_range=None, pose_pool=None, cache=None):
+    """Full analysis of one clip without any UI."""
+    kinematics = load_kinematics(video_path, gait_type, pose_pool, cache)
+    return analyze_kinematics(kinematics, gait_type, camera_side, time_range)
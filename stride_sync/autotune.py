@@ -0,0 +1,153 @@
+"""Pick the pose model complexity that fits a clip into a wall-clock budget.
+
+MediaPipe Pose comes in three sizes (0 = lite, 1 = full, 2 = heavy). Full
+is too slow for long 60 fps clips on a small instance, and heavy would be
+affordable for a short walking clip. ``choose_complexity`` times each model
+on a few warm-up frames of the clip, predicts how long the whole sampled
+clip would take with it, and picks the heaviest model whose prediction
+fits the budget (``STRIDE_SYNC_REPORT_BUDGET_S``, 20 s by default). Part of
+the budget is kept back for the angles, plots and PDF.
+
+Inference speed belongs to the machine, not the clip, so the per-frame
+timings are cached per host in a JSON file (``STRIDE_SYNC_AUTOTUNE_FILE``)
+and re-measured after a week or when MediaPipe is upgraded. Decoding
+speed depends on the clip's codec and resolution, so the warm-up frames
+are always decoded and timed. A model that cannot be loaded (heavy and
+lite are downloaded on first use) is recorded as unavailable.
+"""
+
+import json
+import os
+import socket
+import tempfile
+import threading
+import time
+
+from stride_sync.pose import DEFAULT_POSE_SETTINGS, default_pool
+from stride_sync.profiling import annotate, span
+from stride_sync.video import DEFAULT_LONG_EDGE, to_model_input
+
+COMPLEXITY_NAMES = {0: "lite", 1: "full", 2: "heavy"}
+DEFAULT_BUDGET_S = float(os.environ.get("STRIDE_SYNC_REPORT_BUDGET_S", 20))
+AUTOTUNE_FILE = os.environ.get("STRIDE_SYNC_AUTOTUNE_FILE",
+                               os.path.join(tempfile.gettempdir(), "stride_sync_autotune.json"))
+INFERENCE_SHARE = 0.75       # of the budget; the rest is left for angles, plots and the PDF
+WARMUP_FRAMES = 5            # the first one (detection) is not timed
+MAX_AGE_S = 7 * 24 * 3600    # re-measure weekly: instance types and load drift
+
+_lock = threading.Lock()
+
+
+def host_key(long_edge=DEFAULT_LONG_EDGE):
+    """What makes inference timings comparable: machine, MediaPipe version and input size."""
+    import mediapipe as mp
+
+    return f"{socket.gethostname()}/{os.cpu_count()}cpu/mediapipe-{mp.__version__}/long_edge-{long_edge}"
+
+
+def _load(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def cached_timings(key, path=None):
+    """Per-complexity seconds per frame measured on this host, or None if missing or stale."""
+    entry = _load(path or AUTOTUNE_FILE).get(key)
+    if entry is None or time.time() - entry.get("measured", 0) > MAX_AGE_S:
+        return None
+    return {int(complexity): seconds for complexity, seconds in entry["seconds_per_frame"].items()}
+
+
+def store_timings(key, timings, decision=None, path=None):
+    """Record this host's timings (and the latest decision, for reference)."""
+    path = path or AUTOTUNE_FILE
+    with _lock:
+        entries = _load(path)
+        entries[key] = dict(measured=time.time(), seconds_per_frame={str(c): s for c, s in timings.items()},
+                            last_decision=decision)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(entries, f, indent=2)
+        os.replace(tmp, path)
+
+
+def time_complexity(frames, model_complexity, pose_pool=None):
+    """Mean tracking-mode seconds per frame of one model on RGB frames, or None if it cannot load."""
+    pose_pool = pose_pool or default_pool()
+    try:
+        with pose_pool.checkout(model_complexity=model_complexity, **DEFAULT_POSE_SETTINGS) as pose:
+            pose.process(frames[0])  # detection, then tracking like the real run
+            start = time.perf_counter()
+            for frame in frames[1:]:
+                pose.process(frame)
+            return (time.perf_counter() - start) / max(len(frames) - 1, 1)
+    except (OSError, RuntimeError):  # e.g. the model download failed
+        return None
+
+
+def predict_seconds(n_samples, decode_s, infer_s, cpus=None):
+    """Wall time of decoding and inferring ``n_samples`` frames; the pipeline overlaps them on 2+ cores."""
+    cpus = cpus or os.cpu_count() or 1
+    per_frame = max(decode_s, infer_s) if cpus > 1 else decode_s + infer_s
+    return n_samples * per_frame
+
+
+def pick(timings, n_samples, decode_s, budget_s, cpus=None):
+    """Heaviest complexity predicted to fit the budget.
+
+    If none fits, the heaviest of the fastest ones: when decoding is the
+    bottleneck a heavier model costs nothing extra.
+    """
+    available = {c: s for c, s in timings.items() if s is not None}
+    if not available:
+        return 1, {}
+    predicted = {c: predict_seconds(n_samples, decode_s, s, cpus) for c, s in available.items()}
+    fitting = [c for c, seconds in predicted.items() if seconds <= budget_s * INFERENCE_SHARE]
+    if not fitting:
+        fastest = min(predicted.values())
+        fitting = [c for c, seconds in predicted.items() if seconds <= fastest * 1.01]
+    return max(fitting), predicted
+
+
+def choose_complexity(source, start, stop, step, rotated=False, budget_s=None, long_edge=DEFAULT_LONG_EDGE,
+                      pose_pool=None, workers=1, path=None):
+    """Model complexity for sampling ``source`` over [start, stop) by ``step`` within ``budget_s``.
+
+    ``workers`` processes share the samples. Returns the complexity and a
+    dict describing the decision, which is also attached to the active
+    profile.
+    """
+    budget_s = DEFAULT_BUDGET_S if budget_s is None else budget_s
+    n_samples = -(-len(range(start, stop, step)) // max(1, workers))
+    with span("autotune", samples=n_samples, budget_s=budget_s) as stage:
+        decode_start = time.perf_counter()
+        frames = []
+        for _, frame in source.frames(start, min(stop, start + WARMUP_FRAMES * step), step):
+            frames.append(frame)
+        decode_s = (time.perf_counter() - decode_start) / max(len(frames), 1)
+
+        key = host_key(long_edge)
+        timings = cached_timings(key, path)
+        cached = timings is not None
+        if not cached and frames:
+            model_inputs = [to_model_input(frame, rotated, long_edge) for frame in frames]
+            timings = {c: time_complexity(model_inputs, c, pose_pool) for c in COMPLEXITY_NAMES}
+        timings = timings or {}
+        choice, predicted = pick(timings, n_samples, decode_s, budget_s,
+                                 cpus=max(1, (os.cpu_count() or 1) // max(1, workers)))
+        decision = dict(model_complexity=choice, model=COMPLEXITY_NAMES[choice], budget_s=budget_s,
+                        samples=n_samples, decode_s_per_frame=round(decode_s, 5), cached=cached,
+                        seconds_per_frame={COMPLEXITY_NAMES[c]: None if s is None else round(s, 5)
+                                           for c, s in timings.items()},
+                        predicted_s={COMPLEXITY_NAMES[c]: round(s, 2) for c, s in predicted.items()})
+        if not cached and timings:
+            try:
+                store_timings(key, timings, decision, path)
+            except OSError:
+                pass  # a read-only temp dir only costs a re-measure next time
+        stage.update(model=decision["model"], cached=cached)
+    annotate(autotune=decision)
+    return choice, decision
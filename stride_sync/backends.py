@@ -0,0 +1,276 @@
+"""Interchangeable pose models behind one ``PoseBackend`` interface.
+
+Every backend takes an RGB model input (``to_model_input``) and writes the
+same landmark tensor the rest of the engine reads: ``(33, 4)`` float32
+x/y/z/visibility in BlazePose order, normalised to the image, plus the
+metric hip-centred world landmarks where the model has them (NaN where it
+does not). ``detect`` returns the filled array, or None without a pose,
+exactly like ``pose_array``.
+
+- ``legacy``: ``mp.solutions.pose.Pose``, the graph the app has always
+  used. ``as_backend`` wraps a raw engine (e.g. one checked out of the
+  ``PoseEnginePool``), so existing callers keep passing engines.
+- ``tasks``: the MediaPipe Tasks ``PoseLandmarker`` in VIDEO running mode,
+  fed the frame's timestamp so it tracks between frames and re-detects
+  when it loses the person. Building it loads the model, so ``reset``
+  (called by ``PersonRoi`` on every crop move and lost track) keeps it and
+  its timestamps running; it is only rebuilt when a frame's timestamp goes
+  back, e.g. at the start of a new range. ``resets`` counts rebuilds. It needs a
+  ``.task`` model bundle (``pose_landmarker_{lite,full,heavy}.task``),
+  given as ``model_path`` or ``STRIDE_SYNC_POSE_TASK_MODEL``.
+- ``movenet``: a MoveNet single-pose TFLite model from a local file
+  (``model_path`` or ``STRIDE_SYNC_MOVENET_MODEL``), run with the LiteRT /
+  tflite-runtime / TensorFlow interpreter, whichever is installed. MoveNet
+  has the 17 COCO keypoints only: no heels, foot indices or world
+  landmarks, so ankle angles and gait events are NaN with it.
+"""
+
+import os
+
+import cv2
+import numpy as np
+
+from stride_sync.landmarks import LANDMARK_COUNT, pose_array
+
+# BlazePose index of each of MoveNet's 17 COCO keypoints
+COCO_TO_BLAZEPOSE = (0, 2, 5, 7, 8, 11, 12, 13, 14, 15, 16, 23, 24, 25, 26, 27, 28)
+
+
+class PoseBackend:
+    """Interface of a pose model; subclasses implement ``detect``."""
+
+    name = "backend"
+    has_world = False
+
+    def detect(self, image, out=None, world_out=None, timestamp_ms=None):
+        """``(33, 4)`` landmarks of an RGB image (into ``out`` if given), or None without a pose.
+
+        ``timestamp_ms`` is the frame's time in the clip; backends that
+        track between frames need it to increase from call to call.
+        """
+        raise NotImplementedError
+
+    def reset(self):
+        """Forget tracking state, e.g. before an unrelated frame or a new crop."""
+
+    def close(self):
+        """Release the model."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def _empty(out, world_out):
+    if out is None:
+        out = np.empty((LANDMARK_COUNT, 4), dtype=np.float32)
+    if world_out is not None:
+        world_out[:] = np.nan
+    return out
+
+
+class LegacyPoseBackend(PoseBackend):
+    """``mp.solutions.pose.Pose``; pass an existing engine or the settings to build one."""
+
+    name = "legacy"
+    has_world = True
+
+    def __init__(self, pose=None, model_complexity=1, min_detection_confidence=0.5, min_tracking_confidence=0.5):
+        self.owned = pose is None
+        if pose is None:
+            import mediapipe as mp
+            pose = mp.solutions.pose.Pose(model_complexity=model_complexity,
+                                          min_detection_confidence=min_detection_confidence,
+                                          min_tracking_confidence=min_tracking_confidence)
+        self.pose = pose
+
+    def detect(self, image, out=None, world_out=None, timestamp_ms=None):
+        return pose_array(self.pose.process(image), out, world_out)
+
+    def reset(self):
+        self.pose.reset()
+
+    def close(self):
+        if self.owned:
+            self.pose.close()
+
+
+class TasksPoseBackend(PoseBackend):
+    """MediaPipe Tasks ``PoseLandmarker`` in VIDEO mode."""
+
+    name = "tasks"
+    has_world = True
+
+    def __init__(self, model_path=None, min_detection_confidence=0.5, min_tracking_confidence=0.5,
+                 min_presence_confidence=0.5):
+        self.model_path = model_path or os.environ.get("STRIDE_SYNC_POSE_TASK_MODEL")
+        if not self.model_path or not os.path.exists(self.model_path):
+            raise FileNotFoundError(f"PoseLandmarker model bundle not found: {self.model_path!r} "
+                                    "(pass model_path or set STRIDE_SYNC_POSE_TASK_MODEL)")
+        self.settings = dict(min_pose_detection_confidence=min_detection_confidence,
+                             min_tracking_confidence=min_tracking_confidence,
+                             min_pose_presence_confidence=min_presence_confidence)
+        self.landmarker = None
+        self.last_timestamp = -1
+        self.resets = 0
+
+    def _create(self):
+        from mediapipe.tasks.python import BaseOptions
+        from mediapipe.tasks.python.vision import PoseLandmarker, PoseLandmarkerOptions, RunningMode
+
+        options = PoseLandmarkerOptions(base_options=BaseOptions(model_asset_path=self.model_path),
+                                        running_mode=RunningMode.VIDEO, num_poses=1, **self.settings)
+        return PoseLandmarker.create_from_options(options)
+
+    def detect(self, image, out=None, world_out=None, timestamp_ms=None):
+        import mediapipe as mp
+
+        timestamp = self.last_timestamp + 1 if timestamp_ms is None else int(timestamp_ms)
+        if timestamp < self.last_timestamp:
+            # VIDEO mode only runs forward: an earlier frame starts a new landmarker
+            self._restart()
+        # A frame retried uncropped repeats its timestamp, which VIDEO mode rejects
+        timestamp = self.last_timestamp = max(timestamp, self.last_timestamp + 1)
+        if self.landmarker is None:
+            self.landmarker = self._create()
+        frame = mp.Image(image_format=mp.ImageFormat.SRGB, data=np.ascontiguousarray(image))
+        result = self.landmarker.detect_for_video(frame, timestamp)
+        if not result.pose_landmarks:
+            return None
+        out = _empty(out, world_out)
+        _task_landmarks(result.pose_landmarks[0], out)
+        if world_out is not None and result.pose_world_landmarks:
+            _task_landmarks(result.pose_world_landmarks[0], world_out)
+        return out
+
+    def _restart(self):
+        if self.landmarker is not None:
+            self.landmarker.close()
+            self.landmarker = None
+            self.resets += 1
+        self.last_timestamp = -1
+
+    def reset(self):
+        # The landmarker has no reset and rebuilding it reloads the model; it re-detects
+        # by itself when tracking fails, so a moved crop or lost track only needs the
+        # timestamps to keep increasing
+        pass
+
+    def close(self):
+        if self.landmarker is not None:
+            self.landmarker.close()
+            self.landmarker = None
+
+
+def _task_landmarks(landmarks, out):
+    # Tasks landmarks are plain dataclasses; visibility is optional
+    out[:] = [(lm.x, lm.y, lm.z, np.nan if lm.visibility is None else lm.visibility) for lm in landmarks]
+
+
+def letterbox(image, size, out=None, box=None):
+    """Resize an image into a zero-padded ``size`` x ``size`` square.
+
+    ``box`` is where the image goes, as ``(u0, v0, u1, v1)`` normalised to
+    the square; by default it is centred with its aspect ratio kept.
+    Returns the square (written into ``out`` when given) and the box as
+    placed; pass that to ``from_letterbox`` to map the model's output back
+    to the image.
+    """
+    height, width = image.shape[:2]
+    if box is None:
+        scale = size / max(height, width)
+        new_width, new_height = max(1, round(width * scale)), max(1, round(height * scale))
+        left, top = (size - new_width) // 2, (size - new_height) // 2
+    else:
+        left, top, right, bottom = (int(round(edge * size)) for edge in box)
+        new_width, new_height = max(1, right - left), max(1, bottom - top)
+    resized = cv2.resize(image, (new_width, new_height), interpolation=cv2.INTER_AREA)
+    if out is None:
+        out = np.empty((size, size) + image.shape[2:], dtype=image.dtype)
+    out[:] = 0
+    out[top:top + new_height, left:left + new_width] = resized
+    return out, (left / size, top / size, (left + new_width) / size, (top + new_height) / size)
+
+
+def from_letterbox(landmarks, box):
+    """Map square-normalised ``(..., 3+)`` landmarks to the letterboxed image, in place."""
+    u0, v0, u1, v1 = box
+    landmarks[..., 0] = (landmarks[..., 0] - u0) / (u1 - u0)
+    landmarks[..., 1] = (landmarks[..., 1] - v0) / (v1 - v0)
+    landmarks[..., 2] /= u1 - u0
+    return landmarks
+
+
+def load_interpreter(model_path, num_threads=None):
+    """A TFLite interpreter from whichever runtime is installed (LiteRT, tflite-runtime, TensorFlow)."""
+    try:
+        from ai_edge_litert.interpreter import Interpreter
+    except ImportError:
+        try:
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            try:
+                import tensorflow as tf
+                Interpreter = tf.lite.Interpreter
+            except ImportError:
+                raise ImportError("Running a .tflite model needs ai-edge-litert, tflite-runtime or tensorflow") from None
+    return Interpreter(model_path=str(model_path), num_threads=num_threads)
+
+
+class MoveNetBackend(PoseBackend):
+    """MoveNet single-pose (Lightning or Thunder) TFLite model from a local file."""
+
+    name = "movenet"
+    has_world = False
+
+    def __init__(self, model_path=None, num_threads=None, min_score=0.2):
+        self.model_path = model_path or os.environ.get("STRIDE_SYNC_MOVENET_MODEL")
+        if not self.model_path or not os.path.exists(self.model_path):
+            raise FileNotFoundError(f"MoveNet model not found: {self.model_path!r} "
+                                    "(pass model_path or set STRIDE_SYNC_MOVENET_MODEL)")
+        self.interpreter = load_interpreter(self.model_path, num_threads)
+        self.interpreter.allocate_tensors()
+        self.input = self.interpreter.get_input_details()[0]
+        self.output = self.interpreter.get_output_details()[0]
+        self.size = int(self.input["shape"][1])  # 192 for Lightning, 256 for Thunder
+        self.min_score = min_score
+
+    def detect(self, image, out=None, world_out=None, timestamp_ms=None):
+        square, box = letterbox(image, self.size)
+        self.interpreter.set_tensor(self.input["index"], square.astype(self.input["dtype"])[None])
+        self.interpreter.invoke()
+        keypoints = self.interpreter.get_tensor(self.output["index"]).reshape(-1, 3)  # (17, 3) y, x, score
+        return self.write(keypoints, box, out, world_out)
+
+    def write(self, keypoints, box, out=None, world_out=None):
+        """BlazePose-layout landmarks from MoveNet's ``(17, 3)`` y/x/score output."""
+        if np.mean(keypoints[:, 2]) < self.min_score:
+            return None
+        out = _empty(out, world_out)
+        out[:] = np.nan
+        out[:, 3] = 0.0
+        index = list(COCO_TO_BLAZEPOSE)
+        out[index, 0] = keypoints[:, 1]
+        out[index, 1] = keypoints[:, 0]
+        out[index, 2] = 0.0
+        out[index, 3] = keypoints[:, 2]
+        return from_letterbox(out, box)
+
+
+BACKENDS = {backend.name: backend for backend in (LegacyPoseBackend, TasksPoseBackend, MoveNetBackend)}
+
+
+def create_backend(name, **options):
+    """Build a backend by name (``legacy``, ``tasks`` or ``movenet``)."""
+    try:
+        backend = BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown pose backend {name!r}; choose from {sorted(BACKENDS)}") from None
+    return backend(**options)
+
+
+def as_backend(pose):
+    """``pose`` itself if it is a ``PoseBackend``, else a raw ``mp_pose.Pose`` wrapped as one."""
+    return pose if isinstance(pose, PoseBackend) else LegacyPoseBackend(pose)
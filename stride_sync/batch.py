@@ -0,0 +1,200 @@
+"""Parallel pose extraction for batches of uploaded clips.
+
+Each worker process builds one Pose engine when it starts and keeps it for
+every chunk it is handed. Long videos are split into frame ranges so one
+long clip does not leave the other cores idle. The caller consumes
+``run_batch`` as a generator and gets a progress event every time a chunk
+finishes; a clip's output is written as soon as its last chunk is in.
+
+The default output is the knee-angle CSV. With ``export_format`` set to
+``"ndjson"`` or ``"parquet"`` each chunk instead streams every landmark and
+joint angle to its own part file (see ``stride_sync.export``), and the parts
+are joined in order once the clip is done, so no worker or the parent ever
+holds a whole recording in memory.
+
+With ``offline=True`` each worker runs the batched TFLite landmark model
+of ``stride_sync.offline`` instead of the live graph frame by frame, and
+the interpreter threads are split between the workers.
+"""
+
+import multiprocessing
+import os
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import cv2
+import mediapipe as mp
+import numpy as np
+import pandas as pd
+
+from stride_sync.export import concat_exports, export_landmarks
+from stride_sync.kinematics import joint_angles
+from stride_sync.landmarks import LandmarkBuffer
+from stride_sync.offline import BatchPoseModel, collect_landmarks_offline
+from stride_sync.pose import DEFAULT_POSE_SETTINGS
+from stride_sync.roi import PersonRoi
+from stride_sync.video import FrameSource
+
+BatchJob = namedtuple("BatchJob", ["name", "video_path", "output_path"])
+BatchProgress = namedtuple("BatchProgress", ["index", "name", "chunks_done", "chunks_total", "output_path"])
+
+DEFAULT_CHUNK_FRAMES = 1800   # ~1 minute at 30 fps
+WORKER_BASE_MB = 350          # Pose graph, TFLite model and interpreter arenas
+FRAME_COPIES = 4              # decoded BGR, rotated copy, RGB copy, model input
+
+
+def extract_joint_angles(pose, video_path, start=0, stop=None, model=None):
+    """Knee angles for every frame in [start, stop) as a list of CSV rows.
+
+    With a ``BatchPoseModel`` the frames go through it in batches and
+    ``pose`` only places the crops.
+    """
+    roi = PersonRoi()
+
+    with FrameSource(video_path) as source:
+        if stop is None:
+            stop = source.frame_count if source.frame_count > 0 else np.iinfo(np.int32).max
+        if model is not None:
+            buffer, _ = collect_landmarks_offline(source, start, stop, 1, model=model, pose=pose)
+        else:
+            buffer = LandmarkBuffer(min(stop, max(source.frame_count, start)) - start)
+            for frame_pos, frame in source.frames(start, stop):
+                row = buffer.next_row(frame_pos)
+                landmarks = roi.process(pose, frame, out=buffer.landmarks[row], world_out=buffer.world[row])
+                buffer.detected[row] = landmarks is not None
+
+    buffer = buffer.trimmed()
+    angles = joint_angles(buffer.landmarks[buffer.detected, :, :2].astype(float))
+    # 1-based, matching cap.get(CAP_PROP_POS_FRAMES) after a read
+    frame_numbers = buffer.frames[buffer.detected] + 1
+    return [
+        {"Frame": frame, "Left Knee Angle": left, "Right Knee Angle": right}
+        for frame, left, right in zip(frame_numbers.tolist(), angles["left_knee"], angles["right_knee"])
+    ]
+
+
+def plan_chunks(frame_count, chunk_frames=DEFAULT_CHUNK_FRAMES):
+    """Split a clip into consecutive ``(start, stop)`` frame ranges."""
+    if frame_count <= 0:
+        return [(0, None)]  # unknown length: decode to the end in one chunk
+    chunk_frames = max(1, int(chunk_frames))
+    return [(start, min(start + chunk_frames, frame_count))
+            for start in range(0, frame_count, chunk_frames)]
+
+
+def worker_memory_mb(width, height):
+    """Rough resident size of one worker decoding frames of this size."""
+    frame_mb = width * height * 3 / (1024 * 1024)
+    return WORKER_BASE_MB + FRAME_COPIES * frame_mb
+
+
+def plan_workers(requested, memory_limit_mb, per_worker_mb, n_tasks):
+    """Largest worker count that fits the CPU count, task count and memory ceiling."""
+    cpus = os.cpu_count() or 1
+    workers = requested or cpus
+    if memory_limit_mb:
+        workers = min(workers, int(memory_limit_mb // per_worker_mb))
+    return max(1, min(workers, cpus, n_tasks))
+
+
+_worker_pose = None
+_worker_model = None
+
+
+def init_worker(pose_settings, offline_threads=None):
+    """Process-pool initializer: one Pose engine (and batched model) per worker process."""
+    global _worker_pose, _worker_model
+    _worker_pose = mp.solutions.pose.Pose(**pose_settings)
+    if offline_threads:
+        _worker_model = BatchPoseModel(num_threads=offline_threads)
+
+
+def worker_pose():
+    """This worker process's Pose engine, built by ``init_worker``."""
+    if _worker_pose is None:
+        raise RuntimeError("init_worker has not run in this process")
+    return _worker_pose
+
+
+def _run_chunk(video_path, start, stop, export_format="csv", part_path=None):
+    # Chunks from different clips share a worker, so never carry tracking over
+    _worker_pose.reset()
+    if export_format == "csv":
+        return extract_joint_angles(_worker_pose, video_path, start, stop, _worker_model)
+    return export_landmarks(_worker_pose, video_path, part_path, export_format, start, stop, model=_worker_model)
+
+
+def _part_path(output_path, chunk):
+    return f"{output_path}.part{chunk:04d}"
+
+
+def _write_output(job, chunk_results, export_format):
+    if export_format == "csv":
+        rows = [row for chunk_rows in chunk_results for row in chunk_rows]
+        pd.DataFrame(rows).to_csv(job.output_path, index=False)
+    else:
+        concat_exports(chunk_results, job.output_path, export_format)
+
+
+def run_batch(jobs, workers=None, memory_limit_mb=None, chunk_frames=DEFAULT_CHUNK_FRAMES, export_format="csv",
+              offline=False):
+    """Process ``BatchJob``s in parallel, yielding a ``BatchProgress`` per finished chunk.
+
+    ``export_format`` is ``"csv"`` (knee angles), ``"ndjson"`` or ``"parquet"``.
+    ``offline`` switches the workers to batched TFLite inference.
+    """
+    plans = []
+    per_worker_mb = WORKER_BASE_MB
+    for job in jobs:
+        cap = cv2.VideoCapture(job.video_path)
+        frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        cap.release()
+        plans.append(plan_chunks(frame_count, chunk_frames))
+        per_worker_mb = max(per_worker_mb, worker_memory_mb(width, height))
+
+    tasks = [(index, chunk, start, stop)
+             for index, plan in enumerate(plans)
+             for chunk, (start, stop) in enumerate(plan)]
+    if not tasks:
+        return
+    n_workers = plan_workers(workers, memory_limit_mb, per_worker_mb, len(tasks))
+    offline_threads = max(1, (os.cpu_count() or 1) // n_workers) if offline else None
+
+    results = [[None] * len(plan) for plan in plans]
+    remaining = [len(plan) for plan in plans]
+
+    # spawn, not fork: the Streamlit server process is multi-threaded
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=n_workers, mp_context=context, initializer=init_worker,
+                             initargs=(DEFAULT_POSE_SETTINGS, offline_threads)) as executor:
+        pending = {}
+        task_iter = iter(tasks)
+
+        def submit_next():
+            task = next(task_iter, None)
+            if task is not None:
+                index, chunk, start, stop = task
+                future = executor.submit(_run_chunk, jobs[index].video_path, start, stop,
+                                         export_format, _part_path(jobs[index].output_path, chunk))
+                pending[future] = (index, chunk)
+
+        # Keep only one chunk in flight per worker so finished rows never pile up
+        for _ in range(n_workers):
+            submit_next()
+
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                index, chunk = pending.pop(future)
+                results[index][chunk] = future.result()
+                remaining[index] -= 1
+                submit_next()
+
+                job = jobs[index]
+                if remaining[index] == 0:
+                    _write_output(job, results[index], export_format)
+                    results[index] = None
+                yield BatchProgress(index, job.name, len(plans[index]) - remaining[index],
+                                    len(plans[index]), job.output_path)
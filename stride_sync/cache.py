@@ -0,0 +1,103 @@
+"""On-disk landmark cache keyed by video content and inference settings.
+
+Streamlit reruns the whole page script whenever a widget changes, so a
+slider move or a new footwear string would otherwise re-run MediaPipe on
+every frame of a clip that was already analysed. The cache stores the raw
+landmark arrays of a clip as an uncompressed ``.npz`` file named after the
+SHA-256 of the video bytes plus the settings that affect inference. The
+directory is kept under a size cap by evicting the least recently used
+files first.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+
+import numpy as np
+
+DEFAULT_CACHE_DIR = os.path.join(tempfile.gettempdir(), "stride_sync_landmarks")
+DEFAULT_MAX_MB = 512
+
+
+def file_sha256(path, block_size=1 << 20):
+    """SHA-256 of a file's bytes, read in blocks so large clips stay off the heap."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class LandmarkCache:
+    """LRU-capped directory of ``<key>.npz`` landmark arrays."""
+
+    def __init__(self, root=None, max_mb=None):
+        self.root = root or os.environ.get("STRIDE_SYNC_CACHE_DIR", DEFAULT_CACHE_DIR)
+        self.max_bytes = int(float(max_mb or os.environ.get("STRIDE_SYNC_CACHE_MB", DEFAULT_MAX_MB)) * 1024 * 1024)
+        self._lock = threading.Lock()
+        self._digests = {}  # (path, size, mtime) -> content hash, so reruns skip re-hashing
+        os.makedirs(self.root, exist_ok=True)
+
+    def video_digest(self, video_path):
+        stat = os.stat(video_path)
+        ident = (os.path.abspath(video_path), stat.st_size, stat.st_mtime_ns)
+        digest = self._digests.get(ident)
+        if digest is None:
+            digest = self._digests[ident] = file_sha256(video_path)
+        return digest
+
+    def key(self, video_path, **settings):
+        """Cache key for a clip's content plus every setting that changes its landmarks."""
+        payload = json.dumps(settings, sort_keys=True, default=str)
+        return hashlib.sha256((self.video_digest(video_path) + payload).encode()).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.root, key + ".npz")
+
+    def load(self, key):
+        """Arrays stored under ``key`` as a dict, or None on a miss."""
+        path = self._path(key)
+        try:
+            with np.load(path) as data:
+                arrays = {name: data[name] for name in data.files}
+            os.utime(path)  # mark as recently used
+        except (OSError, ValueError, KeyError):
+            return None
+        return arrays
+
+    def store(self, key, **arrays):
+        """Write arrays under ``key`` atomically, then evict down to the size cap."""
+        path = self._path(key)
+        fd, tmp_path = tempfile.mkstemp(suffix=".tmp", dir=self.root)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.savez(f, **arrays)
+            os.replace(tmp_path, path)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+        self.evict()
+
+    def evict(self):
+        """Delete least recently used entries until the directory fits ``max_bytes``."""
+        with self._lock:
+            entries = []
+            for entry in os.scandir(self.root):
+                if entry.name.endswith(".npz"):
+                    try:
+                        stat = entry.stat()
+                    except OSError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                total -= size
@@ -0,0 +1,77 @@
+"""Cycle segmentation of joint-angle series.
+
+``segment_cycles`` takes the ``(joints, samples)`` angle table once and
+returns the peak and minimum indices of every row. The rows are laid end to
+end with a run of ``+inf`` between them, which ends every prominence search
+at the row boundary and keeps rows further apart than ``distance``, so one
+``find_peaks`` call per direction gives the same indices as one call per
+row.
+
+``cycle_stats`` reduces a row's peak-to-peak cycles to mean/std/max/min with
+``ufunc.reduceat`` over the span between the first and last peak, so the
+cost grows with the number of samples rather than with a Python loop per
+stride.
+"""
+
+import numpy as np
+from scipy.signal import find_peaks
+
+CYCLE_DTYPE = np.dtype([("cycle", int), ("mean", float), ("std", float), ("max", float), ("min", float)])
+
+
+def detect_peaks(values, prominence, distance):
+    peaks, _ = find_peaks(values, prominence=prominence, distance=distance)
+    return peaks
+
+
+def detect_mins(values, prominence, distance):
+    mins, _ = find_peaks(-values, prominence=prominence, distance=distance)
+    return mins
+
+
+def _find_all(table, prominence, distance):
+    """``find_peaks`` indices for every row of ``table`` from a single call."""
+    n_rows, n = table.shape
+    gap = 2 * int(np.ceil(max(distance, 1))) + 1
+    stride = n + gap
+    flat = np.full((n_rows, stride), np.inf)
+    flat[:, :n] = table
+    found, _ = find_peaks(flat.ravel(), prominence=prominence, distance=distance)
+    row, pos = np.divmod(found, stride)
+    keep = pos < n  # the +inf separators are peaks themselves
+    row, pos = row[keep], pos[keep]
+    bounds = np.searchsorted(row, np.arange(n_rows + 1))
+    return [pos[bounds[i]:bounds[i + 1]] for i in range(n_rows)]
+
+
+def segment_cycles(angles, prominence, distance):
+    """Peak and minimum indices of every row of a ``(channels, samples)`` array.
+
+    Returns two lists with one index array per row, matching
+    ``detect_peaks`` / ``detect_mins`` on each row separately.
+    """
+    table = np.asarray(angles, dtype=float)
+    if table.ndim != 2:
+        raise ValueError(f"Expected a (channels, samples) array, got shape {table.shape}")
+    if table.shape[1] < 3:
+        empty = [np.zeros(0, dtype=np.intp) for _ in range(table.shape[0])]
+        return empty, list(empty)
+    return _find_all(table, prominence, distance), _find_all(-table, prominence, distance)
+
+
+def cycle_stats(values, peaks):
+    """Mean, std, max and min of every peak-to-peak cycle."""
+    stats = np.zeros(max(len(peaks) - 1, 0), dtype=CYCLE_DTYPE)
+    if len(stats) == 0:
+        return stats
+    span = np.asarray(values[peaks[0]:peaks[-1]], dtype=float)
+    starts = np.asarray(peaks[:-1]) - peaks[0]
+    lengths = np.diff(peaks)
+    mean = np.add.reduceat(span, starts) / lengths
+    deviation = span - np.repeat(mean, lengths)
+    stats["cycle"] = np.arange(1, len(stats) + 1)
+    stats["mean"] = mean
+    stats["std"] = np.sqrt(np.add.reduceat(deviation * deviation, starts) / lengths)
+    stats["max"] = np.maximum.reduceat(span, starts)
+    stats["min"] = np.minimum.reduceat(span, starts)
+    return stats
@@ -0,0 +1,181 @@
+"""Heel-strike and toe-off detection from the heel and foot-index landmarks.
+
+Uses MediaPipe's world landmarks, which are metric and centred on the hips,
+so the feet are already expressed relative to the pelvis whatever the
+camera angle. The forward direction is the principal axis of foot motion
+in the horizontal (x, z) plane, signed so the heel sits lowest at its
+forward extreme. Along that axis (Zeni et al., 2008):
+
+- initial contact is where the heel is furthest forward, i.e. its forward
+  velocity crosses zero from positive to negative;
+- toe-off is where the foot index is furthest back, i.e. its velocity
+  crosses zero from negative to positive.
+
+Extremes are picked with ``find_peaks`` (a minimum stride spacing and a
+prominence relative to the trajectory's spread) and refined to sub-sample
+time by the parabola through the three samples around each one, which is
+where the interpolated velocity crosses zero. At ~10 samples per second
+that refinement is worth more than the sampling interval itself.
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+from scipy.signal import find_peaks
+
+from stride_sync.filtering import bridge_gaps, butter_lowpass_filter
+from stride_sync.kinematics import LEFT_FOOT, LEFT_HEEL, RIGHT_FOOT, RIGHT_HEEL
+from stride_sync.store import on_grid
+
+SIDES = ("left", "right")
+FOOT_LANDMARKS = (LEFT_HEEL, RIGHT_HEEL, LEFT_FOOT, RIGHT_FOOT)  # heels in SIDES order, then toes
+EVENT_CUTOFF = 6            # Hz, low-pass on the foot trajectories before finding extremes
+MIN_STRIDE_SECONDS = 0.4    # heel strikes of one foot closer than this are treated as one
+EVENT_PROMINENCE = 0.3      # fraction of the trajectory's 5-95 % spread an extreme must stand out by
+
+
+@dataclass
+class GaitEvents:
+    """Gait events of both feet and the timing measures derived from them."""
+    heel_strikes: dict        # side -> initial-contact times (s)
+    toe_offs: dict            # side -> toe-off times (s)
+    stride_times: dict        # side -> seconds between consecutive heel strikes of that foot
+    step_times: np.ndarray    # seconds between consecutive heel strikes of opposite feet
+    cadence: float            # steps per minute
+    stance_percent: dict      # side -> stance phase of each stride, % of the stride (NaN without a toe-off)
+    swing_percent: dict       # side -> 100 - stance_percent
+    cycle_starts: dict        # side -> sample index of each heel strike: the gait-cycle boundaries
+    cycle_index: dict         # side -> stride number of every sample, -1 outside complete strides
+
+    def summary(self):
+        """Mean timing measures per side, for tables and reports."""
+        rows = {}
+        for side in SIDES:
+            rows[side.title()] = {
+                "Strides": len(self.stride_times[side]),
+                "Stride Time (s)": _mean(self.stride_times[side]),
+                "Stance (%)": _mean(self.stance_percent[side]),
+                "Swing (%)": _mean(self.swing_percent[side]),
+            }
+        return rows
+
+
+def joint_side(joint):
+    """Foot whose gait cycles a joint is measured over; central joints follow the left foot."""
+    return "right" if joint.startswith("right_") else "left"
+
+
+def _mean(values):
+    values = np.asarray(values, dtype=float)
+    values = values[~np.isnan(values)]
+    return float(values.mean()) if values.size else float("nan")
+
+
+def forward_axis(feet, heel_height):
+    """Unit forward direction in the (x, z) plane from hip-centred foot positions.
+
+    ``feet`` is ``(n, k, 2)`` x/z of heel and toe landmarks, ``heel_height``
+    ``(n, 2)`` world y of both heels (y points down).
+    """
+    points = feet.reshape(-1, 2)
+    points = points[~np.isnan(points).any(axis=1)]
+    if len(points) < 3:
+        return None
+    _, _, vt = np.linalg.svd(points - points.mean(axis=0), full_matrices=False)
+    axis = vt[0]
+    # The heel is on the ground (largest y) when it is furthest forward
+    heels = feet[:, :2] @ axis
+    ok = ~np.isnan(heels).any(axis=1) & ~np.isnan(heel_height).any(axis=1)
+    if ok.sum() < 3:
+        return axis
+    heels, height = heels[ok] - heels[ok].mean(axis=0), heel_height[ok] - heel_height[ok].mean(axis=0)
+    return axis if np.sum(heels * height) >= 0 else -axis
+
+
+def extreme_samples(trajectory, sample_rate, maxima=True):
+    """Fractional sample positions of the maxima (or minima) of one trajectory."""
+    x = trajectory if maxima else -trajectory
+    finite = x[~np.isnan(x)]
+    if finite.size < 3:
+        return np.zeros(0)
+    spread = np.percentile(finite, 95) - np.percentile(finite, 5)
+    peaks, _ = find_peaks(x, distance=max(1.0, MIN_STRIDE_SECONDS * sample_rate),
+                          prominence=EVENT_PROMINENCE * spread)
+    peaks = peaks[(peaks > 0) & (peaks < len(x) - 1)]
+    before, at, after = x[peaks - 1], x[peaks], x[peaks + 1]
+    curvature = before - 2 * at + after
+    safe = np.where(curvature == 0, 1.0, curvature)
+    offset = np.where(curvature == 0, 0.0, 0.5 * (before - after) / safe)
+    return peaks + np.clip(offset, -0.5, 0.5)
+
+
+def stance_percent(heel_strikes, toe_offs):
+    """Stance share of each stride: first toe-off between consecutive heel strikes."""
+    starts, ends = heel_strikes[:-1], heel_strikes[1:]
+    idx = np.searchsorted(toe_offs, starts, side="right")
+    candidate = np.append(toe_offs, np.inf)[idx]
+    inside = candidate < ends
+    return np.where(inside, (candidate - starts) / (ends - starts) * 100, np.nan)
+
+
+def step_times(heel_strikes):
+    """Intervals between consecutive heel strikes that alternate feet."""
+    times = np.concatenate([heel_strikes[side] for side in SIDES])
+    feet = np.concatenate([np.full(len(heel_strikes[side]), i) for i, side in enumerate(SIDES)])
+    order = np.argsort(times, kind="stable")
+    times, feet = times[order], feet[order]
+    alternate = feet[1:] != feet[:-1]
+    return np.diff(times)[alternate]
+
+
+def cycle_index(n_samples, starts):
+    """Stride number of every sample given the heel-strike samples; -1 outside complete strides."""
+    index = np.searchsorted(starts, np.arange(n_samples), side="right") - 1
+    if len(starts):
+        index[np.arange(n_samples) >= starts[-1]] = -1
+    else:
+        index[:] = -1
+    return index
+
+
+def detect_gait_events(world, time, sample_rate, positions=None):
+    """``GaitEvents`` from ``(n, 33, 4)`` world landmarks, or None without usable feet.
+
+    ``positions`` places each row on the even sample grid (``SessionStore.grid_positions``);
+    samples missing from it are bridged before filtering. By default the rows are consecutive.
+    """
+    n = len(time)
+    if n < 3:
+        return None
+    world = np.asarray(world, dtype=float)
+    feet = world[:, list(FOOT_LANDMARKS)]
+    axis = forward_axis(feet[:, :, [0, 2]], feet[:, :2, 1])
+    if axis is None:
+        return None
+    placed = np.arange(n) if positions is None else np.asarray(positions)
+    positions = np.arange(placed[-1] + 1)
+    forward = bridge_gaps(on_grid((feet[:, :, [0, 2]] @ axis).T, placed))
+    forward = butter_lowpass_filter(forward, EVENT_CUTOFF, sample_rate)
+    time = np.interp(positions, placed, np.asarray(time, dtype=float))
+
+    heel_strikes, toe_offs, strides, stance, swing, starts, index = {}, {}, {}, {}, {}, {}, {}
+    for i, side in enumerate(SIDES):
+        contact = extreme_samples(forward[i], sample_rate, maxima=True)
+        lift = extreme_samples(forward[2 + i], sample_rate, maxima=False)
+        heel_strikes[side] = np.interp(contact, positions, time)
+        toe_offs[side] = np.interp(lift, positions, time)
+        strides[side] = np.diff(heel_strikes[side])
+        stance[side] = stance_percent(heel_strikes[side], toe_offs[side])
+        swing[side] = 100 - stance[side]
+        starts[side] = np.unique(np.searchsorted(placed, np.round(contact)).clip(0, n - 1))
+        index[side] = cycle_index(n, starts[side])
+
+    steps = step_times(heel_strikes)
+    if steps.size:
+        cadence = 60.0 / steps.mean()
+    else:
+        all_strides = np.concatenate([strides[side] for side in SIDES])
+        cadence = 120.0 / all_strides.mean() if all_strides.size else float("nan")
+    return GaitEvents(heel_strikes=heel_strikes, toe_offs=toe_offs, stride_times=strides, step_times=steps,
+                      cadence=float(cadence), stance_percent=stance, swing_percent=swing,
+                      cycle_starts=starts, cycle_index=index)
@@ -0,0 +1,211 @@
+"""Streaming landmark export to NDJSON or Parquet.
+
+A writer owns one fixed-size block of frames: landmarks are copied into a
+preallocated ``(block_frames, 33, 4)`` float32 buffer as they arrive, and
+when the block is full its joint angles are computed in one vectorised pass
+and the block is flushed (one Parquet row group, or one run of NDJSON
+lines). Memory therefore stays at a single block no matter how long the
+recording is.
+
+Both formats share the same flat columns so ``pd.read_parquet`` and
+``pd.read_json(lines=True)`` give the same frame: ``frame``, ``time_s``,
+``detected``, ``<landmark>_{x,y,z,visibility}`` for all 33 landmarks and
+``<angle>_angle`` for every joint angle. Angles are unfiltered; undetected
+frames are NaN (``null`` in NDJSON).
+"""
+
+import json
+import os
+import shutil
+
+import numpy as np
+
+from stride_sync.kinematics import ANGLE_NAMES, LANDMARK_NAMES, joint_angles
+from stride_sync.offline import collect_landmarks_offline
+from stride_sync.roi import PersonRoi
+from stride_sync.video import FrameSource
+
+DEFAULT_BLOCK_FRAMES = 1024
+EXPORT_EXTENSIONS = {"ndjson": ".ndjson", "parquet": ".parquet"}
+LANDMARK_FIELDS = ("x", "y", "z", "visibility")
+LANDMARK_COLUMNS = tuple(f"{name}_{field}" for name in LANDMARK_NAMES for field in LANDMARK_FIELDS)
+ANGLE_COLUMNS = tuple(f"{angle}_angle" for angle in ANGLE_NAMES)
+COLUMNS = ("frame", "time_s", "detected") + LANDMARK_COLUMNS + ANGLE_COLUMNS
+
+
+def parquet_available():
+    try:
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def available_formats():
+    """Export formats usable in this environment."""
+    return [fmt for fmt in EXPORT_EXTENSIONS if fmt != "parquet" or parquet_available()]
+
+
+def block_columns(frames, times, landmarks):
+    """Column name -> 1-D array for a block of frames, in ``COLUMNS`` order."""
+    n = len(frames)
+    columns = {
+        "frame": np.asarray(frames, dtype=np.int64),
+        "time_s": np.asarray(times, dtype=np.float64),
+        "detected": ~np.isnan(landmarks[:, 0, 0]),
+    }
+    flat = landmarks.reshape(n, -1)
+    for i, name in enumerate(LANDMARK_COLUMNS):
+        columns[name] = flat[:, i]
+    angles = joint_angles(landmarks[:, :, :2])
+    for angle, name in zip(ANGLE_NAMES, ANGLE_COLUMNS):
+        columns[name] = angles[angle].astype(np.float32)
+    return columns
+
+
+class LandmarkWriter:
+    """Buffers frames into fixed-size blocks and flushes each block as a unit."""
+
+    def __init__(self, path, block_frames=DEFAULT_BLOCK_FRAMES):
+        self.path = path
+        self.block_frames = block_frames
+        self._frames = np.empty(block_frames, dtype=np.int64)
+        self._times = np.empty(block_frames, dtype=np.float64)
+        self._landmarks = np.full((block_frames, 33, 4), np.nan, dtype=np.float32)
+        self._n = 0
+        self.frames_written = 0
+
+    def add(self, frame_pos, time_s, landmarks=None):
+        """Append one frame; ``landmarks`` is a ``(33, 4)`` array or None without a pose."""
+        row = self._n
+        self._frames[row] = frame_pos
+        self._times[row] = time_s
+        self._landmarks[row] = np.nan if landmarks is None else landmarks
+        self._n += 1
+        if self._n == self.block_frames:
+            self.flush()
+
+    def flush(self):
+        if self._n == 0:
+            return
+        n = self._n
+        self._write_block(block_columns(self._frames[:n], self._times[:n], self._landmarks[:n]))
+        self.frames_written += n
+        self._n = 0
+
+    def close(self):
+        self.flush()
+        self._close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _write_block(self, columns):
+        raise NotImplementedError
+
+    def _close(self):
+        pass
+
+
+class NdjsonWriter(LandmarkWriter):
+    """One JSON object per frame, NaN written as ``null``."""
+
+    def __init__(self, path, block_frames=DEFAULT_BLOCK_FRAMES):
+        super().__init__(path, block_frames)
+        self._file = open(path, "w", encoding="utf-8")
+
+    def _write_block(self, columns):
+        names = list(columns)
+        values = []
+        for column in columns.values():
+            items = column.tolist()
+            if column.dtype.kind == "f":
+                items = [None if v != v else v for v in items]
+            values.append(items)
+        self._file.writelines(json.dumps(dict(zip(names, row))) + "\n" for row in zip(*values))
+
+    def _close(self):
+        self._file.close()
+
+
+class ParquetWriter(LandmarkWriter):
+    """One Parquet row group per block; needs ``pyarrow``."""
+
+    def __init__(self, path, block_frames=DEFAULT_BLOCK_FRAMES):
+        super().__init__(path, block_frames)
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self._pa = pa
+        self._writer = pq.ParquetWriter(path, parquet_schema())
+
+    def _write_block(self, columns):
+        self._writer.write_table(self._pa.Table.from_pydict(columns, schema=self._writer.schema))
+
+    def _close(self):
+        self._writer.close()
+
+
+def parquet_schema():
+    import pyarrow as pa
+
+    fields = [pa.field("frame", pa.int64()), pa.field("time_s", pa.float64()), pa.field("detected", pa.bool_())]
+    fields += [pa.field(name, pa.float32()) for name in LANDMARK_COLUMNS + ANGLE_COLUMNS]
+    return pa.schema(fields)
+
+
+WRITERS = {"ndjson": NdjsonWriter, "parquet": ParquetWriter}
+
+
+def open_writer(path, fmt, block_frames=DEFAULT_BLOCK_FRAMES):
+    if fmt not in WRITERS:
+        raise ValueError(f"Unknown export format {fmt!r}; expected one of {sorted(WRITERS)}")
+    return WRITERS[fmt](path, block_frames)
+
+
+def export_landmarks(pose, video_path, path, fmt, start=0, stop=None, block_frames=DEFAULT_BLOCK_FRAMES,
+                     model=None):
+    """Run ``pose`` over frames [start, stop) and stream every frame to ``path``.
+
+    With a ``BatchPoseModel`` the chunk is inferred in batches first
+    (``collect_landmarks_offline``) and then written.
+    """
+    with FrameSource(video_path) as source, open_writer(path, fmt, block_frames) as writer:
+        if stop is None:
+            stop = source.frame_count if source.frame_count > 0 else np.iinfo(np.int32).max
+        fps = source.fps or 30.0
+        if model is not None:
+            buffer, _ = collect_landmarks_offline(source, start, stop, 1, model=model, pose=pose)
+            for frame_pos, landmarks, detected in zip(buffer.frames, buffer.landmarks, buffer.detected):
+                writer.add(int(frame_pos), frame_pos / fps, landmarks if detected else None)
+            return path
+        roi = PersonRoi()
+        row = np.empty((33, 4), dtype=np.float32)  # converted into in place, copied into the writer's block
+        for frame_pos, frame in source.frames(start, stop):
+            writer.add(frame_pos, frame_pos / fps, roi.process(pose, frame, out=row))
+    return path
+
+
+def concat_exports(part_paths, path, fmt):
+    """Join per-chunk exports, in order, into one file and delete the parts."""
+    if fmt == "ndjson":
+        with open(path, "wb") as out:
+            for part in part_paths:
+                with open(part, "rb") as f:
+                    shutil.copyfileobj(f, out)
+    elif fmt == "parquet":
+        import pyarrow.parquet as pq
+
+        with pq.ParquetWriter(path, parquet_schema()) as writer:
+            for part in part_paths:
+                part_file = pq.ParquetFile(part)
+                for group in range(part_file.num_row_groups):
+                    writer.write_table(part_file.read_row_group(group))
+    else:
+        raise ValueError(f"Unknown export format {fmt!r}")
+    for part in part_paths:
+        os.remove(part)
+    return path
@@ -0,0 +1,60 @@
+"""Zero-phase low-pass filtering of sampled joint-angle series.
+
+Coefficients are designed once per (cutoff, sample rate, order) as
+second-order sections and applied forwards and backwards with
+``sosfiltfilt``, so the filtered curve has no phase lag. Several series are
+filtered in one call as the rows of a 2-D array.
+"""
+
+from functools import lru_cache
+
+import numpy as np
+from scipy.signal import butter, sosfiltfilt
+
+MAX_CUTOFF_RATIO = 0.8      # cutoffs are capped at this fraction of the sampled series' Nyquist rate
+
+
+@lru_cache(maxsize=32)
+def butter_sos(cutoff, fs, order=4):
+    """Second-order sections of a Butterworth low-pass, designed once per setting.
+
+    ``fs`` is the rate of the series being filtered. A cutoff at or above its
+    Nyquist rate (6 Hz on ~10 Hz samples) is capped at ``MAX_CUTOFF_RATIO``
+    of Nyquist.
+    """
+    nyq = 0.5 * fs
+    return butter(order, min(cutoff, MAX_CUTOFF_RATIO * nyq) / nyq, btype='low', output='sos')
+
+
+def bridge_gaps(data):
+    """Copy of ``data`` with NaN samples linearly interpolated along the last axis.
+
+    Rows that are entirely NaN are left as they are.
+    """
+    data = np.array(data, dtype=float)
+    missing = np.isnan(data)
+    if not missing.any():
+        return data
+    index = np.arange(data.shape[-1])
+    for row, gaps in zip(data.reshape(-1, data.shape[-1]), missing.reshape(-1, data.shape[-1])):
+        if gaps.any() and not gaps.all():
+            row[gaps] = np.interp(index[gaps], index[~gaps], row[~gaps])
+    return data
+
+
+def butter_lowpass_filter(data, cutoff=6, fs=30, order=4):
+    """Zero-phase Butterworth low-pass along the last axis.
+
+    ``data`` is one series or a ``(channels, samples)`` array filtered in one
+    call. NaN samples are bridged for filtering and stay NaN in the output.
+    """
+    data = np.asarray(data, dtype=float)
+    n = data.shape[-1]
+    if n < 2:
+        return data.copy()
+    sos = butter_sos(float(cutoff), float(fs), order)
+    # sosfiltfilt's default edge padding, shortened for very short series
+    padlen = min(3 * (2 * len(sos) + 1 - min((sos[:, 2] == 0).sum(), (sos[:, 5] == 0).sum())), n - 1)
+    filtered = sosfiltfilt(sos, bridge_gaps(data), axis=-1, padlen=padlen)
+    filtered[np.isnan(data)] = np.nan
+    return filtered
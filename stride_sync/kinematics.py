@@ -0,0 +1,102 @@
+"""Vectorised joint-angle kernel over MediaPipe landmark arrays.
+
+Every function takes a landmark tensor of shape ``(n_frames, 33, d)`` with
+``d`` = 2 (image x, y) or 3 (x, y, z) and returns one value per frame, so a
+whole clip is handled in a single NumPy pass. Frames without a detection
+should be filled with NaN; their angles come out as NaN rather than raising.
+The segment definitions match the per-frame code they replace in
+``pages/gait.py``.
+"""
+
+import numpy as np
+
+# MediaPipe Pose landmark indices
+LEFT_SHOULDER, RIGHT_SHOULDER = 11, 12
+LEFT_HIP, RIGHT_HIP = 23, 24
+LEFT_KNEE, RIGHT_KNEE = 25, 26
+LEFT_ANKLE, RIGHT_ANKLE = 27, 28
+LEFT_HEEL, RIGHT_HEEL = 29, 30
+LEFT_FOOT, RIGHT_FOOT = 31, 32
+
+LANDMARK_NAMES = (
+    "nose",
+    "left_eye_inner", "left_eye", "left_eye_outer",
+    "right_eye_inner", "right_eye", "right_eye_outer",
+    "left_ear", "right_ear", "mouth_left", "mouth_right",
+    "left_shoulder", "right_shoulder", "left_elbow", "right_elbow",
+    "left_wrist", "right_wrist", "left_pinky", "right_pinky",
+    "left_index", "right_index", "left_thumb", "right_thumb",
+    "left_hip", "right_hip", "left_knee", "right_knee",
+    "left_ankle", "right_ankle", "left_heel", "right_heel",
+    "left_foot_index", "right_foot_index",
+)
+
+ANGLE_NAMES = (
+    "spine_segment",
+    "left_hip", "right_hip",
+    "left_knee", "right_knee",
+    "left_ankle", "right_ankle",
+    "trunk_lean",
+)
+
+
+def angle_between(v1, v2):
+    """Unsigned angle in degrees between vectors along the last axis.
+
+    Uses ``arctan2(|v1 x v2|, v1 . v2)``, which stays accurate near 0 and 180
+    degrees where ``arccos`` of the normalised dot product loses precision.
+    Zero-length vectors give NaN.
+    """
+    v1, v2 = np.broadcast_arrays(np.asarray(v1, dtype=float), np.asarray(v2, dtype=float))
+    dot = np.einsum("...i,...i->...", v1, v2)
+    if v1.shape[-1] == 2:
+        cross = np.abs(v1[..., 0] * v2[..., 1] - v1[..., 1] * v2[..., 0])
+    else:
+        cross = np.linalg.norm(np.cross(v1, v2), axis=-1)
+    angle = np.degrees(np.arctan2(cross, dot))
+
+    degenerate = (np.einsum("...i,...i->...", v1, v1) == 0) | (np.einsum("...i,...i->...", v2, v2) == 0)
+    return np.where(degenerate, np.nan, angle)
+
+
+def vertical(dims):
+    """Upward vertical in image coordinates (y grows downwards)."""
+    up = np.zeros(dims)
+    up[1] = -1.0
+    return up
+
+
+def joint_angles(landmarks):
+    """Every joint angle series for a ``(n_frames, 33, 2|3)`` landmark tensor.
+
+    Returns a dict keyed by ``ANGLE_NAMES`` with one float array of length
+    ``n_frames`` per angle. ``trunk_lean`` is the signed inclination of the
+    shoulder-midpoint-to-hip-midpoint vector from vertical, positive when the
+    shoulders sit towards +x of the hips; the other angles are unsigned.
+    """
+    lm = np.asarray(landmarks, dtype=float)
+    if lm.ndim != 3 or lm.shape[1] < 33 or lm.shape[2] not in (2, 3):
+        raise ValueError(f"Expected landmarks of shape (n_frames, 33, 2|3), got {lm.shape}")
+
+    up = vertical(lm.shape[2])
+    trunk = (lm[:, LEFT_SHOULDER] + lm[:, RIGHT_SHOULDER]) / 2 - (lm[:, LEFT_HIP] + lm[:, RIGHT_HIP]) / 2
+
+    left_trunk = lm[:, LEFT_SHOULDER] - lm[:, LEFT_HIP]
+    right_trunk = lm[:, RIGHT_SHOULDER] - lm[:, RIGHT_HIP]
+    left_thigh = lm[:, LEFT_HIP] - lm[:, LEFT_KNEE]
+    right_thigh = lm[:, RIGHT_HIP] - lm[:, RIGHT_KNEE]
+    left_shank = lm[:, LEFT_KNEE] - lm[:, LEFT_ANKLE]
+    right_shank = lm[:, RIGHT_KNEE] - lm[:, RIGHT_ANKLE]
+    left_foot = lm[:, LEFT_ANKLE] - lm[:, LEFT_FOOT]
+    right_foot = lm[:, RIGHT_ANKLE] - lm[:, RIGHT_FOOT]
+
+    return {
+        "spine_segment": angle_between(trunk, up),
+        "left_hip": angle_between(left_trunk, left_thigh),
+        "right_hip": angle_between(right_trunk, right_thigh),
+        "left_knee": angle_between(left_thigh, left_shank),
+        "right_knee": angle_between(right_thigh, right_shank),
+        "left_ankle": angle_between(left_shank, left_foot),
+        "right_ankle": angle_between(right_shank, right_foot),
+        "trunk_lean": np.degrees(np.arctan2(trunk[:, 0], -trunk[:, 1])),
+    }
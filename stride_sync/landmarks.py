@@ -0,0 +1,145 @@
+"""Bulk conversion of MediaPipe pose results into NumPy landmark buffers.
+
+Reading ``landmark.x``, ``.y``, ... one attribute at a time costs 132
+protobuf accesses and a pile of small Python floats per frame. A landmark
+list serialises to a fixed layout instead: 33 length-delimited records of
+``fixed32`` fields (x, y, z, visibility and sometimes presence), so one
+``SerializeToString`` call plus a strided float32 view over the bytes
+gives the whole ``(33, 4)`` block. Anything that does not match that
+layout falls back to the attribute loop.
+
+``LandmarkBuffer`` holds preallocated rows for a run of frames (image and
+world landmarks plus a detection mask) that the frame loops write into in
+place.
+"""
+
+import numpy as np
+
+LANDMARK_COUNT = 33
+# Wire tags of Landmark / NormalizedLandmark fields 1-5 (x, y, z, visibility, presence) as fixed32
+_FIELD_TAGS = (0x0D, 0x15, 0x1D, 0x25, 0x2D)
+_RECORD_TAG = 0x0A  # LandmarkList.landmark, length-delimited
+_FIELD_BYTES = 5    # one tag byte + four value bytes
+
+
+def _record_layout(n_fields):
+    """Expected bytes at every header/tag offset of a record with ``n_fields`` fields."""
+    record = 2 + n_fields * _FIELD_BYTES
+    checks = [(0, bytes([_RECORD_TAG]) * LANDMARK_COUNT), (1, bytes([record - 2]) * LANDMARK_COUNT)]
+    checks += [(2 + i * _FIELD_BYTES, bytes([tag]) * LANDMARK_COUNT) for i, tag in enumerate(_FIELD_TAGS[:n_fields])]
+    return record, checks
+
+
+_LAYOUTS = dict(_record_layout(n_fields) for n_fields in (4, 5))  # record size -> byte checks
+
+
+def landmarks_into(landmark_list, out):
+    """Copy a MediaPipe (Normalized)LandmarkList into ``out`` (``(33, 4)`` float32).
+
+    Returns False, leaving ``out`` untouched, when there is no list.
+    """
+    if not landmark_list:
+        return False
+    data = landmark_list.SerializeToString()
+    record, rest = divmod(len(data), LANDMARK_COUNT)
+    checks = _LAYOUTS.get(record)
+    # Byte-slice compares run in C and are far cheaper than NumPy reductions here
+    if not rest and checks and all(data[offset::record] == expected for offset, expected in checks):
+        out[:] = np.ndarray((LANDMARK_COUNT, 4), dtype="<f4", buffer=data, offset=3,
+                            strides=(record, _FIELD_BYTES))
+        return True
+    # A field was left unset or the layout changed: read it the slow way
+    out[:] = [(lm.x, lm.y, lm.z, lm.visibility) for lm in landmark_list.landmark]
+    return True
+
+
+def pose_array(results, out=None, world_out=None):
+    """``(33, 4)`` x/y/z/visibility of a MediaPipe result, or None without a pose.
+
+    Writes into ``out`` when given; ``world_out`` receives the metric
+    ``pose_world_landmarks`` (NaN if the result has none).
+    """
+    if not results.pose_landmarks:
+        return None
+    if out is None:
+        out = np.empty((LANDMARK_COUNT, 4), dtype=np.float32)
+    landmarks_into(results.pose_landmarks, out)
+    if world_out is not None and not landmarks_into(results.pose_world_landmarks, world_out):
+        world_out[:] = np.nan
+    return out
+
+
+class LandmarkBuffer:
+    """Preallocated per-frame landmark rows with a detection mask.
+
+    ``landmarks`` and ``world`` are ``(n, 33, 4)`` float32, NaN on frames
+    without a pose; ``detected`` is the matching boolean mask. Rows are
+    handed out in order by ``next_row`` and the arrays grow if the frame
+    count was underestimated.
+    """
+
+    def __init__(self, capacity=0):
+        capacity = max(int(capacity), 0)
+        self.frames = np.zeros(capacity, dtype=np.int64)
+        self.landmarks = np.full((capacity, LANDMARK_COUNT, 4), np.nan, dtype=np.float32)
+        self.world = np.full((capacity, LANDMARK_COUNT, 4), np.nan, dtype=np.float32)
+        self.detected = np.zeros(capacity, dtype=bool)
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def next_row(self, frame_pos):
+        """Index of the next free row, now assigned to ``frame_pos``."""
+        if self.size == len(self.frames):
+            self._grow(max(2 * self.size, 64))
+        row = self.size
+        self.frames[row] = frame_pos
+        self.size += 1
+        return row
+
+    def add(self, frame_pos, results):
+        """Append one frame straight from a MediaPipe result; True if it had a pose."""
+        row = self.next_row(frame_pos)
+        self.detected[row] = pose_array(results, self.landmarks[row], self.world[row]) is not None
+        return self.detected[row]
+
+    def _grow(self, capacity):
+        extra = capacity - len(self.frames)
+        self.frames = np.concatenate([self.frames, np.zeros(extra, dtype=np.int64)])
+        pad = np.full((extra, LANDMARK_COUNT, 4), np.nan, dtype=np.float32)
+        self.landmarks = np.concatenate([self.landmarks, pad])
+        self.world = np.concatenate([self.world, pad])
+        self.detected = np.concatenate([self.detected, np.zeros(extra, dtype=bool)])
+
+    def trimmed(self, start=0):
+        """Filled rows from ``start`` on (views, no copy)."""
+        rows = slice(start, self.size)
+        return LandmarkBuffer.from_arrays(self.frames[rows], self.landmarks[rows], self.world[rows],
+                                          self.detected[rows])
+
+    def arrays(self):
+        """Filled rows as a dict of arrays, e.g. for ``LandmarkCache.store``."""
+        n = self.size
+        return dict(frames=self.frames[:n], landmarks=self.landmarks[:n], world=self.world[:n],
+                    detected=self.detected[:n])
+
+    @classmethod
+    def from_arrays(cls, frames, landmarks, world=None, detected=None):
+        buffer = cls()
+        buffer.frames = np.asarray(frames, dtype=np.int64)
+        buffer.landmarks = np.asarray(landmarks, dtype=np.float32)
+        buffer.world = (np.full_like(buffer.landmarks, np.nan) if world is None
+                        else np.asarray(world, dtype=np.float32))
+        buffer.detected = (~np.isnan(buffer.landmarks[:, 0, 0]) if detected is None
+                           else np.asarray(detected, dtype=bool))
+        buffer.size = len(buffer.frames)
+        return buffer
+
+    @classmethod
+    def concatenate(cls, buffers):
+        buffers = [buffer.trimmed() for buffer in buffers]
+        if not buffers:
+            return cls()
+        return cls.from_arrays(*(np.concatenate([getattr(b, name) for b in buffers])
+                                 for name in ("frames", "landmarks", "world", "detected")))
@@ -0,0 +1,286 @@
+"""Batched offline pose inference for non-interactive jobs.
+
+The live graph (``mp.solutions.pose.Pose``) handles one image at a time,
+because each frame's crop comes from the previous frame's landmarks. A
+batch job already has the whole clip, so this path splits the work in two:
+
+- Keyframes. One sampled frame per batch goes through the live graph,
+  which finds the athlete with its detector. Every frame in between gets a
+  crop box interpolated between the keyframe boxes on either side of it,
+  so a walker crossing the frame is followed.
+- Batches. The crops are letterboxed to the landmark model's 256 px input
+  in the decoder thread and run through MediaPipe's own pose landmark
+  TFLite model with a batch dimension. XNNPACK spreads each batch over
+  ``num_threads`` cores. Landmarks are refined from the model's heatmap
+  as the live graph does; there is no temporal smoothing.
+
+Results come back in the usual ``(33, 4)`` image and world layout, in a
+``LandmarkBuffer`` like ``collect_landmarks`` returns. Crops are not
+rotated to the torso angle as the live graph does, so this path is for
+upright athletes: treadmill and walkway clips, not floor work. It needs a
+TFLite runtime (``ai-edge-litert``, ``tflite-runtime`` or TensorFlow).
+"""
+
+import importlib
+import os
+
+import numpy as np
+
+from stride_sync.analysis import (TARGET_SAMPLE_FPS, crop_range, is_rotated, kinematics_from_landmarks)
+from stride_sync.backends import as_backend, from_letterbox, letterbox, load_interpreter
+from stride_sync.landmarks import LANDMARK_COUNT, LandmarkBuffer
+from stride_sync.pipeline import Pipeline
+from stride_sync.pose import DEFAULT_POSE_SETTINGS, default_pool
+from stride_sync.profiling import span
+from stride_sync.roi import box_to_full, crop_to_box
+from stride_sync.video import FrameSource, to_model_input
+
+MODEL_INPUT = 256            # the pose landmark model's square input
+MODEL_LANDMARKS = 39         # 33 pose landmarks + 6 auxiliary ROI points
+DEFAULT_BATCH = 10           # samples per batch, and per keyframe (~1 s at the app's rate)
+BOX_SCALE = 1.4              # crop side relative to the keyframe's landmark extent
+POSE_THRESHOLD = 0.5         # pose-presence score below which a crop has no pose
+REFINE_KERNEL = 7            # heatmap window around each landmark, as in MediaPipe's graph
+REFINE_MIN_CONFIDENCE = 0.5
+MODEL_COMPLEXITIES = {0: "lite", 1: "full", 2: "heavy"}
+FULL_FRAME = np.array([0.0, 0.0, 1.0, 1.0])
+
+
+def landmark_model_path(model_complexity=1):
+    """MediaPipe's bundled pose landmark model (lite/heavy only once MediaPipe has downloaded them)."""
+    import mediapipe
+
+    name = f"pose_landmark_{MODEL_COMPLEXITIES[model_complexity]}.tflite"
+    path = os.path.join(os.path.dirname(mediapipe.__file__), "modules", "pose_landmark", name)
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"{name} is not in the MediaPipe package; run the live graph with "
+                                f"model_complexity={model_complexity} once to download it")
+    return path
+
+
+def runtime_available():
+    """Whether a TFLite interpreter (LiteRT, tflite-runtime or TensorFlow) can be imported."""
+    for module in ("ai_edge_litert.interpreter", "tflite_runtime.interpreter", "tensorflow"):
+        try:
+            importlib.import_module(module)
+            return True
+        except ImportError:
+            continue
+    return False
+
+
+def _sigmoid(x):
+    return 1.0 / (1.0 + np.exp(-x))
+
+
+class BatchPoseModel:
+    """The pose landmark TFLite model with a fixed batch dimension."""
+
+    def __init__(self, model_path=None, batch_size=DEFAULT_BATCH, num_threads=None):
+        self.batch_size = batch_size
+        self.interpreter = load_interpreter(model_path or landmark_model_path(), num_threads or os.cpu_count())
+        self.input = self.interpreter.get_input_details()[0]
+        self.interpreter.resize_tensor_input(self.input["index"], [batch_size, MODEL_INPUT, MODEL_INPUT, 3])
+        self.interpreter.allocate_tensors()
+        # Outputs by shape: landmarks (39 x 5), pose flag, world landmarks (39 x 3) and the
+        # per-landmark heatmap (64 x 64 x 39); the segmentation mask is unused
+        outputs = {tuple(d["shape"][1:]): d for d in self.interpreter.get_output_details()}
+        self.landmarks_index = outputs[(MODEL_LANDMARKS * 5,)]["index"]
+        self.flag_index = outputs[(1,)]["index"]
+        self.world_index = outputs[(MODEL_LANDMARKS * 3,)]["index"]
+        self.heatmap_index = next(d["index"] for shape, d in outputs.items()
+                                  if len(shape) == 3 and shape[2] == MODEL_LANDMARKS)
+
+    def new_batch(self):
+        """Zeroed float32 input batch to fill in place."""
+        return np.zeros((self.batch_size, MODEL_INPUT, MODEL_INPUT, 3), dtype=np.float32)
+
+    def run(self, batch):
+        """``(landmarks (n, 33, 4), pose score (n,), world (n, 33, 3))`` for a full input batch.
+
+        Landmarks are normalised to the model input, refined from the
+        heatmap, with visibility as a probability.
+        """
+        self.interpreter.set_tensor(self.input["index"], batch)
+        self.interpreter.invoke()
+        raw = self.interpreter.get_tensor(self.landmarks_index).reshape(-1, MODEL_LANDMARKS, 5)
+        landmarks = raw[:, :LANDMARK_COUNT, :4] / MODEL_INPUT
+        landmarks[..., 3] = _sigmoid(raw[:, :LANDMARK_COUNT, 3])
+        refine_from_heatmap(landmarks, self.interpreter.get_tensor(self.heatmap_index)[..., :LANDMARK_COUNT])
+        flag = self.interpreter.get_tensor(self.flag_index).reshape(-1)
+        world = self.interpreter.get_tensor(self.world_index).reshape(-1, MODEL_LANDMARKS, 3)[:, :LANDMARK_COUNT]
+        return landmarks, flag, world
+
+
+def refine_from_heatmap(landmarks, heatmap, kernel=REFINE_KERNEL, min_confidence=REFINE_MIN_CONFIDENCE):
+    """Move x/y to the confidence-weighted centre of the heatmap around each landmark, in place.
+
+    ``landmarks`` is ``(n, k, 2+)`` normalised to the model input and
+    ``heatmap`` the matching ``(n, rows, cols, k)`` logits. Landmarks whose
+    window peaks below ``min_confidence`` keep the regressed position. This
+    is the refinement step of MediaPipe's own graph.
+    """
+    n, rows, cols, k = heatmap.shape
+    offsets = np.arange(kernel) - kernel // 2
+    row = (landmarks[..., 1] * rows).astype(int)[:, :, None, None] + offsets[:, None]
+    col = (landmarks[..., 0] * cols).astype(int)[:, :, None, None] + offsets
+    inside = (row >= 0) & (row < rows) & (col >= 0) & (col < cols)
+    window = heatmap[np.arange(n)[:, None, None, None], np.clip(row, 0, rows - 1), np.clip(col, 0, cols - 1),
+                     np.arange(k)[:, None, None]]
+    weights = _sigmoid(window) * inside
+    total = weights.sum(axis=(2, 3))
+    refine = (weights.max(axis=(2, 3)) >= min_confidence) & (total > 0)
+    total[~refine] = 1.0
+    landmarks[..., 0] = np.where(refine, ((col * weights).sum(axis=(2, 3)) / total + 0.5) / cols, landmarks[..., 0])
+    landmarks[..., 1] = np.where(refine, ((row * weights).sum(axis=(2, 3)) / total + 0.5) / rows, landmarks[..., 1])
+    return landmarks
+
+
+def keyframe_box(landmarks, width, height):
+    """Square crop box (normalised to the rotated frame) around one frame's landmarks."""
+    points = landmarks[:, :2]
+    lo, hi = np.nanmin(points, axis=0), np.nanmax(points, axis=0)
+    center = (lo + hi) / 2
+    side = max((hi[0] - lo[0]) * width, (hi[1] - lo[1]) * height) * BOX_SCALE
+    half = np.array([side / width, side / height]) / 2
+    return np.concatenate([center - half, center + half])
+
+
+def interpolate_boxes(previous, current, n):
+    """``n`` boxes stepping from ``previous`` to ``current``, ending on ``current``."""
+    if previous is None:
+        return [current] * n
+    weights = np.arange(1, n + 1) / n
+    return list(previous + (current - previous) * weights[:, None])
+
+
+def prepare(frame, box, rotated, out):
+    """Crop, rotate and letterbox one BGR frame into a model input row.
+
+    As in MediaPipe, the part of ``box`` outside the frame is zero padding,
+    so the athlete stays where the box puts them. Returns the crop's exact
+    box in the frame and its box in the model input.
+    """
+    crop, exact = crop_to_box(frame, np.clip(box, 0.0, 1.0), rotated)
+    u0, v0, u1, v1 = box
+    placed = ((exact[0] - u0) / (u1 - u0), (exact[1] - v0) / (v1 - v0),
+              (exact[2] - u0) / (u1 - u0), (exact[3] - v0) / (v1 - v0))
+    square, inner = letterbox(to_model_input(crop, rotated, None), MODEL_INPUT, box=placed)
+    np.multiply(square, 1 / 255, out=out)
+    return exact, inner
+
+
+def collect_landmarks_offline(source, start, stop, step, rotated=False, model=None, pose=None,
+                              batch_size=DEFAULT_BATCH, num_threads=None):
+    """``collect_landmarks`` for whole clips: keyframe crops and batched inference.
+
+    ``pose`` is the live engine (or backend) used on keyframes; one is
+    checked out of the default pool when not given. Returns the
+    ``LandmarkBuffer`` and the pipeline's per-stage counters.
+    """
+    model = model or BatchPoseModel(batch_size=batch_size, num_threads=num_threads)
+    known_stop = min(stop, source.frame_count) if source.frame_count > 0 else start
+    buffer = LandmarkBuffer(len(range(start, known_stop, step)))
+    width, height = (source.height, source.width) if rotated else (source.width, source.height)
+    keyframes = dict(found=0, missed=0)
+
+    def batches(keyframe_pose):
+        pending, previous = [], None
+
+        def flush():
+            # The batch's last frame is its keyframe; without a pose there the last box is kept
+            nonlocal previous
+            current = _keyframe(keyframe_pose, pending[-1][1], rotated, width, height, keyframes)
+            if current is None:
+                current = previous if previous is not None else FULL_FRAME
+            batch = model.new_batch()
+            boxes = interpolate_boxes(previous, current, len(pending))
+            crops = [prepare(frame, box, rotated, row) for (_, frame), box, row in zip(pending, boxes, batch)]
+            positions = [frame_pos for frame_pos, _ in pending]
+            pending.clear()
+            previous = current
+            return positions, crops, batch
+
+        for frame_pos, frame in source.frames(start, stop, step):
+            pending.append((frame_pos, frame))
+            if len(pending) == model.batch_size:
+                yield flush()
+        if pending:
+            yield flush()
+
+    def infer(item):
+        # Rows are only ever assigned and written from this stage, in frame order
+        positions, crops, batch = item
+        landmarks, flag, world = model.run(batch)
+        for i, (frame_pos, (box, inner)) in enumerate(zip(positions, crops)):
+            row = buffer.next_row(frame_pos)
+            if flag[i] < POSE_THRESHOLD:
+                continue
+            out = buffer.landmarks[row]
+            out[:] = landmarks[i]
+            box_to_full(from_letterbox(out, inner), box)
+            buffer.world[row, :, :3] = world[i]
+            buffer.world[row, :, 3] = out[:, 3]
+            buffer.detected[row] = True
+        return len(positions)
+
+    def run(keyframe_pose):
+        pipeline = Pipeline(batches(as_backend(keyframe_pose)), [("inference", infer)])
+        for _ in pipeline:
+            pass
+        return pipeline.stats()
+
+    if pose is not None:
+        stats = run(pose)
+    else:
+        with default_pool().checkout(**DEFAULT_POSE_SETTINGS) as keyframe_pose:
+            stats = run(keyframe_pose)
+    stats["keyframes"] = keyframes
+    return buffer.trimmed(), stats
+
+
+def _keyframe(backend, frame, rotated, width, height, counts):
+    """Crop box from the live graph on one frame, or None without a pose."""
+    landmarks = backend.detect(to_model_input(frame, rotated))
+    counts["found" if landmarks is not None else "missed"] += 1
+    return None if landmarks is None else keyframe_box(landmarks, width, height)
+
+
+def extract_landmarks_offline(video_path, gait_type, cache=None, batch_size=DEFAULT_BATCH, num_threads=None,
+                              model_complexity=1):
+    """``extract_landmarks`` through the batched model: same sampling, same return values."""
+    with FrameSource(video_path) as source:
+        fps = source.fps
+        ret, test_frame = source.read_frame(0)
+        if not ret:
+            raise ValueError("Couldn't read from video.")
+        rotated = is_rotated(test_frame, gait_type)
+        start_frame, end_frame = crop_range(source.frame_count, fps)
+        frame_skip = max(1, int(fps // TARGET_SAMPLE_FPS))
+        frame_size = (source.height, source.width) if rotated else (source.width, source.height)
+        meta = dict(fps=fps, frame_skip=frame_skip, rotated=rotated, frame_size=frame_size,
+                    duration=(end_frame - start_frame) / fps, stage_stats={}, model_complexity=model_complexity)
+
+        if cache is not None:
+            cache_key = cache.key(video_path, offline=True, complexity=model_complexity, frame_skip=frame_skip,
+                                  start=start_frame, stop=end_frame, rotated=rotated, world=True)
+            cached = cache.load(cache_key)
+            if cached is not None:
+                return LandmarkBuffer.from_arrays(**cached), meta
+
+        model = BatchPoseModel(landmark_model_path(model_complexity), batch_size, num_threads)
+        with span("inference", offline=True, batch_size=batch_size) as stage:
+            buffer, meta["stage_stats"] = collect_landmarks_offline(
+                source, start_frame, end_frame, frame_skip, rotated, model)
+            stage.update(frames=len(buffer), detected=int(buffer.detected[:len(buffer)].sum()))
+
+    if cache is not None:
+        cache.store(cache_key, **buffer.arrays())
+    return buffer, meta
+
+
+def load_kinematics_offline(video_path, gait_type, cache=None, batch_size=DEFAULT_BATCH, num_threads=None,
+                            model_complexity=1):
+    """``load_kinematics`` with batched offline inference, e.g. for regenerating reports."""
+    buffer, meta = extract_landmarks_offline(video_path, gait_type, cache, batch_size, num_threads, model_complexity)
+    return kinematics_from_landmarks(buffer, meta)
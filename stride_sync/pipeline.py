@@ -0,0 +1,148 @@
+"""Threaded decode -> inference -> analysis pipeline with bounded queues.
+
+FFmpeg decoding, OpenCV colour work and the TFLite interpreter all release
+the GIL, so running them in separate threads overlaps decoding the next
+frame with inference on the current one. Each stage hands items to the next
+through a bounded queue: a fast decoder blocks once it is ``maxsize`` frames
+ahead (backpressure) instead of filling memory with decoded frames.
+
+``Pipeline`` takes a producer iterable and a chain of ``(name, fn)`` stages.
+The producer and every stage run in their own thread; iterating the
+pipeline yields the last stage's results in order on the caller's thread,
+which is where the analysis stage runs. An exception in any stage stops the
+others and is re-raised to the caller, and leaving the loop early shuts the
+threads down. ``stats()`` reports items, busy time and blocked time per
+stage.
+"""
+
+import queue
+import threading
+import time
+
+DEFAULT_QUEUE_SIZE = 8
+_POLL_SECONDS = 0.1
+_DONE = object()
+
+
+class StageCounter:
+    """Throughput counters for one pipeline stage."""
+
+    def __init__(self, name):
+        self.name = name
+        self.items = 0
+        self.busy = 0.0      # seconds spent doing the stage's own work
+        self.blocked = 0.0   # seconds waiting on a full output or an empty input queue
+
+    @property
+    def fps(self):
+        return self.items / self.busy if self.busy else 0.0
+
+    def as_dict(self):
+        return dict(items=self.items, busy_s=round(self.busy, 4), blocked_s=round(self.blocked, 4),
+                    fps=round(self.fps, 2))
+
+
+class Pipeline:
+    """Runs a producer and a chain of stages in threads joined by bounded queues."""
+
+    def __init__(self, source, stages, maxsize=DEFAULT_QUEUE_SIZE, source_name="decode", sink_name="analysis"):
+        self.source = source
+        self.stages = list(stages)
+        self.maxsize = maxsize
+        self.counters = [StageCounter(source_name)] + [StageCounter(name) for name, _ in self.stages]
+        self.sink = StageCounter(sink_name)
+        self._stop = threading.Event()
+        self._error = None
+        self._threads = []
+
+    def stats(self):
+        """Per-stage counters keyed by stage name, in pipeline order."""
+        return {counter.name: counter.as_dict() for counter in self.counters + [self.sink]}
+
+    def _put(self, q, item, counter):
+        start = time.perf_counter()
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=_POLL_SECONDS)
+                break
+            except queue.Full:
+                continue
+        counter.blocked += time.perf_counter() - start
+
+    def _get(self, q, counter):
+        start = time.perf_counter()
+        while True:
+            try:
+                item = q.get(timeout=_POLL_SECONDS)
+                break
+            except queue.Empty:
+                if self._stop.is_set():
+                    item = _DONE
+                    break
+        counter.blocked += time.perf_counter() - start
+        return item
+
+    def _fail(self, exc):
+        if self._error is None:
+            self._error = exc
+        self._stop.set()
+
+    def _run_source(self, out_q):
+        counter = self.counters[0]
+        iterator = iter(self.source)
+        try:
+            while not self._stop.is_set():
+                start = time.perf_counter()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    break
+                finally:
+                    counter.busy += time.perf_counter() - start
+                counter.items += 1
+                self._put(out_q, item, counter)
+        except BaseException as exc:
+            self._fail(exc)
+        finally:
+            self._put(out_q, _DONE, counter)
+
+    def _run_stage(self, fn, counter, in_q, out_q):
+        try:
+            while True:
+                item = self._get(in_q, counter)
+                if item is _DONE or self._stop.is_set():
+                    break
+                start = time.perf_counter()
+                result = fn(item)
+                counter.busy += time.perf_counter() - start
+                counter.items += 1
+                self._put(out_q, result, counter)
+        except BaseException as exc:
+            self._fail(exc)
+        finally:
+            self._put(out_q, _DONE, counter)
+
+    def __iter__(self):
+        queues = [queue.Queue(maxsize=self.maxsize) for _ in range(len(self.stages) + 1)]
+        self._threads = [threading.Thread(target=self._run_source, args=(queues[0],), daemon=True)]
+        for i, (_, fn) in enumerate(self.stages):
+            self._threads.append(threading.Thread(
+                target=self._run_stage, args=(fn, self.counters[i + 1], queues[i], queues[i + 1]), daemon=True))
+        for thread in self._threads:
+            thread.start()
+
+        try:
+            while True:
+                item = self._get(queues[-1], self.sink)
+                if item is _DONE or self._error is not None:
+                    break
+                start = time.perf_counter()
+                yield item
+                self.sink.busy += time.perf_counter() - start
+                self.sink.items += 1
+        finally:
+            self._stop.set()
+            for thread in self._threads:
+                thread.join()
+        if self._error is not None:
+            raise self._error
@@ -0,0 +1,107 @@
+"""Process-wide pool of MediaPipe Pose engines.
+
+Building ``mp.solutions.pose.Pose`` loads the TFLite model and initialises a
+calculator graph, which costs far more than running it on a few frames.
+The pool keeps finished engines around, keyed by their settings, and hands
+them back out with their tracking state reset so one Streamlit process pays
+model start-up once per configuration instead of once per call.
+"""
+
+import threading
+from contextlib import contextmanager
+
+import mediapipe as mp
+
+mp_pose = mp.solutions.pose
+
+# Settings every page uses unless it asks for something else
+DEFAULT_POSE_SETTINGS = dict(min_detection_confidence=0.5, min_tracking_confidence=0.5)
+
+
+def engine_key(model_complexity=1, static_image_mode=False,
+               min_detection_confidence=0.5, min_tracking_confidence=0.5):
+    """Settings that make two Pose engines interchangeable."""
+    return (int(model_complexity), bool(static_image_mode),
+            round(float(min_detection_confidence), 3),
+            round(float(min_tracking_confidence), 3))
+
+
+class PoseEnginePool:
+    """Thread-safe checkout/return pool of ``mp_pose.Pose`` instances."""
+
+    def __init__(self, max_idle_per_key=2):
+        self.max_idle_per_key = max_idle_per_key
+        self._lock = threading.Lock()
+        self._idle = {}       # key -> [Pose, ...]
+        self._keys = {}       # id(Pose) -> key, for engines currently checked out
+        self.created = 0
+        self.reused = 0
+
+    def acquire(self, model_complexity=1, static_image_mode=False,
+                min_detection_confidence=0.5, min_tracking_confidence=0.5):
+        """Take an engine for exclusive use; build one if none is idle."""
+        key = engine_key(model_complexity, static_image_mode,
+                         min_detection_confidence, min_tracking_confidence)
+        with self._lock:
+            idle = self._idle.get(key)
+            if idle:
+                pose = idle.pop()
+                self._keys[id(pose)] = key
+                self.reused += 1
+                return pose
+
+        # Build outside the lock so other threads are not blocked on model loading
+        pose = mp_pose.Pose(
+            static_image_mode=key[1],
+            model_complexity=key[0],
+            min_detection_confidence=key[2],
+            min_tracking_confidence=key[3],
+        )
+        with self._lock:
+            self._keys[id(pose)] = key
+            self.created += 1
+        return pose
+
+    def release(self, pose):
+        """Return an engine to the pool, clearing its tracking state."""
+        with self._lock:
+            key = self._keys.pop(id(pose), None)
+        if key is None:
+            return
+        try:
+            pose.reset()
+        except Exception:
+            pose.close()
+            return
+
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < self.max_idle_per_key:
+                idle.append(pose)
+                return
+        pose.close()
+
+    @contextmanager
+    def checkout(self, **settings):
+        """``with pool.checkout(...) as pose:`` drop-in for ``with mp_pose.Pose(...)``."""
+        pose = self.acquire(**settings)
+        try:
+            yield pose
+        finally:
+            self.release(pose)
+
+    def close(self):
+        """Close every idle engine."""
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for engines in idle.values():
+            for pose in engines:
+                pose.close()
+
+
+_default_pool = PoseEnginePool()
+
+
+def default_pool():
+    """The pool shared by every page and job in this process."""
+    return _default_pool
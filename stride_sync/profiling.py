@@ -0,0 +1,251 @@
+"""Low-overhead per-stage profiling: span timers, frame counters and peak RSS.
+
+A ``Profile`` is one timed run of a page function or job. While it is
+active (``with profiling("process_video"):``) every ``span`` opened in the
+same context records its wall time, process RSS and peak RSS when it ends,
+plus any counters the code attaches (frames decoded, poses found, ...).
+Spans nest; each record carries its depth and parent. With no active
+profile ``span`` is a ContextVar lookup and an empty dict, so the
+instrumentation stays in the engine and the page permanently.
+
+The profile lives in a ``ContextVar``: Streamlit runs every session's
+script in its own thread, so concurrent users never mix their spans, and
+worker threads of ``Pipeline`` record nothing (their own counters travel in
+``stage_stats``).
+
+When a profile ends it is logged as one JSON line on the
+``stride_sync.profile`` logger and, if ``STRIDE_SYNC_PROFILE_LOG`` names a
+file, appended there too. ``capture="cprofile"`` (or ``"pyinstrument"``
+when that package is installed) also records a full call profile of the
+run for download.
+"""
+
+import cProfile
+import io
+import json
+import logging
+import os
+import pstats
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+try:
+    from pyinstrument import Profiler as _Pyinstrument
+except ImportError:
+    _Pyinstrument = None
+
+logger = logging.getLogger("stride_sync.profile")
+PROFILE_LOG = os.environ.get("STRIDE_SYNC_PROFILE_LOG")
+CAPTURES = ("cprofile", "pyinstrument")
+
+_active = ContextVar("stride_sync_profile", default=None)
+_log_lock = threading.Lock()
+
+
+def rss_mb():
+    """Resident set size of this process in MB, or None where it cannot be read cheaply."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def peak_rss_mb():
+    """High-water mark of this process's RSS in MB."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10  # bytes on macOS, KB elsewhere
+
+
+class Profile:
+    """Spans, context and an optional call-profile capture of one run."""
+
+    def __init__(self, name, capture=None):
+        if capture not in (None,) + CAPTURES:
+            raise ValueError(f"capture must be one of {CAPTURES}, got {capture!r}")
+        self.name = name
+        self.capture = capture
+        self.info = {}
+        self.spans = []
+        self._stack = []
+        self._profiler = None
+        self.capture_data = None      # bytes of the finished capture
+        self.capture_file = None      # suggested download name
+        self.started = time.time()
+        self._start = time.perf_counter()
+        self.seconds = None
+        self.start_peak_rss_mb = peak_rss_mb()
+
+    @contextmanager
+    def span(self, name, **fields):
+        """Time one stage; the yielded dict takes extra counters, e.g. ``stage["frames"] = n``."""
+        record = dict(fields)
+        parent = self._stack[-1] if self._stack else None
+        self._stack.append(name)
+        peak_before = peak_rss_mb()
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            seconds = time.perf_counter() - start
+            self._stack.pop()
+            peak = peak_rss_mb()
+            self.spans.append(dict(
+                name=name, parent=parent, depth=len(self._stack), start_s=round(start - self._start, 6),
+                seconds=round(seconds, 6), rss_mb=_round(rss_mb()), peak_rss_mb=_round(peak),
+                peak_growth_mb=_round(peak - peak_before) if peak is not None else None, **record))
+
+    def annotate(self, **info):
+        """Attach run context (clip size, settings, decisions) to the profile."""
+        self.info.update(info)
+
+    def start(self):
+        if self.capture == "pyinstrument" and _Pyinstrument is None:
+            self.info["capture_fallback"] = "pyinstrument is not installed; captured with cProfile"
+            self.capture = "cprofile"
+        try:
+            if self.capture == "pyinstrument":
+                self._profiler = _Pyinstrument()
+                self._profiler.start()
+            elif self.capture == "cprofile":
+                self._profiler = cProfile.Profile()
+                self._profiler.enable()
+        except ValueError as error:  # another profiler is already running in this interpreter
+            self.info["capture_error"] = str(error)
+            self._profiler = None
+
+    def stop(self):
+        self.seconds = time.perf_counter() - self._start
+        if self._profiler is None:
+            return
+        if self.capture == "pyinstrument":
+            self._profiler.stop()
+            self.capture_data = self._profiler.output_html().encode("utf-8")
+            self.capture_file = f"{self.name}_profile.html"
+        else:
+            self._profiler.disable()
+            with tempfile.NamedTemporaryFile(suffix=".prof", delete=False) as f:
+                path = f.name
+            try:
+                self._profiler.dump_stats(path)  # open with snakeviz, or pstats.Stats(path)
+                with open(path, "rb") as f:
+                    self.capture_data = f.read()
+            finally:
+                os.remove(path)
+            self.capture_file = f"{self.name}.prof"
+        self._profiler = None
+
+    def capture_summary(self, limit=40):
+        """Top functions by cumulative time of a cProfile capture, as text."""
+        if self.capture_data is None or self.capture != "cprofile":
+            return ""
+        with tempfile.NamedTemporaryFile(suffix=".prof", delete=False) as f:
+            f.write(self.capture_data)
+        try:
+            out = io.StringIO()
+            pstats.Stats(f.name, stream=out).sort_stats("cumulative").print_stats(limit)
+            return out.getvalue()
+        finally:
+            os.remove(f.name)
+
+    def totals(self):
+        """Per span name: calls, total seconds and the highest peak RSS seen, slowest first."""
+        totals = {}
+        for span in self.spans:
+            entry = totals.setdefault(span["name"], dict(name=span["name"], calls=0, seconds=0.0, peak_rss_mb=None))
+            entry["calls"] += 1
+            entry["seconds"] += span["seconds"]
+            if span["peak_rss_mb"] is not None:
+                entry["peak_rss_mb"] = max(entry["peak_rss_mb"] or 0.0, span["peak_rss_mb"])
+        return sorted(totals.values(), key=lambda entry: -entry["seconds"])
+
+    def to_dict(self):
+        return dict(profile=self.name, started=self.started, seconds=_round(self.seconds), info=self.info,
+                    peak_rss_mb=_round(peak_rss_mb()), start_peak_rss_mb=_round(self.start_peak_rss_mb),
+                    capture=self.capture_file, spans=self.spans)
+
+
+def _round(value, digits=3):
+    return None if value is None else round(value, digits)
+
+
+def current():
+    """The profile active in this context, or None."""
+    return _active.get()
+
+
+@contextmanager
+def span(name, **fields):
+    """``Profile.span`` on the active profile; a no-op dict when nothing is profiling."""
+    profile = _active.get()
+    if profile is None:
+        yield fields
+        return
+    with profile.span(name, **fields) as record:
+        yield record
+
+
+def traced(name=None):
+    """Decorator running every call of a function inside a ``span``."""
+    def decorate(fn):
+        label = name or fn.__name__
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if _active.get() is None:
+                return fn(*args, **kwargs)
+            with span(label):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def annotate(**info):
+    """``Profile.annotate`` on the active profile, if any."""
+    profile = _active.get()
+    if profile is not None:
+        profile.annotate(**info)
+
+
+def log_profile(profile):
+    """Write a finished profile as one JSON line to the logger and ``PROFILE_LOG``."""
+    line = json.dumps(profile.to_dict(), default=str)
+    logger.info(line)
+    if PROFILE_LOG:
+        with _log_lock, open(PROFILE_LOG, "a") as f:
+            f.write(line + "\n")
+
+
+@contextmanager
+def profiling(name, capture=None):
+    """Make a new ``Profile`` active for the enclosed code and log it when done.
+
+    Nested calls (a profiled function called from another profiled run)
+    record into the outer profile as a span instead of starting a new one.
+    """
+    outer = _active.get()
+    if outer is not None:
+        with outer.span(name):
+            yield outer
+        return
+    profile = Profile(name, capture)
+    token = _active.set(profile)
+    profile.start()
+    try:
+        yield profile
+    finally:
+        profile.stop()
+        _active.reset(token)
+        log_profile(profile)
@@ -0,0 +1,139 @@
+"""Person region-of-interest tracking for pose inference.
+
+On treadmill clips the runner fills a narrow strip of the frame, yet every
+frame is resized, rotated and colour-converted in full before MediaPipe
+looks at it. ``PersonRoi`` keeps a padded box around the previous frame's
+landmarks and hands the model only that crop, so the long-edge budget of
+``to_model_input`` is spent on the athlete instead of the background.
+
+The box is held still while the athlete stays inside it, because moving
+the crop moves MediaPipe's own tracking region with it; when the box has
+to move, the engine is reset so the detector re-locks on the new crop (the
+Tasks backend keeps its landmarker and re-detects by itself). When
+no pose is found in the crop the same frame is retried on the full frame.
+Landmarks are always returned normalised to the full (rotated) frame.
+"""
+
+import numpy as np
+
+from stride_sync.backends import as_backend
+from stride_sync.video import DEFAULT_LONG_EDGE, to_model_input
+
+ROI_PADDING = 0.3          # added on every side, as a fraction of the landmark box size
+ROI_MARGIN = 0.05          # re-crop once a landmark comes this close to the box edge
+ROI_MAX_AREA = 0.6         # crops covering more of the frame than this are not worth it
+ROI_MIN_VISIBILITY = 0.5
+
+
+class PersonRoi:
+    """Crops frames to the tracked person and maps landmarks back to the full frame."""
+
+    def __init__(self, padding=ROI_PADDING, margin=ROI_MARGIN, max_area=ROI_MAX_AREA):
+        self.padding = padding
+        self.margin = margin
+        self.max_area = max_area
+        self.box = None  # (u0, v0, u1, v1) normalised to the rotated frame, None = full frame
+        self.cropped = 0
+        self.full = 0
+        self.lost = 0
+        self.moves = 0
+
+    def reset(self):
+        self.box = None
+
+    def process(self, pose, frame, rotated=False, long_edge=DEFAULT_LONG_EDGE, out=None, world_out=None,
+                timestamp_ms=None):
+        """Run ``pose`` on the tracked crop of a BGR ``frame``; full-frame ``(33, 4)`` or None.
+
+        ``pose`` is a ``PoseBackend`` or a raw MediaPipe engine. ``out`` and
+        ``world_out`` are optional rows to convert into, as in ``pose_array``.
+        """
+        backend = as_backend(pose)
+        landmarks = None
+        if self.box is not None:
+            crop, box = self._crop(frame, rotated)
+            landmarks = backend.detect(to_model_input(crop, rotated, long_edge), out, world_out, timestamp_ms)
+            if landmarks is None:
+                # Track lost: start over on the full frame, this frame included
+                self.lost += 1
+                self.box = None
+                backend.reset()
+            else:
+                self.cropped += 1
+                self._to_full(landmarks, box)
+
+        if self.box is None:
+            landmarks = backend.detect(to_model_input(frame, rotated, long_edge), out, world_out, timestamp_ms)
+            self.full += 1
+
+        if landmarks is not None and self._update_box(landmarks):
+            backend.reset()
+        return landmarks
+
+    def _crop(self, frame, rotated):
+        return crop_to_box(frame, self.box, rotated)
+
+    @staticmethod
+    def _to_full(landmarks, box):
+        box_to_full(landmarks, box)
+
+    def _update_box(self, landmarks):
+        """Keep, move or drop the crop box for the next frame; True if it changed."""
+        points = landmarks[landmarks[:, 3] >= ROI_MIN_VISIBILITY, :2]
+        if len(points) < 4:
+            points = landmarks[:, :2]
+        points = points[~np.isnan(points).any(axis=1)]  # backends without every landmark leave NaN
+        if len(points) < 2:
+            return False
+        lo, hi = points.min(axis=0), points.max(axis=0)
+
+        if self.box is not None:
+            u0, v0, u1, v1 = self.box
+            inset = self.margin * np.array([u1 - u0, v1 - v0])
+            inner_lo = np.array([u0, v0]) + inset
+            inner_hi = np.array([u1, v1]) - inset
+            # Sides already clamped to the frame edge cannot grow, so never re-crop for them
+            inner_lo[np.array([u0, v0]) <= 0] = -np.inf
+            inner_hi[np.array([u1, v1]) >= 1] = np.inf
+            if np.all(lo >= inner_lo) and np.all(hi <= inner_hi):
+                return False
+
+        size = hi - lo
+        lo = np.clip(lo - self.padding * size, 0.0, 1.0)
+        hi = np.clip(hi + self.padding * size, 0.0, 1.0)
+        if np.prod(hi - lo) > self.max_area:
+            box = None
+        else:
+            box = (float(lo[0]), float(lo[1]), float(hi[0]), float(hi[1]))
+        if box is None and self.box is None:
+            return False
+        self.box = box
+        self.moves += 1
+        return True
+
+
+def crop_to_box(frame, box, rotated=False):
+    """Crop an unrotated frame to ``box`` (normalised to the rotated frame); returns the crop and its exact box."""
+    height, width = frame.shape[:2]
+    u0, v0, u1, v1 = box
+    if rotated:
+        # ROTATE_90_CLOCKWISE: rotated u runs along -y, rotated v along +x
+        x0, x1 = int(v0 * width), int(np.ceil(v1 * width))
+        y0, y1 = int((1 - u1) * height), int(np.ceil((1 - u0) * height))
+        box = (1 - y1 / height, x0 / width, 1 - y0 / height, x1 / width)
+    else:
+        x0, x1 = int(u0 * width), int(np.ceil(u1 * width))
+        y0, y1 = int(v0 * height), int(np.ceil(v1 * height))
+        box = (x0 / width, y0 / height, x1 / width, y1 / height)
+    return frame[y0:y1, x0:x1], box
+
+
+def box_to_full(landmarks, box):
+    """Map crop-normalised landmarks to the full frame, in place.
+
+    World landmarks are metric and hip-centred, so the crop does not touch them.
+    """
+    u0, v0, u1, v1 = box
+    landmarks[..., 0] = u0 + landmarks[..., 0] * (u1 - u0)
+    landmarks[..., 1] = v0 + landmarks[..., 1] * (v1 - v0)
+    landmarks[..., 2] *= u1 - u0  # MediaPipe scales z like x
@@ -0,0 +1,124 @@
+"""Full-session analysis of long treadmill recordings across processes.
+
+The Gait page analyses the middle 12 seconds of a clip. For 2-5 minute
+sessions ``load_session_kinematics`` samples the whole recording instead,
+split into consecutive ranges of the sampling grid that run in a process
+pool, one Pose engine per worker. Each range starts decoding a few samples
+early so the tracker (and the ROI crop) has locked on before the samples
+that are kept; those warm-up samples are discarded. The ranges are stitched
+back together in order, so the result has exactly the sample grid of a
+serial run and goes through the same filtering and peak detection.
+"""
+
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from stride_sync import batch
+from stride_sync.analysis import (TARGET_SAMPLE_FPS, collect_landmarks, is_rotated,
+                                  kinematics_from_landmarks)
+from stride_sync.autotune import choose_complexity
+from stride_sync.landmarks import LandmarkBuffer
+from stride_sync.pose import DEFAULT_POSE_SETTINGS, default_pool
+from stride_sync.profiling import span
+from stride_sync.video import DEFAULT_LONG_EDGE, FrameSource
+
+SESSION_CHUNK_SECONDS = 20   # video seconds handed to one worker at a time
+WARMUP_SAMPLES = 5           # samples decoded before each chunk and then dropped
+
+
+def plan_session_chunks(n_samples, samples_per_chunk, warmup=WARMUP_SAMPLES):
+    """``(first, keep_from, stop)`` sample indices for each chunk of the grid."""
+    samples_per_chunk = max(1, int(samples_per_chunk))
+    return [(max(0, first - warmup), first, min(first + samples_per_chunk, n_samples))
+            for first in range(0, n_samples, samples_per_chunk)]
+
+
+def _run_session_chunk(video_path, step, first, keep_from, stop, rotated, long_edge, track_roi):
+    pose = batch.worker_pose()
+    # Chunks of other sessions share the worker; start each one untracked
+    pose.reset()
+    with FrameSource(video_path) as source:
+        buffer, stats = collect_landmarks(
+            pose, source, first * step, stop * step, step, rotated, long_edge, track_roi)
+    drop = keep_from - first
+    return buffer.trimmed(drop), stats
+
+
+def extract_session_landmarks(video_path, gait_type, cache=None, workers=None, memory_limit_mb=None,
+                              chunk_seconds=SESSION_CHUNK_SECONDS, long_edge=DEFAULT_LONG_EDGE, track_roi=True,
+                              model_complexity=1, budget_s=None):
+    """Landmarks for every sampled frame of the whole clip, extracted in parallel.
+
+    ``model_complexity="auto"`` sizes the model to ``budget_s`` for the
+    number of workers that will share the clip.
+    """
+    with FrameSource(video_path) as source:
+        fps = source.fps
+        frame_count = source.frame_count
+        width, height = source.width, source.height
+        ret, test_frame = source.read_frame(0)
+    if not ret:
+        raise ValueError("Couldn't read from video.")
+    rotated = is_rotated(test_frame, gait_type)
+
+    frame_skip = max(1, int(fps // TARGET_SAMPLE_FPS))
+    n_samples = len(range(0, frame_count, frame_skip))
+    chunks = plan_session_chunks(n_samples, chunk_seconds * fps / frame_skip)
+    n_workers = batch.plan_workers(workers, memory_limit_mb, batch.worker_memory_mb(width, height), len(chunks))
+    if model_complexity == "auto":
+        with FrameSource(video_path) as source:
+            model_complexity, _ = choose_complexity(source, 0, frame_count, frame_skip, rotated, budget_s,
+                                                    long_edge, workers=n_workers)
+    pose_settings = dict(DEFAULT_POSE_SETTINGS, model_complexity=model_complexity)
+    meta = dict(fps=fps, frame_skip=frame_skip, rotated=rotated,
+                frame_size=(height, width) if rotated else (width, height),
+                duration=frame_count / fps, stage_stats={}, model_complexity=model_complexity)
+
+    if cache is not None:
+        cache_key = cache.key(video_path, pose=pose_settings, frame_skip=frame_skip, start=0,
+                              stop=frame_count, rotated=rotated, long_edge=long_edge, roi=track_roi, world=True)
+        with span("cache_lookup") as stage:
+            cached = cache.load(cache_key)
+            stage["hit"] = cached is not None
+        if cached is not None:
+            return LandmarkBuffer.from_arrays(**cached), meta
+
+    if n_workers == 1:
+        # One core: process start-up and chunk warm-up would only add time
+        with FrameSource(video_path) as source, default_pool().checkout(**pose_settings) as pose, \
+                span("inference", workers=1) as stage:
+            buffer, meta["stage_stats"] = collect_landmarks(
+                pose, source, 0, frame_count, frame_skip, rotated, long_edge, track_roi)
+            stage.update(frames=len(buffer), detected=int(buffer.detected[:len(buffer)].sum()))
+        if cache is not None:
+            cache.store(cache_key, **buffer.arrays())
+        return buffer, meta
+
+    # spawn, not fork: the Streamlit server process is multi-threaded
+    context = multiprocessing.get_context("spawn")
+    # Peak RSS in the span is this process only; each worker holds its own engine and frames
+    with span("inference", workers=n_workers, chunks=len(chunks)) as stage, \
+            ProcessPoolExecutor(max_workers=n_workers, mp_context=context,
+                                initializer=batch.init_worker, initargs=(pose_settings,)) as executor:
+        futures = [executor.submit(_run_session_chunk, video_path, frame_skip, first, keep_from, stop,
+                                   rotated, long_edge, track_roi)
+                   for first, keep_from, stop in chunks]
+        results = [future.result() for future in futures]
+        buffer = LandmarkBuffer.concatenate([chunk for chunk, _ in results])
+        stage.update(frames=len(buffer), detected=int(buffer.detected[:len(buffer)].sum()))
+
+    meta["stage_stats"] = {f"chunk_{i}": stats for i, (_, stats) in enumerate(results)}
+    meta["stage_stats"]["workers"] = n_workers
+
+    if cache is not None:
+        cache.store(cache_key, **buffer.arrays())
+    return buffer, meta
+
+
+def load_session_kinematics(video_path, gait_type, cache=None, workers=None, memory_limit_mb=None,
+                            chunk_seconds=SESSION_CHUNK_SECONDS, long_edge=DEFAULT_LONG_EDGE, track_roi=True,
+                            model_complexity=1, budget_s=None):
+    """``load_kinematics`` over the whole recording instead of its middle 12 seconds."""
+    buffer, meta = extract_session_landmarks(video_path, gait_type, cache, workers, memory_limit_mb, chunk_seconds,
+                                             long_edge, track_roi, model_complexity, budget_s)
+    return kinematics_from_landmarks(buffer, meta)
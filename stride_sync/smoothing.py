@@ -0,0 +1,188 @@
+"""Temporal landmark post-processing: outlier rejection, smoothing and gap filling.
+
+Samples without a pose used to be dropped before the angles were filtered,
+so a dropout compressed the time axis under a filter that assumes even
+spacing. ``smooth_landmarks`` instead treats every landmark coordinate as
+a track on the clip's real timestamps (frame position / fps):
+
+1. Outliers are rejected per landmark with a Hampel test: a point further
+   from the median of its neighbours than ``OUTLIER_MADS`` robust standard
+   deviations is dropped. The limit shrinks with the point's visibility,
+   so a low-confidence jump is dropped sooner than a confident one.
+2. Each coordinate is smoothed by a constant-velocity Kalman filter with a
+   Rauch-Tung-Striebel backward pass. Each measurement's noise grows as
+   its visibility falls, so confident points pull the track harder. The
+   smoother handles uneven spacing and missing samples, and between
+   samples it interpolates like a cubic spline.
+3. The track is read out on an even frame grid, ``grid_step`` frames
+   apart. Gaps up to ``max_gap_s`` are filled; rows in longer gaps stay
+   undetected.
+
+With the grid at the app's usual 10 Hz and inference at 5-8 Hz, the
+angle curves that come out match the 10 Hz pipeline against a
+dense-sampled baseline (``benchmarks.sampling``). A Kalman smoother
+rather than a One-Euro filter because the whole clip is available: the
+backward pass removes the lag a causal filter puts on every peak.
+"""
+
+import numpy as np
+
+from stride_sync.landmarks import LANDMARK_COUNT, LandmarkBuffer
+
+IMAGE_NOISE = 0.004          # std of a fully visible image landmark, in frame widths/heights
+WORLD_NOISE = 0.02           # same for world landmarks, in metres
+IMAGE_ACCELERATION = 60.0    # process noise: spectral density of acceleration (units/s^2)^2 / Hz
+WORLD_ACCELERATION = 150.0
+MIN_VISIBILITY = 0.1         # floor on the weight of a measurement
+OUTLIER_WINDOW_S = 0.35      # Hampel window half-width
+OUTLIER_MADS = 4.0           # limit at full visibility, in robust standard deviations
+OUTLIER_FLOOR = 0.01         # never reject closer than this (image units) to the local median
+MAX_GAP_S = 0.5              # longer runs without a pose stay undetected
+
+
+def hampel_outliers(values, times, weights, window_s=OUTLIER_WINDOW_S, mads=OUTLIER_MADS, floor=OUTLIER_FLOOR):
+    """Mask of outlying samples in ``(n, k, d)`` points (NaN = missing).
+
+    A point is an outlier when its distance from the median of the points
+    within ``window_s`` of it exceeds ``mads`` robust standard deviations of
+    those distances, scaled by ``(1 + weight) / 2`` (a point at visibility 0
+    gets half the tolerance) and never below ``floor``.
+    """
+    n = len(times)
+    outliers = np.zeros(values.shape[:2], dtype=bool)
+    lo = np.searchsorted(times, times - window_s, side="left")
+    hi = np.searchsorted(times, times + window_s, side="right")
+    for i in range(n):
+        window = values[lo[i]:hi[i]]
+        if len(window) < 3:
+            continue
+        median = np.nanmedian(window, axis=0)
+        spread = np.linalg.norm(window - median, axis=-1)
+        sigma = 1.4826 * np.nanmedian(spread, axis=0)
+        distance = np.linalg.norm(values[i] - median, axis=-1)
+        limit = np.maximum(mads * sigma, floor) * (1 + weights[i]) / 2
+        outliers[i] = distance > limit
+    return outliers
+
+
+def kalman_smooth(times, values, variances, query_times, acceleration):
+    """Constant-velocity Kalman filter plus RTS smoother of every column of ``values``.
+
+    ``values`` is ``(n, channels)`` measured at ``times`` (NaN = missing) with
+    per-measurement ``variances``. Returns the smoothed positions at
+    ``query_times``, ``(m, channels)``.
+    """
+    all_times = np.union1d(times, query_times)
+    steps = len(all_times)
+    channels = values.shape[1]
+    z = np.full((steps, channels), np.nan)
+    r = np.full((steps, channels), np.inf)
+    rows = np.searchsorted(all_times, times)
+    z[rows], r[rows] = values, variances
+    measured = ~np.isnan(z)
+    r[~measured] = np.inf
+
+    # Filtered and predicted state (position, velocity) and 2x2 covariance [[a, b], [b, d]]
+    xf = np.zeros((steps, 2, channels))
+    pf = np.zeros((steps, 3, channels))
+    xp = np.zeros((steps, 2, channels))
+    pp = np.zeros((steps, 3, channels))
+    first = np.where(measured.any(axis=0), np.argmax(measured, axis=0), 0)
+    x = np.stack([z[first, np.arange(channels)], np.zeros(channels)])
+    x[0, np.isnan(x[0])] = 0.0
+    a, b, d = np.full(channels, 1e3), np.zeros(channels), np.full(channels, 1e3)
+    for i in range(steps):
+        dt = all_times[i] - all_times[i - 1] if i else 0.0
+        q = acceleration
+        x = np.stack([x[0] + dt * x[1], x[1]])
+        a, b, d = (a + 2 * dt * b + dt * dt * d + q * dt ** 3 / 3, b + dt * d + q * dt * dt / 2, d + q * dt)
+        xp[i], pp[i] = x, (a, b, d)
+        seen = measured[i]
+        innovation = np.where(seen, z[i] - x[0], 0.0)
+        s = a + np.where(seen, r[i], np.inf)
+        k0, k1 = a / s, b / s
+        x = np.stack([x[0] + k0 * innovation, x[1] + k1 * innovation])
+        a, b, d = (1 - k0) * a, (1 - k0) * b, d - k1 * b
+        xf[i], pf[i] = x, (a, b, d)
+
+    xs = xf[-1].copy()
+    smoothed = np.empty((steps, channels))
+    smoothed[-1] = xs[0]
+    for i in range(steps - 2, -1, -1):
+        dt = all_times[i + 1] - all_times[i]
+        af, bf, df = pf[i]
+        ap, bp, dp = pp[i + 1]
+        det = ap * dp - bp * bp
+        # G = P_f F^T P_p^-1, with F = [[1, dt], [0, 1]]
+        m00, m01, m10, m11 = af + dt * bf, bf, bf + dt * df, df
+        g00, g01 = (m00 * dp - m01 * bp) / det, (m01 * ap - m00 * bp) / det
+        g10, g11 = (m10 * dp - m11 * bp) / det, (m11 * ap - m10 * bp) / det
+        dx0, dx1 = xs[0] - xp[i + 1][0], xs[1] - xp[i + 1][1]
+        xs = np.stack([xf[i][0] + g00 * dx0 + g01 * dx1, xf[i][1] + g10 * dx0 + g11 * dx1])
+        smoothed[i] = xs[0]
+
+    return smoothed[np.searchsorted(all_times, query_times)]
+
+
+def smooth_landmarks(buffer, fps, grid_step, start=None, stop=None, max_gap_s=MAX_GAP_S, reject_outliers=True,
+                     acceleration_scale=1.0):
+    """Post-processed copy of ``buffer`` on an even grid of ``grid_step`` frames.
+
+    The grid runs from ``start`` (default: the first sample) up to ``stop``
+    (default: just past the last one). Rows in a hole longer than
+    ``max_gap_s`` between two detections are left undetected.
+    ``acceleration_scale`` multiplies the process noise; below 1 the
+    read-out between samples is stiffer. Returns
+    the new ``LandmarkBuffer`` and counters (samples used, outliers dropped,
+    rows filled).
+    """
+    n = len(buffer)
+    frames = buffer.frames[:n]
+    start = int(frames[0]) if start is None and n else int(start or 0)
+    stop = int(frames[-1]) + 1 if stop is None and n else int(stop or start)
+    grid = np.arange(start, stop, grid_step)
+    out = LandmarkBuffer.from_arrays(grid, np.full((len(grid), LANDMARK_COUNT, 4), np.nan, dtype=np.float32),
+                                     detected=np.zeros(len(grid), dtype=bool))
+    detected = buffer.detected[:n]
+    stats = dict(samples=int(detected.sum()), grid=len(grid), outliers=0, filled=0)
+    if stats["samples"] < 2 or not len(grid):
+        return out, stats
+
+    times = frames[detected] / fps
+    image = buffer.landmarks[:n][detected].astype(float)
+    world = buffer.world[:n][detected].astype(float)
+    visibility = np.nan_to_num(image[:, :, 3], nan=0.0).clip(0.0, 1.0)
+    weights = np.maximum(visibility, MIN_VISIBILITY)
+    if reject_outliers:
+        outliers = hampel_outliers(image[:, :, :2], times, visibility)
+        image[outliers, :3] = np.nan
+        world[outliers, :3] = np.nan
+        stats["outliers"] = int(outliers.sum())
+
+    query = grid / fps
+    for array, noise, acceleration, target in ((image, IMAGE_NOISE, IMAGE_ACCELERATION, out.landmarks),
+                                               (world, WORLD_NOISE, WORLD_ACCELERATION, out.world)):
+        values = array[:, :, :3].reshape(len(times), -1)
+        variances = np.repeat((noise / weights) ** 2, 3, axis=1)
+        target[:, :, :3] = kalman_smooth(times, values, variances, query, acceleration * acceleration_scale).reshape(
+            len(grid), LANDMARK_COUNT, 3)
+
+    # Visibility is carried over from the nearest sample
+    nearest_sample = np.clip(np.searchsorted(times, query), 0, len(times) - 1)
+    before = np.clip(nearest_sample - 1, 0, len(times) - 1)
+    nearest_sample = np.where(np.abs(times[before] - query) < np.abs(times[nearest_sample] - query),
+                              before, nearest_sample)
+    out.landmarks[:, :, 3] = visibility[nearest_sample]
+    out.world[:, :, 3] = visibility[nearest_sample]
+
+    # A grid row is kept when it is a sample or sits in a hole of at most max_gap_s between two
+    after = np.searchsorted(times, query, side="left")
+    previous = np.concatenate([[-np.inf], times])[np.searchsorted(times, query, side="right")]
+    following = np.concatenate([times, [np.inf]])[after]
+    out.detected[:] = (following == query) | (following - previous <= max_gap_s)
+    out.landmarks[~out.detected] = np.nan
+    out.world[~out.detected] = np.nan
+    sampled = np.isin(grid, frames[detected])
+    stats["filled"] = int((out.detected & ~sampled).sum())
+    return out, stats
+
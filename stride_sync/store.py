@@ -0,0 +1,113 @@
+"""Compact fixed-schema arrays for one analysed session.
+
+A ``SessionStore`` owns every per-sample array of a session, allocated
+once from the sample count:
+
+- ``landmarks`` / ``world``: ``(n, 33, 4)`` float32 image and world landmarks
+- ``frames``: video frame position of each sample
+- ``time``: float32 seconds from the start of the sampled range
+- ``valid``: uint8 bitmask, ``DETECTED`` plus one bit per joint angle
+- ``angles``: ``(n_joints, n)`` float32, one contiguous row per joint
+
+``angle(joint)`` and ``window(start, end)`` return views, so the filter
+writes its output back into the same rows and peak detection, plotting and
+the CSV exports all read those rows without copying them.
+
+Samples without a pose are not stored, so the rows are not evenly spaced
+in time after a dropout. Anything that assumes even spacing (the low-pass
+filter, peak distances, event detection) spreads the rows back onto the
+sample grid with ``grid_positions`` and ``on_grid``, where the dropouts are
+NaN holes, and maps its results back with ``rows_at``. Compared with one
+Python list of float64 scalars per joint, the angle and time data take a
+tenth of the memory.
+"""
+
+import numpy as np
+
+from stride_sync.kinematics import joint_angles
+
+DETECTED = 1  # bit 0 of ``valid``; bit ``1 + i`` is set when ``joints[i]`` has a finite angle
+
+
+class SessionStore:
+    """Landmarks, timestamps, validity bits and joint angles of one session."""
+
+    def __init__(self, buffer, joints, fps, start_frame=None):
+        """Take over a ``LandmarkBuffer``'s rows (no copy) and derive the rest.
+
+        Samples without a pose are dropped by moving the detected rows to
+        the front in place, so every later stage sees contiguous rows.
+        ``time`` counts from ``start_frame``, by default the first sample.
+        """
+        if len(joints) > 7:
+            raise ValueError("valid is a uint8 bitmask: at most 7 joints fit next to DETECTED")
+        self.joints = tuple(joints)
+        self.fps = fps
+
+        if start_frame is None:
+            start_frame = buffer.frames[0] if len(buffer) else 0
+        keep = np.flatnonzero(buffer.detected[:len(buffer)])
+        n = len(keep)
+        self.frames, self.landmarks, self.world = buffer.frames, buffer.landmarks, buffer.world
+        if n < len(buffer):
+            for array in (self.frames, self.landmarks, self.world):
+                array[:n] = array[keep]
+        self.frames, self.landmarks, self.world = self.frames[:n], self.landmarks[:n], self.world[:n]
+
+        self.time = np.empty(n, dtype=np.float32)
+        np.divide(self.frames - start_frame, fps, out=self.time, casting="unsafe")
+        self.angles = np.empty((len(self.joints), n), dtype=np.float32)
+        series = joint_angles(self.landmarks[:, :, :2])
+        self.valid = np.full(n, DETECTED, dtype=np.uint8)
+        for i, joint in enumerate(self.joints):
+            self.angles[i] = series[joint]
+            self.valid[np.isfinite(self.angles[i])] |= 1 << (i + 1)
+
+    def __len__(self):
+        return len(self.time)
+
+    @property
+    def nbytes(self):
+        return sum(array.nbytes for array in (self.frames, self.time, self.landmarks, self.world,
+                                              self.valid, self.angles))
+
+    def angle(self, joint):
+        """The angle row of ``joint`` (a view; write to it to update the store)."""
+        return self.angles[self.joints.index(joint)]
+
+    def angle_views(self, rows=slice(None)):
+        """Joint name -> view of its angle row over ``rows``."""
+        return {joint: self.angles[i, rows] for i, joint in enumerate(self.joints)}
+
+    def joint_valid(self, joint):
+        """Boolean mask of samples where ``joint`` has a finite angle."""
+        return (self.valid & (1 << (self.joints.index(joint) + 1))).astype(bool)
+
+    def grid_positions(self, frame_skip, rows=slice(None)):
+        """Index of each of ``rows`` on the grid of every ``frame_skip``-th frame from the first of them."""
+        frames = self.frames[rows]
+        if not len(frames):
+            return np.zeros(0, dtype=np.intp)
+        return np.round((frames - frames[0]) / frame_skip).astype(np.intp)
+
+    def window(self, start_time=None, end_time=None):
+        """Row slice of the samples with ``start_time <= time <= end_time``."""
+        start = 0 if start_time is None else int(np.searchsorted(self.time, start_time, side="left"))
+        stop = len(self.time) if end_time is None else int(np.searchsorted(self.time, end_time, side="right"))
+        return slice(start, max(start, stop))
+
+
+def on_grid(values, positions):
+    """``(..., rows)`` values spread onto their grid ``positions``; NaN where a sample is missing."""
+    size = int(positions[-1]) + 1 if len(positions) else 0
+    out = np.full(np.shape(values)[:-1] + (size,), np.nan)
+    out[..., positions] = values
+    return out
+
+
+def rows_at(positions, grid_index):
+    """Rows whose grid position is in ``grid_index``; indices that fall in a hole are dropped."""
+    rows = np.searchsorted(positions, grid_index).clip(0, max(len(positions) - 1, 0))
+    if not len(positions):
+        return rows
+    return rows[positions[rows] == grid_index]
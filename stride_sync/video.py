@@ -0,0 +1,191 @@
+"""Frame source that decodes sampled frames without per-frame seeking.
+
+Seeking with ``CAP_PROP_POS_FRAMES`` makes FFmpeg jump back to the previous
+keyframe and decode forward, so seeking before every sampled frame of an
+H.264/HEVC clip decodes most of a GOP per sample. ``FrameSource`` instead
+walks the stream with ``grab()`` and only ``retrieve()``s (colour-converts)
+the frames that are kept. The first clip of each container type measures
+the cost of a seek against the cost of a sequential grab and the cheaper
+strategy is reused for every later clip of that type.
+
+``to_model_input`` prepares a decoded frame for pose inference. It shrinks
+the frame first, so rotation and colour conversion run on the small copy.
+MediaPipe resizes its input to about 256 px anyway, so a 4K frame only adds
+memory traffic. Landmarks come back normalised to the image, so
+``to_pixels`` maps them onto the original frame whatever size was inferred.
+"""
+
+import os
+import time
+from collections import namedtuple
+
+import cv2
+import numpy as np
+
+# Long edge, in pixels, frames are shrunk to before pose inference (0 keeps native size)
+DEFAULT_LONG_EDGE = int(os.environ.get("STRIDE_SYNC_LONG_EDGE", 640))
+
+FrameCosts = namedtuple("FrameCosts", ["grab", "seek"])
+
+# Measured (grab, seek) seconds per container key, shared by the whole process
+_COST_CACHE = {}
+
+
+def container_key(video_path, cap):
+    """Key used to share measured decode costs between clips of the same kind."""
+    ext = os.path.splitext(str(video_path))[1].lower()
+    fourcc = int(cap.get(cv2.CAP_PROP_FOURCC))
+    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    return (ext, fourcc, width, height)
+
+
+class FrameSource:
+    """Reads selected frames from a video, streaming or seeking per container."""
+
+    def __init__(self, video_path):
+        self.video_path = str(video_path)
+        self.cap = cv2.VideoCapture(self.video_path)
+        self.fps = self.cap.get(cv2.CAP_PROP_FPS)
+        self.frame_count = int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        self.width = int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        self.height = int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        self.key = container_key(self.video_path, self.cap)
+
+        self._pos = 0  # index of the frame the next grab() will return
+        self._grab_time = 0.0
+        self._grab_count = 0
+        self._seek_time = 0.0
+        self._seek_count = 0
+
+        # Frame counters, useful for checking how much was actually decoded
+        self.frames_grabbed = 0
+        self.frames_retrieved = 0
+        self.seeks = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.release()
+
+    def release(self):
+        self.cap.release()
+
+    @property
+    def costs(self):
+        """Measured per-frame grab and per-call seek cost, once known."""
+        return _COST_CACHE.get(self.key)
+
+    def strategy(self, step):
+        """'stream' or 'seek' for a given sample step, once costs are known."""
+        costs = self.costs
+        if costs is None:
+            return None
+        return "seek" if costs.seek < costs.grab * (step - 1) else "stream"
+
+    def _record_costs(self):
+        if self._grab_count and self._seek_count and self.key not in _COST_CACHE:
+            _COST_CACHE[self.key] = FrameCosts(
+                grab=self._grab_time / self._grab_count,
+                seek=self._seek_time / self._seek_count,
+            )
+
+    def _seek(self, target):
+        start = time.perf_counter()
+        self.cap.set(cv2.CAP_PROP_POS_FRAMES, target)
+        self._seek_time += time.perf_counter() - start
+        self._seek_count += 1
+        self.seeks += 1
+        self._pos = target
+        self._record_costs()
+        return True
+
+    def _skip(self, n):
+        start = time.perf_counter()
+        for _ in range(n):
+            if not self.cap.grab():
+                return False
+            self._pos += 1
+            self.frames_grabbed += 1
+        self._grab_time += time.perf_counter() - start
+        self._grab_count += n
+        self._record_costs()
+        return True
+
+    def _advance(self, target):
+        """Position the decoder so the next grab() returns ``target``."""
+        gap = target - self._pos
+        if gap == 0:
+            return True
+        if gap < 0:
+            return self._seek(target)
+
+        costs = self.costs
+        if costs is None:
+            # Still measuring: time one seek (usually the jump to the crop
+            # start) and one streamed gap, then let the costs decide
+            if not self._seek_count and gap > 1:
+                return self._seek(target)
+            return self._skip(gap)
+        if costs.seek < costs.grab * gap:
+            return self._seek(target)
+        return self._skip(gap)
+
+    def read_frame(self, frame_pos):
+        """Decode a single frame, returning ``(ok, frame)`` like ``cap.read()``."""
+        if not self._advance(frame_pos) or not self.cap.grab():
+            return False, None
+        self._pos += 1
+        self.frames_grabbed += 1
+        ok, frame = self.cap.retrieve()
+        if ok:
+            self.frames_retrieved += 1
+        return ok, frame
+
+    def frames(self, start, stop, step=1):
+        """Yield ``(frame_pos, frame)`` for every ``step``-th frame in [start, stop)."""
+        if self.frame_count > 0:
+            stop = min(stop, self.frame_count)
+        yield from self.frames_at(range(int(start), int(stop), max(1, int(step))))
+
+    def frames_at(self, positions):
+        """Yield ``(frame_pos, frame)`` for each of the increasing frame ``positions``."""
+        for frame_pos in positions:
+            frame_pos = int(frame_pos)
+            if self.frame_count > 0 and frame_pos >= self.frame_count:
+                break
+            ok, frame = self.read_frame(frame_pos)
+            if not ok:
+                break
+            yield frame_pos, frame
+
+
+def downscale(frame, long_edge=DEFAULT_LONG_EDGE):
+    """Shrink ``frame`` with INTER_AREA so its long edge is at most ``long_edge``."""
+    height, width = frame.shape[:2]
+    if not long_edge or max(height, width) <= long_edge:
+        return frame
+    scale = long_edge / max(height, width)
+    size = (max(1, round(width * scale)), max(1, round(height * scale)))
+    return cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+
+
+def to_model_input(frame, rotated=False, long_edge=DEFAULT_LONG_EDGE):
+    """BGR frame -> RGB pose input, downscaled before it is rotated and converted."""
+    frame = downscale(frame, long_edge)
+    if rotated:
+        frame = cv2.rotate(frame, cv2.ROTATE_90_CLOCKWISE)
+    return cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+
+
+def to_pixels(landmarks, width, height):
+    """Normalised ``(..., 33, 2+)`` landmarks in pixels of a ``width`` x ``height`` frame.
+
+    Pass the size of the original frame as the model saw it (after any
+    rotation); x/y are scaled, other channels are returned unchanged.
+    """
+    pixels = np.array(landmarks, dtype=np.float32, copy=True)
+    pixels[..., 0] *= width
+    pixels[..., 1] *= height
+    return pixels